@@ -0,0 +1,70 @@
+from typing import Callable
+
+from .packet import Packet
+
+# Marker of the packet classes whose handler was not looked up yet
+unresolved = object()
+
+def handles(*packet_types:type) -> Callable:
+  """ Decorator registering a method of an annotator as the handler of some packet classes. """
+  def register(method:Callable) -> Callable:
+    method.handled_packet_types = packet_types
+    return method
+  return register
+
+class Annotator:
+  """ Base class for annotators, displaying a status next to each packet of a stream. """
+
+  # Annotators can store their state in slots
+  __slots__ = ()
+
+  # Packet classes the annotator is interested in (including subclasses), None for all packets
+  packet_types : tuple[type, ...] | None = None
+
+  # Handler of each packet class, registered with the handles decorator
+  handlers : dict[type, Callable | None] = {}
+
+  def __init_subclass__(cls, **kwargs):
+    """ Collect the handlers registered in the class and its parents, they also define the packet classes of interest. """
+    super().__init_subclass__(**kwargs)
+    handlers = {packet_type: handler for packet_type, handler in cls.handlers.items() if handler is not None}
+    for attribute in cls.__dict__.values():
+      for packet_type in getattr(attribute, "handled_packet_types", ()):
+        handlers[packet_type] = attribute
+    cls.handlers = handlers
+    if handlers and "packet_types" not in cls.__dict__:
+      cls.packet_types = tuple(handlers)
+
+  @classmethod
+  def accepts(cls, packet_type:type) -> bool:
+    """ Check if the annotator is interested in a packet class. """
+    return cls.packet_types is None or issubclass(packet_type, cls.packet_types)
+
+  @classmethod
+  def handler(cls, packet_type:type) -> Callable | None:
+    """ Find the handler of a packet class, or of its closest parent class, and cache it for the class. """
+    for parent_type in packet_type.__mro__:
+      handler = cls.handlers.get(parent_type)
+      if handler is not None: break
+    cls.handlers[packet_type] = handler
+    return handler
+
+  def update(self, packet:Packet) -> None:
+    """ Update the status of the annotator with a packet it is interested in, with a single lookup of the handler of its class. """
+    handler = self.handlers.get(type(packet), unresolved)
+    if handler is unresolved:
+      handler = self.handler(type(packet))
+    if handler is not None:
+      handler(self, packet)
+
+  def render(self) -> str:
+    """ Get the annotation string for the last packet passed to update. """
+    return ""
+
+  def render_idle(self) -> str:
+    """ Get the annotation string for a packet the annotator is not interested in, without updating it. """
+    return self.render()
+
+  def __repr__(self) -> str:
+    """ Get the current annotation string. """
+    return self.render()
@@ -2,13 +2,14 @@ from dataclasses import dataclass
 from enum        import Enum
 from typing      import Generator
 
+from . import stats
+
 from .vcd import (
   VCDFile,
   VCDValue,
 )
 
 from .utils import (
-  change_case,
   packet_string,
   Color,
 )
@@ -29,11 +30,14 @@ line_width      = 48
 
 class APBTransaction(Packet):
   """ APB transaction base type. """
+  __slots__ = ()
   def __str__(self):
     return self.__repr__()
 
 class APBTransactionError(APBTransaction):
   """ APB incorrect transaction. """
+  fields    = ("paddr", "pprot", "pnse", "pstrb", "pwdata", "prdata", "pslverr")
+  __slots__ = fields + ("timestamp_request", "timestamp_response")
   def __init__(self,
                timestamp_request  : int,
                timestamp_response : int,
@@ -46,16 +50,10 @@ class APBTransactionError(APBTransaction):
                pslverr            : VCDValue):
     self.timestamp_request  = timestamp_request
     self.timestamp_response = timestamp_response
-    self.paddr   = paddr
-    self.pprot   = pprot
-    self.pnse    = pnse
-    self.pstrb   = pstrb
-    self.pwdata  = pwdata
-    self.prdata  = prdata
-    self.pslverr = pslverr
+    self.store_fields(paddr, pprot, pnse, pstrb, pwdata, prdata, pslverr)
   def __repr__(self) -> str:
     parameters = {}
-    parameters["ADDR "] = self.paddr.hexadecimal()
+    parameters["ADDR "] = self.field_value("paddr").hexadecimal()
     return packet_string(
       timestamp       = self.timestamp_request,
       command         = "ERROR",
@@ -70,6 +68,8 @@ class APBTransactionError(APBTransaction):
 
 class APBTransactionRead(APBTransaction):
   """ APB read transaction. """
+  fields    = ("paddr", "pprot", "pnse", "prdata", "pslverr")
+  __slots__ = fields + ("timestamp_request", "timestamp_response")
   def __init__(self,
                timestamp_request  : int,
                timestamp_response : int,
@@ -80,15 +80,11 @@ class APBTransactionRead(APBTransaction):
                pslverr            : VCDValue):
     self.timestamp_request  = timestamp_request
     self.timestamp_response = timestamp_response
-    self.paddr   = paddr
-    self.pprot   = pprot
-    self.pnse    = pnse
-    self.prdata  = prdata
-    self.pslverr = pslverr
+    self.store_fields(paddr, pprot, pnse, prdata, pslverr)
   def __repr__(self) -> str:
     parameters = {}
-    parameters["ADDR "] = self.paddr.hexadecimal()
-    parameters["DATA "] = self.prdata.hexadecimal()
+    parameters["ADDR "] = self.field_value("paddr").hexadecimal()
+    parameters["DATA "] = self.field_value("prdata").hexadecimal()
     return packet_string(
       timestamp       = self.timestamp_request,
       command         = "READ",
@@ -103,6 +99,8 @@ class APBTransactionRead(APBTransaction):
 
 class APBTransactionWrite(APBTransaction):
   """ APB write transaction. """
+  fields    = ("paddr", "pprot", "pnse", "pstrb", "pwdata", "pslverr")
+  __slots__ = fields + ("timestamp_request", "timestamp_response")
   def __init__(self,
                timestamp_request  : int,
                timestamp_response : int,
@@ -114,16 +112,11 @@ class APBTransactionWrite(APBTransaction):
                pslverr            : VCDValue):
     self.timestamp_request  = timestamp_request
     self.timestamp_response = timestamp_response
-    self.paddr   = paddr
-    self.pprot   = pprot
-    self.pnse    = pnse
-    self.pstrb   = pstrb
-    self.pwdata  = pwdata
-    self.pslverr = pslverr
+    self.store_fields(paddr, pprot, pnse, pstrb, pwdata, pslverr)
   def __repr__(self) -> str:
     parameters = {}
-    parameters["ADDR "] = self.paddr.hexadecimal()
-    parameters["DATA "] = self.pwdata.hexadecimal()
+    parameters["ADDR "] = self.field_value("paddr").hexadecimal()
+    parameters["DATA "] = self.field_value("pwdata").hexadecimal()
     return packet_string(
       timestamp       = self.timestamp_request,
       command         = "WRITE",
@@ -160,6 +153,12 @@ class APBInterfacePaths:
 class APBInterface(Interface):
   """ An APB interface with its VCD signals. """
 
+  paths_class = APBInterfacePaths
+  uppercase   = False
+
+  # Signals checked before use by the decoder
+  optional_signals = ("pnse",)
+
   def __init__(self,
                vcd_file  : VCDFile,
                signals   : APBInterfacePaths = None,
@@ -169,20 +168,10 @@ class APBInterface(Interface):
                uppercase : bool              = False):
     """ Get all the signals of the APB bus. """
     if signals is None:
-      self.paths   = APBInterfacePaths()
-      self.pclock  = f"{path}.{prefix}{change_case('pclock',  uppercase)}{suffix}"
-      self.psel    = f"{path}.{prefix}{change_case('psel',    uppercase)}{suffix}"
-      self.penable = f"{path}.{prefix}{change_case('penable', uppercase)}{suffix}"
-      self.pready  = f"{path}.{prefix}{change_case('pready',  uppercase)}{suffix}"
-      self.paddr   = f"{path}.{prefix}{change_case('paddr',   uppercase)}{suffix}"
-      self.pprot   = f"{path}.{prefix}{change_case('pprot',   uppercase)}{suffix}"
-      self.pnse    = f"{path}.{prefix}{change_case('pnse',    uppercase)}{suffix}"
-      self.pwrite  = f"{path}.{prefix}{change_case('pwrite',  uppercase)}{suffix}"
-      self.pstrb   = f"{path}.{prefix}{change_case('pstrb',   uppercase)}{suffix}"
-      self.pwdata  = f"{path}.{prefix}{change_case('pwdata',  uppercase)}{suffix}"
-      self.prdata  = f"{path}.{prefix}{change_case('prdata',  uppercase)}{suffix}"
-      self.pslverr = f"{path}.{prefix}{change_case('pslverr', uppercase)}{suffix}"
+      self.paths = self.interface_paths(path, prefix, suffix, uppercase)
     else: self.paths = signals
+    vcd_file.validate_paths(self.paths, self.optional_signals)
+    vcd_file.load_signals(vars(self.paths).values())
     self.pclock  = vcd_file.get_signal( self.paths.pclock  .split('.') )
     self.psel    = vcd_file.get_signal( self.paths.psel    .split('.') )
     self.penable = vcd_file.get_signal( self.paths.penable .split('.') )
@@ -220,8 +209,8 @@ class APBInterface(Interface):
     timestamp_response = self.pclock.get_edge_at_timestamp(timestamp_pready, move=True).timestamp
 
     # Sample the response signals
-    prdata  = self.pprot  .get_at_timestamp(timestamp_response).value
-    pslverr = self.pprot  .get_at_timestamp(timestamp_response).value
+    prdata  = self.prdata .get_at_timestamp(timestamp_response).value
+    pslverr = self.pslverr.get_at_timestamp(timestamp_response).value
 
     # Sample optional signals
     pnse = None
@@ -272,7 +261,7 @@ class APBInterface(Interface):
     """ Generator to iterate over all transactions. """
     while True:
       try:
-        next_transaction = self.next_transaction()
+        next_transaction = stats.decode(self.next_transaction)
         if next_transaction:
           yield next_transaction
         else: return
@@ -4,15 +4,18 @@ from dataclasses import dataclass
 from enum        import Enum
 from typing      import Generator
 
+from . import stats
+
 from .vcd import (
   VCDFile,
   VCDValue,
+  none_value,
   get_value_at_timestamp_if_signal_exists,
+  sampled_burst_if_signal_exists,
   get_next_valid_ready_handshake_timestamp,
 )
 
 from .utils import (
-  change_case,
   packet_string,
   Color,
 )
@@ -33,11 +36,14 @@ line_width      = 186
 
 class AXITransaction(Packet):
   """ AXI transaction base type. """
+  __slots__ = ()
   def __str__(self):
     return self.__repr__()
 
 class AXITransactionWrite(AXITransaction):
   """ AXI write transaction. """
+  fields    = ("identifier", "address", "length", "size", "burst", "permissions", "response")
+  __slots__ = fields + ("timestamp_address", "timestamp_data_first", "timestamp_data_last", "timestamp_response", "timestamp", "data")
   def __init__(self,
                timestamp_address    : int,
                timestamp_data_first : int,
@@ -56,18 +62,12 @@ class AXITransactionWrite(AXITransaction):
     self.timestamp_data_last  = timestamp_data_last
     self.timestamp_response   = timestamp_response
     self.timestamp            = self.timestamp_address
-    self.identifier  = identifier
-    self.address     = address
-    self.length      = length
-    self.size        = size
-    self.burst       = burst
-    self.permissions = permissions
-    self.data        = data
-    self.response    = response
+    self.store_fields(identifier, address, length, size, burst, permissions, response)
+    self.data                 = data
   def __repr__(self) -> str:
     parameters = {}
-    parameters["ID "]   = self.identifier.hexadecimal()
-    parameters["ADDR "] = self.address.hexadecimal()
+    parameters["ID "]   = self.field_value("identifier").hexadecimal()
+    parameters["ADDR "] = self.field_value("address").hexadecimal()
     parameters["DATA "] = self.data.hexadecimal()
     return packet_string(
       timestamp       = self.timestamp,
@@ -83,6 +83,8 @@ class AXITransactionWrite(AXITransaction):
 
 class AXITransactionRead(AXITransaction):
   """ AXI read transaction. """
+  fields    = ("identifier", "address", "length", "size", "burst", "permissions", "response")
+  __slots__ = fields + ("timestamp_address", "timestamp_data_first", "timestamp_data_last", "timestamp", "data")
   def __init__(self,
                timestamp_address    : int,
                timestamp_data_first : int,
@@ -99,18 +101,12 @@ class AXITransactionRead(AXITransaction):
     self.timestamp_data_first = timestamp_data_first
     self.timestamp_data_last  = timestamp_data_last
     self.timestamp            = self.timestamp_address
-    self.identifier  = identifier
-    self.address     = address
-    self.length      = length
-    self.size        = size
-    self.burst       = burst
-    self.permissions = permissions
-    self.data        = data
-    self.response    = response
+    self.store_fields(identifier, address, length, size, burst, permissions, response)
+    self.data                 = data
   def __repr__(self) -> str:
     parameters = {}
-    parameters["ID "]   = self.identifier.hexadecimal()
-    parameters["ADDR "] = self.address.hexadecimal()
+    parameters["ID "]   = self.field_value("identifier").hexadecimal()
+    parameters["ADDR "] = self.field_value("address").hexadecimal()
     parameters["DATA "] = self.data.hexadecimal()
     return packet_string(
       timestamp       = self.timestamp,
@@ -173,6 +169,14 @@ class AXIInterfacePaths:
 class AXIInterface(Interface):
   """ An AXI interface with its VCD signals. """
 
+  paths_class = AXIInterfacePaths
+  uppercase   = False
+
+  # Signals checked before use by the decoder
+  optional_signals = ("awid", "awaddr", "awlen", "awsize", "awburst", "awprot", "wdata",
+                      "wstrb", "wlast", "bid", "bresp", "arid", "araddr", "arlen",
+                      "arsize", "arburst", "arprot", "rid", "rresp", "rdata", "rlast")
+
   def __init__(self,
                vcd_file  : VCDFile,
                signals   : AXIInterfacePaths = None,
@@ -182,40 +186,10 @@ class AXIInterface(Interface):
                uppercase : bool              = False):
     """ Get all the signals of the AXI bus. """
     if signals is None:
-      self.paths   = AXIInterfacePaths()
-      self.aclock  = f"{path}.{prefix}{change_case('aclock',  uppercase)}{suffix}"
-      self.awid    = f"{path}.{prefix}{change_case('awid',    uppercase)}{suffix}"
-      self.awaddr  = f"{path}.{prefix}{change_case('awaddr',  uppercase)}{suffix}"
-      self.awlen   = f"{path}.{prefix}{change_case('awlen',   uppercase)}{suffix}"
-      self.awsize  = f"{path}.{prefix}{change_case('awsize',  uppercase)}{suffix}"
-      self.awburst = f"{path}.{prefix}{change_case('awburst', uppercase)}{suffix}"
-      self.awprot  = f"{path}.{prefix}{change_case('awprot',  uppercase)}{suffix}"
-      self.awvalid = f"{path}.{prefix}{change_case('awvalid', uppercase)}{suffix}"
-      self.awready = f"{path}.{prefix}{change_case('awready', uppercase)}{suffix}"
-      self.wdata   = f"{path}.{prefix}{change_case('wdata',   uppercase)}{suffix}"
-      self.wstrb   = f"{path}.{prefix}{change_case('wstrb',   uppercase)}{suffix}"
-      self.wlast   = f"{path}.{prefix}{change_case('wlast',   uppercase)}{suffix}"
-      self.wvalid  = f"{path}.{prefix}{change_case('wvalid',  uppercase)}{suffix}"
-      self.wready  = f"{path}.{prefix}{change_case('wready',  uppercase)}{suffix}"
-      self.bid     = f"{path}.{prefix}{change_case('bid',     uppercase)}{suffix}"
-      self.bresp   = f"{path}.{prefix}{change_case('bresp',   uppercase)}{suffix}"
-      self.bvalid  = f"{path}.{prefix}{change_case('bvalid',  uppercase)}{suffix}"
-      self.bready  = f"{path}.{prefix}{change_case('bready',  uppercase)}{suffix}"
-      self.arid    = f"{path}.{prefix}{change_case('arid',    uppercase)}{suffix}"
-      self.araddr  = f"{path}.{prefix}{change_case('araddr',  uppercase)}{suffix}"
-      self.arlen   = f"{path}.{prefix}{change_case('arlen',   uppercase)}{suffix}"
-      self.arsize  = f"{path}.{prefix}{change_case('arsize',  uppercase)}{suffix}"
-      self.arburst = f"{path}.{prefix}{change_case('arburst', uppercase)}{suffix}"
-      self.arprot  = f"{path}.{prefix}{change_case('arprot',  uppercase)}{suffix}"
-      self.arvalid = f"{path}.{prefix}{change_case('arvalid', uppercase)}{suffix}"
-      self.arready = f"{path}.{prefix}{change_case('arready', uppercase)}{suffix}"
-      self.rid     = f"{path}.{prefix}{change_case('rid',     uppercase)}{suffix}"
-      self.rresp   = f"{path}.{prefix}{change_case('rresp',   uppercase)}{suffix}"
-      self.rdata   = f"{path}.{prefix}{change_case('rdata',   uppercase)}{suffix}"
-      self.rlast   = f"{path}.{prefix}{change_case('rlast',   uppercase)}{suffix}"
-      self.rvalid  = f"{path}.{prefix}{change_case('rvalid',  uppercase)}{suffix}"
-      self.rready  = f"{path}.{prefix}{change_case('rready',  uppercase)}{suffix}"
+      self.paths = self.interface_paths(path, prefix, suffix, uppercase)
     else: self.paths = signals
+    vcd_file.validate_paths(self.paths, self.optional_signals)
+    vcd_file.load_signals(vars(self.paths).values())
     self.aclock  = vcd_file.get_signal( self.paths.aclock  .split('.') )
     self.awid    = vcd_file.get_signal( self.paths.awid    .split('.') )
     self.awaddr  = vcd_file.get_signal( self.paths.awaddr  .split('.') )
@@ -248,6 +222,8 @@ class AXIInterface(Interface):
     self.rlast   = vcd_file.get_signal( self.paths.rlast   .split('.') )
     self.rvalid  = vcd_file.get_signal( self.paths.rvalid  .split('.') )
     self.rready  = vcd_file.get_signal( self.paths.rready  .split('.') )
+    # Separate cursor over the clock for the read channels, so that the write and read generators can run concurrently
+    self.aclock_read = self.aclock.copy()
 
 
 
@@ -262,26 +238,25 @@ class AXIInterface(Interface):
     address     = get_value_at_timestamp_if_signal_exists(self.awaddr,  VCDValue.none(), timestamp=timestamp_address)
     length      = get_value_at_timestamp_if_signal_exists(self.awlen,   VCDValue.none(), timestamp=timestamp_address)
     size        = get_value_at_timestamp_if_signal_exists(self.awsize,  VCDValue.none(), timestamp=timestamp_address)
-    burst       = get_value_at_timestamp_if_signal_exists(self.awburst, VCDValue.none(), timestamp=timestamp_address)
+    burst       = get_value_at_timestamp_if_signal_exists(self.awburst, none_value, timestamp=timestamp_address)
     permissions = get_value_at_timestamp_if_signal_exists(self.awprot,  VCDValue.none(), timestamp=timestamp_address)
 
     # Fetch the write data beats
     timestamp_data_first = None
     timestamp_data_last  = None
-    burst_data = VCDValue.none()
+    timestamps_data      = []
     for beat in range(int(length)+1):
 
       # Get the timestamp of the handshake of the write data channel
       timestamp_data = get_next_valid_ready_handshake_timestamp(self.aclock, self.wvalid, self.wready)
+      if timestamp_data is None: return None
 
-      # Sample the data signals
-      strobe = get_value_at_timestamp_if_signal_exists(self.wstrb, VCDValue.none(), timestamp=timestamp_data)
-      data   = get_value_at_timestamp_if_signal_exists(self.wdata, VCDValue.none(), timestamp=timestamp_data)
-      last   = get_value_at_timestamp_if_signal_exists(self.wlast, VCDValue.none(), timestamp=timestamp_data)
+      # Sample the data signals, the data is only sampled when the burst is first used
+      strobe = get_value_at_timestamp_if_signal_exists(self.wstrb, none_value, timestamp=timestamp_data)
+      last   = get_value_at_timestamp_if_signal_exists(self.wlast, none_value, timestamp=timestamp_data)
 
-      # Append the data to the burst
-      beat_data  = data
-      burst_data = beat_data ** burst_data
+      # Append the beat to the burst
+      timestamps_data.append(timestamp_data)
 
 
       # Update first and last data timestamp
@@ -296,7 +271,7 @@ class AXIInterface(Interface):
 
     # Sample the response signals
     bid      = get_value_at_timestamp_if_signal_exists(self.bid,   VCDValue.none(), timestamp=timestamp_response)
-    response = get_value_at_timestamp_if_signal_exists(self.bresp, VCDValue.none(), timestamp=timestamp_response)
+    response = get_value_at_timestamp_if_signal_exists(self.bresp, none_value, timestamp=timestamp_response)
 
     # Build and return the transaction object
     transaction = AXITransactionWrite(
@@ -310,7 +285,7 @@ class AXIInterface(Interface):
       size        = size,
       burst       = burst,
       permissions = permissions,
-      data        = burst_data,
+      data        = sampled_burst_if_signal_exists(self.wdata, timestamps_data),
       response    = response,
     )
 
@@ -322,7 +297,7 @@ class AXIInterface(Interface):
     """ Generator to iterate over all write transactions. """
     while True:
       try:
-        next_write_transaction = self.next_write_transaction()
+        next_write_transaction = stats.decode(self.next_write_transaction)
         if next_write_transaction:
           yield next_write_transaction
         else: return
@@ -334,34 +309,33 @@ class AXIInterface(Interface):
     """ Get the next AXI read transaction. """
 
     # Get the timestamp of the handshake of the read address channel
-    timestamp_address = get_next_valid_ready_handshake_timestamp(self.aclock, self.arvalid, self.arready)
+    timestamp_address = get_next_valid_ready_handshake_timestamp(self.aclock_read, self.arvalid, self.arready)
 
     # Sample the address signals
     identifier  = get_value_at_timestamp_if_signal_exists(self.arid,    VCDValue.none(), timestamp=timestamp_address)
     address     = get_value_at_timestamp_if_signal_exists(self.araddr,  VCDValue.none(), timestamp=timestamp_address)
     length      = get_value_at_timestamp_if_signal_exists(self.arlen,   VCDValue.none(), timestamp=timestamp_address)
     size        = get_value_at_timestamp_if_signal_exists(self.arsize,  VCDValue.none(), timestamp=timestamp_address)
-    burst       = get_value_at_timestamp_if_signal_exists(self.arburst, VCDValue.none(), timestamp=timestamp_address)
+    burst       = get_value_at_timestamp_if_signal_exists(self.arburst, none_value, timestamp=timestamp_address)
     permissions = get_value_at_timestamp_if_signal_exists(self.arprot,  VCDValue.none(), timestamp=timestamp_address)
 
     # Fetch the read data response beats
     timestamp_data_first = None
     timestamp_data_last  = None
-    burst_data = VCDValue.none()
+    timestamps_data      = []
     for beat in range(int(length)+1):
 
       # Get the timestamp of the handshake of the read data channel
-      timestamp_data = get_next_valid_ready_handshake_timestamp(self.aclock, self.rvalid, self.rready)
+      timestamp_data = get_next_valid_ready_handshake_timestamp(self.aclock_read, self.rvalid, self.rready)
+      if timestamp_data is None: return None
 
-      # Sample the data signals
+      # Sample the data signals, the data is only sampled when the burst is first used
       rid      = get_value_at_timestamp_if_signal_exists(self.rid,   VCDValue.none(), timestamp=timestamp_data)
-      response = get_value_at_timestamp_if_signal_exists(self.rresp, VCDValue.none(), timestamp=timestamp_data)
-      data     = get_value_at_timestamp_if_signal_exists(self.rdata, VCDValue.none(), timestamp=timestamp_data)
-      last     = get_value_at_timestamp_if_signal_exists(self.rlast, VCDValue.none(), timestamp=timestamp_data)
+      response = get_value_at_timestamp_if_signal_exists(self.rresp, none_value, timestamp=timestamp_data)
+      last     = get_value_at_timestamp_if_signal_exists(self.rlast, none_value, timestamp=timestamp_data)
 
-      # Append the data to the burst
-      beat_data  = data
-      burst_data = beat_data ** burst_data
+      # Append the beat to the burst
+      timestamps_data.append(timestamp_data)
 
       # Update first and last data timestamp
       if timestamp_data_first is None:
@@ -380,7 +354,7 @@ class AXIInterface(Interface):
       size        = size,
       burst       = burst,
       permissions = permissions,
-      data        = burst_data,
+      data        = sampled_burst_if_signal_exists(self.rdata, timestamps_data),
       response    = response,
     )
 
@@ -392,7 +366,7 @@ class AXIInterface(Interface):
     """ Generator to iterate over all read transactions. """
     while True:
       try:
-        next_read_transaction = self.next_read_transaction()
+        next_read_transaction = stats.decode(self.next_read_transaction)
         if next_read_transaction:
           yield next_read_transaction
         else: return
@@ -0,0 +1,197 @@
+from __future__ import annotations
+from array       import array
+from collections import defaultdict
+from dataclasses import dataclass
+from enum        import IntEnum
+from functools   import lru_cache
+from itertools   import accumulate
+
+from .vcd import VCDValue
+
+
+
+
+
+
+class CommandKind(IntEnum):
+  """ Kind of a command in a command table, only the kinds that affect or display the status of banks and pages are distinguished. """
+  OTHER                = 0
+  ACTIVATE             = 1
+  READ                 = 2
+  READ_AUTO_PRECHARGE  = 3
+  WRITE                = 4
+  WRITE_AUTO_PRECHARGE = 5
+  PRECHARGE            = 6
+  PRECHARGE_ALL        = 7
+  PRECHARGE_SAME_BANK  = 8
+  REFRESH              = 9
+  REFRESH_ALL          = 10
+  REFRESH_SAME_BANK    = 11
+
+# Kinds accessing a single column of a page
+read_kinds  = {CommandKind.READ,  CommandKind.READ_AUTO_PRECHARGE}
+write_kinds = {CommandKind.WRITE, CommandKind.WRITE_AUTO_PRECHARGE}
+
+# Kinds closing the page of the banks targeted
+precharge_kinds = {CommandKind.READ_AUTO_PRECHARGE,
+                   CommandKind.WRITE_AUTO_PRECHARGE,
+                   CommandKind.PRECHARGE,
+                   CommandKind.PRECHARGE_ALL,
+                   CommandKind.PRECHARGE_SAME_BANK}
+
+# Kinds targeting all the banks of a rank, or the same bank in all bank groups of a rank
+rank_kinds      = {CommandKind.PRECHARGE_ALL,       CommandKind.REFRESH_ALL}
+same_bank_kinds = {CommandKind.PRECHARGE_SAME_BANK, CommandKind.REFRESH_SAME_BANK}
+
+# Kinds with an effect on the page of the banks targeted
+page_kinds = read_kinds | write_kinds | precharge_kinds | {CommandKind.ACTIVATE}
+
+# Precharges of several banks, which reset the pages of all the banks of the channel to unused like the streaming page annotators
+broadcast_precharge_kinds = {CommandKind.PRECHARGE_ALL, CommandKind.PRECHARGE_SAME_BANK}
+
+
+
+class CommandTable:
+  """ Columnar table of commands with only the fields used by the bank, page and data annotations. """
+
+  def __init__(self):
+    """ At initialization, the table is empty. """
+    self.timestamp = array('q')
+    self.kind      = array('B')
+    self.rank      = array('H')
+    self.bank      = array('H')
+    self.column    = array('H')
+    self.data      = [] # Data burst of the reads and writes, None for the other commands
+
+  def append(self,
+             timestamp : int,
+             kind      : CommandKind,
+             rank      : int      = 0,
+             bank      : int      = 0,
+             column    : int      = 0,
+             data      : VCDValue = None):
+    """ Append a command to the table. The bank is the index within the rank, or the bank address for same bank commands. """
+    self.timestamp .append(timestamp)
+    self.kind      .append(kind)
+    self.rank      .append(rank)
+    self.bank      .append(bank)
+    self.column    .append(column)
+    self.data      .append(data)
+
+  def __len__(self) -> int:
+    """ Length is the number of commands. """
+    return len(self.kind)
+
+
+
+@dataclass(frozen=True)
+class BankGeometry:
+  """ Organization of the banks and pages of a channel. """
+  ranks                : int
+  banks_per_rank       : int
+  banks_per_bank_group : int
+  columns_per_row      : int
+
+  @property
+  def banks(self) -> int:
+    """ Number of banks in the channel. """
+    return self.ranks * self.banks_per_rank
+
+  def target_mask(self, kind:CommandKind, rank:int, bank:int) -> int:
+    """ Bitmask of the banks of the channel targeted by a command. """
+    return target_mask(self.banks_per_rank, self.banks_per_bank_group, kind, rank, bank)
+
+# The masks are cached by the fields of the geometry instead of the geometry itself, which would be kept alive by the cache
+@lru_cache(maxsize=None)
+def target_mask(banks_per_rank:int, banks_per_bank_group:int, kind:CommandKind, rank:int, bank:int) -> int:
+  """ Bitmask of the banks of a channel targeted by a command, from the organization of the banks of a rank. """
+  rank_offset = rank * banks_per_rank
+  if kind == CommandKind.OTHER:
+    return 0
+  if kind in rank_kinds:
+    return (2**banks_per_rank - 1) << rank_offset
+  if kind in same_bank_kinds:
+    mask = 0
+    for bank_group_offset in range(0, banks_per_rank, banks_per_bank_group):
+      mask |= 1 << (rank_offset + bank_group_offset + bank)
+    return mask
+  return 1 << (rank_offset + bank)
+
+
+
+@dataclass
+class BankAnnotationColumns:
+  """ Status of the banks and of the page accessed for each command of a command table. """
+  targets       : list[int]  # Bitmask of the banks targeted by the command
+  banks_active  : list[int]  # Bitmask of the active banks after the command
+  page_read     : list[int]  # Bitmask of the read columns of the page accessed, after the access
+  page_written  : list[int]  # Bitmask of the written columns of the page accessed, after the access
+  page_inactive : list[bool] # If the page accessed was inactive before the command
+
+
+
+def annotate_command_table(table:CommandTable, geometry:BankGeometry) -> BankAnnotationColumns:
+  """ Compute the status of the banks and pages for a whole command table in one pass, using cumulative scans instead of a state machine per command. """
+  kinds   = table.kind
+  ranks   = table.rank
+  banks   = table.bank
+  columns = table.column
+  count   = len(table)
+
+  # Banks targeted by each command
+  targets = list(map(geometry.target_mask, kinds, ranks, banks))
+
+  # Cumulative scan of the activations and precharges over the whole channel
+  activated   = [target if kind == CommandKind.ACTIVATE else 0 for kind, target in zip(kinds, targets)]
+  precharged  = [target if kind in precharge_kinds      else 0 for kind, target in zip(kinds, targets)]
+  transitions = zip(activated, precharged)
+  banks_active = list(accumulate(transitions, lambda mask, transition: (mask & ~transition[1]) | transition[0], initial=0))[1:]
+
+  # Group the commands with an effect on pages by bank, broadcast precharges are expanded to all the banks of the channel
+  all_banks     = 2**geometry.banks - 1
+  bank_commands = defaultdict(list)
+  for command_index, kind in enumerate(kinds):
+    if kind in page_kinds:
+      target = all_banks if kind in broadcast_precharge_kinds else targets[command_index]
+      while target:
+        bank_index = target.bit_length() - 1
+        bank_commands[bank_index].append(command_index)
+        target &= ~(1 << bank_index)
+
+  # Scan of the accessed columns for each bank, the page is reset by activations and precharges.
+  # A precharge of a single bank leaves its page inactive, a broadcast precharge leaves all the pages unused
+  page_read     = [0]     * count
+  page_written  = [0]     * count
+  page_inactive = [False] * count
+  for bank_index, command_indices in bank_commands.items():
+    bank_mask = 1 << bank_index
+    read      = 0
+    written   = 0
+    inactive  = False
+    for command_index in command_indices:
+      kind = kinds[command_index]
+      if kind == CommandKind.ACTIVATE:
+        read, written, inactive = 0, 0, False
+      elif kind in read_kinds:
+        read    |= 1 << columns[command_index]
+      elif kind in write_kinds:
+        written |= 1 << columns[command_index]
+
+      # Only the commands targeting this single bank report the page accessed
+      if targets[command_index] == bank_mask:
+        page_read     [command_index] = read
+        page_written  [command_index] = written
+        page_inactive [command_index] = inactive
+
+      if kind in broadcast_precharge_kinds:
+        read, written, inactive = 0, 0, False
+      elif kind in precharge_kinds:
+        read, written, inactive = 0, 0, True
+
+  return BankAnnotationColumns(
+    targets       = targets,
+    banks_active  = banks_active,
+    page_read     = page_read,
+    page_written  = page_written,
+    page_inactive = page_inactive,
+  )
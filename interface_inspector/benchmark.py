@@ -0,0 +1,378 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing    import get_context
+from typing             import (
+  Callable,
+  Iterable,
+)
+
+from . import stats
+from . import tracing
+
+from .vcd import VCDFile
+
+from .packet    import Packet
+from .annotator import Annotator
+
+from .traffic import (
+  APBTrafficGenerator,
+  AXITrafficGenerator,
+  DDR5TrafficGenerator,
+  HBM2eTrafficGenerator,
+  generate_vcd,
+  packet_record,
+)
+
+from .apb import APBInterface
+from .axi import AXIInterface
+
+from .ddr import (
+  DDR5Interface,
+  DDR5BankAnnotator,
+  DDR5PageAnnotator,
+  DDR5DataAnnotator,
+)
+
+from .hbm import (
+  HBM2eInterface,
+  HBM2eBankAnnotator,
+  HBM2ePageAnnotator,
+  HBM2eDataAnnotator,
+)
+
+
+
+
+
+
+# Sizes of the generated dumps, from 10 MB to 10 GB
+default_sizes = ("10MB", "100MB", "1GB", "10GB")
+
+# Multipliers of the size suffixes
+size_units = {"KB": 10**3, "MB": 10**6, "GB": 10**9}
+
+# Packets of each stream kept for the annotation and rendering stages, so that their memory doesn't grow with the dump
+default_sample_packets = 100000
+
+# Relative slowdown or memory increase over the baseline flagged as a regression
+default_tolerance = 0.10
+
+# Absolute slowdown under which the timing noise of short stages is not flagged as a regression
+minimum_slowdown = 0.05
+
+# Path of each interface in the generated dumps
+apb_path   = "top.apb"
+axi_path   = "top.axi"
+ddr5_path  = "top.ddr5"
+hbm2e_path = "top.hbm2e"
+
+def parse_size(size:str) -> int:
+  """ Number of bytes of a size with an optional KB, MB or GB suffix. """
+  size = size.strip().upper()
+  for suffix, multiplier in size_units.items():
+    if size.endswith(suffix):
+      return int(float(size[:-len(suffix)]) * multiplier)
+  return int(size)
+
+def traffic_generators() -> list:
+  """ Traffic of all the interfaces of the benchmark dumps, with fixed seeds so that dumps of the same size are identical. """
+  return [APBTrafficGenerator   (apb_path,   seed=1),
+          AXITrafficGenerator   (axi_path,   seed=2),
+          DDR5TrafficGenerator  (ddr5_path,  seed=3),
+          HBM2eTrafficGenerator (hbm2e_path, seed=4)]
+
+
+
+
+
+
+def reset_peak_rss() -> None:
+  """ Reset the peak resident set size of the process, only possible on Linux. """
+  try:
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+      clear_refs.write("5")
+  except OSError:
+    pass
+
+def peak_rss() -> int:
+  """ Peak resident set size of the process in bytes, since the last reset on Linux or since the start of the process elsewhere. """
+  try:
+    with open("/proc/self/status") as status:
+      for line in status:
+        if line.startswith("VmHWM:"):
+          return int(line.split()[1]) * 1024
+  except OSError:
+    pass
+  # The maximum resident set size is in bytes on macOS and in kilobytes elsewhere
+  max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+class Stages:
+  """ Time, peak memory and item count of the stages of a benchmark run. """
+
+  def __init__(self):
+    """ At initialization, no stage was measured. """
+    self.results = {}
+
+  def measure(self, name:str, function:Callable, count:Callable=None, timed:Callable=None):
+    """ Run a stage and record its duration and peak memory, and the number of items it processed with the throughput if a count function is given.
+        If a timed function is given, the duration is the part of the stage it returns from the result instead of the whole stage. """
+    reset_peak_rss()
+    with tracing.span(name, "benchmark"):
+      start   = time.perf_counter()
+      result  = function()
+      seconds = time.perf_counter() - start
+    if timed is not None:
+      seconds = timed(result)
+    self.results[name] = {"seconds": seconds, "peak_rss": peak_rss()}
+    if count is not None:
+      items = count(result)
+      self.results[name]["items"]            = items
+      self.results[name]["items_per_second"] = items / seconds if seconds else None
+    print(f"  {name:<40} {seconds:10.3f} s {self.results[name]['peak_rss'] / 2**20:10.1f} MiB", flush=True)
+    return result
+
+
+
+
+
+
+def annotate(packets:list[Packet], annotators:Iterable[Annotator]) -> int:
+  """ Update the annotators with all the packets and render their annotations, without rendering the packets. """
+  annotators  = tuple(annotators)
+  annotations = 0
+  for packet in packets:
+    for annotator in annotators:
+      if annotator.accepts(type(packet)):
+        annotator.update(packet)
+        annotator.render()
+      else:
+        annotator.render_idle()
+      annotations += 1
+  return annotations
+
+def render(packets:list[Packet]) -> int:
+  """ Render all the packets, without annotations. """
+  for packet in packets:
+    repr(packet)
+  return len(packets)
+
+def expected_records(expected_path:str, path:str, stream:str) -> Iterable[dict]:
+  """ Expected packets of a stream of a generated dump as records, in order, read line by line. """
+  with open(expected_path) as expected_file:
+    for line in expected_file:
+      record = json.loads(line)
+      if record.pop("interface") == path and record.pop("stream") == stream:
+        yield record
+
+def decode_stream(packets:Iterable[Packet], expected:Iterable[dict], sample_packets:int) -> tuple[int, float, int, list[Packet], dict]:
+  """ Decode all the packets of a stream and compare their fields to the expected records, keeping only the first packets as a sample.
+      Returns the number of packets decoded and the time spent decoding them without the comparison, the number of expected packets, the sample, and the first mismatch if any. """
+  sample         = []
+  mismatch       = None
+  decoded        = 0
+  decode_seconds = 0.0
+  expected_count = 0
+  expected       = iter(expected)
+  packets        = iter(packets)
+  while True:
+    start  = time.perf_counter()
+    packet = next(packets, None)
+    decode_seconds += time.perf_counter() - start
+    if packet is None: break
+    decoded += 1
+    if len(sample) < sample_packets:
+      sample.append(packet)
+
+    # Packets missing from the expected ones are mismatches, and the expected ones not decoded are counted at the end
+    record          = packet_record(packet)
+    expected_record = next(expected, None)
+    if expected_record is not None:
+      expected_count += 1
+    if mismatch is None and record != expected_record:
+      mismatch = {"index": decoded - 1, "decoded": record, "expected": expected_record}
+  expected_count += sum(1 for record in expected)
+  return decoded, decode_seconds, expected_count, sample, mismatch
+
+def decode_dump(stages:Stages, vcd_path:str, expected_path:str, parse_processes:int, sample_packets:int) -> tuple[dict, list[str]]:
+  """ Measure the parsing of a dump, the materialization of the signals, and the decoding of each stream checked against the expected packets.
+      Returns a sample of the packets of each stream and the mismatches found. The parsed dump is released on return, but for the signals referenced by the sampled data bursts. """
+
+  # Parsing of the dump and materialization of the signals when the interfaces are built
+  apb_generator, axi_generator, ddr5_generator, hbm2e_generator = traffic_generators()
+  vcd_file = stages.measure("parse", lambda: VCDFile(vcd_path, processes=parse_processes))
+  apb_interface, axi_interface, ddr5_interface, hbm2e_interface = stages.measure("get_signal", lambda: (
+    APBInterface   (vcd_file, apb_generator.interface_paths()),
+    AXIInterface   (vcd_file, axi_generator.interface_paths()),
+    DDR5Interface  (vcd_file, path=ddr5_path),
+    HBM2eInterface (vcd_file, path=hbm2e_path),
+  ))
+
+  # Decoding of each stream, only a sample of the packets is kept for the annotation and rendering stages
+  streams = {
+    (apb_path,   "transactions")       : apb_interface   .transactions,
+    (axi_path,   "write_transactions") : axi_interface   .write_transactions,
+    (axi_path,   "read_transactions")  : axi_interface   .read_transactions,
+    (ddr5_path,  "commands")           : ddr5_interface  .commands,
+    (hbm2e_path, "row_commands")       : hbm2e_interface .row_commands,
+    (hbm2e_path, "column_commands")    : hbm2e_interface .column_commands,
+  }
+  samples    = {}
+  mismatches = []
+  for (path, stream), packet_generator in streams.items():
+    name = f"decode {path}.{stream}"
+    decoded, decode_seconds, expected_count, samples[path, stream], mismatch = stages.measure(name,
+      lambda: decode_stream(packet_generator(), expected_records(expected_path, path, stream), sample_packets),
+      count = lambda result: result[0],
+      timed = lambda result: result[1])
+    stages.results[name]["expected_items"] = expected_count
+    if decoded != expected_count:
+      mismatches.append(f"{path}.{stream}: {decoded} packets decoded, {expected_count} expected")
+    if mismatch is not None:
+      mismatches.append(f"{path}.{stream}: packet {mismatch['index']} decoded as {mismatch['decoded']}, expected {mismatch['expected']}")
+  return samples, mismatches
+
+def run_dump(vcd_path:str, expected_path:str, stats_path:str=None, trace_path:str=None, parse_processes:int=1, sample_packets:int=default_sample_packets) -> tuple[dict, list[str]]:
+  """ Measure all the stages on a dump: parsing with some processes, signal materialization, decoding of each stream, annotation and rendering of a sample of the packets.
+      Returns the results of the stages and the mismatches of the decoded packets with the expected ones. The instrumentation statistics and the trace are collected and written to JSON files if paths are given. """
+  stages = Stages()
+  if stats_path is not None:
+    stats.enable_stats()
+  if trace_path is not None:
+    tracing.enable_tracing(f"benchmark {os.path.basename(vcd_path)}")
+  print(f"{vcd_path} ({os.path.getsize(vcd_path) / 10**6:.1f} MB)", flush=True)
+
+  samples, mismatches = decode_dump(stages, vcd_path, expected_path, parse_processes, sample_packets)
+  for mismatch in mismatches:
+    print(f"  mismatch: {mismatch}", flush=True)
+
+  # Annotation and rendering of the samples, the HBM2e row and column commands are merged up to the end of the shortest sample
+  ddr5_commands  = samples[ddr5_path, "commands"]
+  hbm2e_samples  = (samples[hbm2e_path, "row_commands"], samples[hbm2e_path, "column_commands"])
+  hbm2e_end      = min((sample[-1].timestamp for sample in hbm2e_samples if len(sample) == sample_packets), default=None)
+  hbm2e_commands = [command for sample in hbm2e_samples for command in sample if hbm2e_end is None or command.timestamp <= hbm2e_end]
+  hbm2e_commands.sort(key=lambda command: command.timestamp)
+  stages.measure("annotate ddr5",  lambda: annotate(ddr5_commands,  (DDR5BankAnnotator(),  DDR5PageAnnotator(),  DDR5DataAnnotator())),  int)
+  stages.measure("annotate hbm2e", lambda: annotate(hbm2e_commands, (HBM2eBankAnnotator(), HBM2ePageAnnotator(), HBM2eDataAnnotator())), int)
+  for (path, stream), sample in samples.items():
+    stages.measure(f"render {path}.{stream}", lambda: render(sample), int)
+
+  if stats_path is not None:
+    stats.dump_stats(stats_path)
+  if trace_path is not None:
+    tracing.write_trace(trace_path)
+  return stages.results, mismatches
+
+
+
+
+
+
+def prepare_dump(dumps_directory:str, size:str) -> tuple[str, str]:
+  """ Generate the dump of a size and its expected packets, unless they were already generated. """
+  os.makedirs(dumps_directory, exist_ok=True)
+  vcd_path      = os.path.join(dumps_directory, f"traffic_{size}.vcd")
+  expected_path = os.path.join(dumps_directory, f"traffic_{size}.jsonl")
+  if not (os.path.exists(vcd_path) and os.path.exists(expected_path)):
+    print(f"Generating {vcd_path}", flush=True)
+    start = time.perf_counter()
+    generate_vcd(vcd_path + ".partial", traffic_generators(), parse_size(size), expected_path=expected_path)
+    os.replace(vcd_path + ".partial", vcd_path)
+    print(f"  generated in {time.perf_counter() - start:.1f} s", flush=True)
+  return vcd_path, expected_path
+
+def run_benchmarks(sizes:Iterable[str], dumps_directory:str, stats_directory:str=None, trace_directory:str=None, parse_processes:int=1, sample_packets:int=default_sample_packets) -> dict:
+  """ Run the benchmarks on the dumps of all the sizes, each in a fresh process so that the memory of a run doesn't affect the next. The traces of all the processes are merged in a single file.
+      The mismatches of the decoded packets with the expected ones are listed by size. """
+  results = {
+    "environment": {
+      "python"    : platform.python_version(),
+      "platform"  : platform.platform(),
+      "processor" : platform.processor(),
+    },
+    "sizes"      : {},
+    "mismatches" : {},
+  }
+  trace_paths = []
+  for size in sizes:
+    vcd_path, expected_path = prepare_dump(dumps_directory, size)
+    stats_path = None
+    trace_path = None
+    if stats_directory is not None:
+      os.makedirs(stats_directory, exist_ok=True)
+      stats_path = os.path.join(stats_directory, f"stats_{size}.json")
+    if trace_directory is not None:
+      os.makedirs(trace_directory, exist_ok=True)
+      trace_path = os.path.join(trace_directory, f"trace_{size}.json")
+      trace_paths.append(trace_path)
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+      results["sizes"][size], results["mismatches"][size] = executor.submit(run_dump, vcd_path, expected_path, stats_path, trace_path, parse_processes, sample_packets).result()
+  if trace_paths:
+    tracing.merge_traces(trace_paths, os.path.join(trace_directory, "trace.json"))
+  return results
+
+def compare_to_baseline(results:dict, baseline:dict, tolerance:float=default_tolerance) -> list[str]:
+  """ Regressions of the results over a baseline, for the stages measured in both, in time or peak memory. """
+  regressions = []
+  for size, stages in results["sizes"].items():
+    for name, stage in stages.items():
+      baseline_stage = baseline.get("sizes", {}).get(size, {}).get(name)
+      if baseline_stage is None: continue
+      for metric in ("seconds", "peak_rss"):
+        if metric == "seconds" and stage[metric] - baseline_stage[metric] < minimum_slowdown: continue
+        if stage[metric] > baseline_stage[metric] * (1 + tolerance):
+          regressions.append(f"{size} {name}: {metric} {baseline_stage[metric]:.6g} -> {stage[metric]:.6g} ({stage[metric] / baseline_stage[metric] - 1:+.0%})")
+      if stage.get("items") != baseline_stage.get("items"):
+        regressions.append(f"{size} {name}: items {baseline_stage.get('items')} -> {stage.get('items')}")
+  return regressions
+
+
+
+
+
+
+def main(arguments:list[str]=None) -> int:
+  """ Command line entry point, run with `python -m interface_inspector.benchmark`. """
+  parser = argparse.ArgumentParser(description="Benchmark the decoders on generated dumps of increasing size.")
+  parser.add_argument("--sizes",           nargs="+", default=default_sizes,       help="sizes of the dumps, with KB, MB or GB suffixes")
+  parser.add_argument("--dumps",           default="benchmark_dumps",               help="directory of the generated dumps, reused between runs")
+  parser.add_argument("--output",          default=None,                            help="path of the JSON results")
+  parser.add_argument("--baseline",        default=None,                            help="path of the JSON baseline to compare the results to")
+  parser.add_argument("--tolerance",       type=float, default=default_tolerance,   help="relative increase over the baseline flagged as a regression")
+  parser.add_argument("--stats",           default=None,                            help="directory of the JSON instrumentation statistics of each dump, collected only if given")
+  parser.add_argument("--trace",           default=None,                            help="directory of the Chrome trace files of each dump and of their merge, recorded only if given")
+  parser.add_argument("--parse-processes", type=int, default=1,                     help="processes parsing the value changes of each dump in parallel")
+  parser.add_argument("--sample-packets",  type=int, default=default_sample_packets, help="packets of each stream annotated and rendered")
+  arguments = parser.parse_args(arguments)
+
+  results = run_benchmarks(arguments.sizes, arguments.dumps, arguments.stats, arguments.trace, arguments.parse_processes, arguments.sample_packets)
+  if arguments.output:
+    with open(arguments.output, "w") as output_file:
+      json.dump(results, output_file, indent=2)
+
+  # Packets decoded differently from the generated ones make the benchmark fail
+  failed = any(results["mismatches"].values())
+  if failed:
+    print("decoded packets don't match the expected packets")
+
+  # Regressions are reported and make the benchmark fail
+  if arguments.baseline:
+    with open(arguments.baseline) as baseline_file:
+      baseline = json.load(baseline_file)
+    regressions = compare_to_baseline(results, baseline, arguments.tolerance)
+    for regression in regressions:
+      print(f"regression: {regression}")
+    if regressions:
+      return 1
+    print("no regression")
+  return 1 if failed else 0
+
+if __name__ == "__main__":
+  sys.exit(main())
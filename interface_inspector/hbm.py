@@ -1,24 +1,41 @@
 from dataclasses import dataclass
-from enum        import Enum
-from typing      import Generator
+from bisect      import bisect_left, bisect_right
+from functools   import lru_cache
+from typing      import (
+  Generator,
+  Iterable,
+)
+
+from . import stats
 
 from .vcd import (
   VCDFile,
   VCDValue,
+  StrobedBurstValue,
   ComparisonOperation,
   EdgePolarity,
 )
 
 from .utils import (
-  change_case,
   packet_string,
   Color,
   remove_colors,
 )
 
-from .packet    import Packet
-from .interface import Interface
-from .annotator import Annotator
+from .packet      import Packet
+from .interface   import Interface
+from .annotator   import Annotator, handles
+from .wide_values import WideValueColumn
+from .batch       import (
+  BankAnnotationColumns,
+  BankGeometry,
+  CommandKind,
+  CommandTable,
+  annotate_command_table,
+  rank_kinds,
+  read_kinds,
+  write_kinds,
+)
 
 
 
@@ -37,16 +54,93 @@ data_bus_width = 64
 data_width     = data_bus_width * burst_length
 
 enable_data_bus_inversion = True
+
+column_address_width = 5 # Only CA1 to CA5 in HBM2e mode
+row_address_width    = 15
+bank_address_width   = 4
+stack_id_width       = 1
+
+columns_per_row            = 2**column_address_width
+rows_per_bank              = 2**row_address_width
+banks_per_stack            = 2**bank_address_width
+banks_per_pseudo_channel   = 2**stack_id_width * banks_per_stack
+pseudo_channel_per_channel = 2
+banks_per_channel          = pseudo_channel_per_channel * banks_per_pseudo_channel
+
+def hbm2e_bank_index(pseudo_channel:int|None, stack_id:int|None, bank_address:int|None) -> int|None:
+  """ Index in the channel of the bank addressed by a command, None if the address is unknown. """
+  if pseudo_channel is None or stack_id is None or bank_address is None:
+    return None
+  return pseudo_channel * banks_per_pseudo_channel  +  stack_id * banks_per_stack  +  bank_address
+
+def hbm2e_column_index(column_address:int|None) -> int|None:
+  """ Index in the page of the column addressed by a command, None if the address is unknown. """
+  if column_address is None:
+    return None
+  return column_address // 2
+
+# Bitmask of the bytes of a beat to invert, for each value of the DBI bits of a pseudo-channel
+data_bus_inversion_width = data_bus_width // 8
+data_bus_inversion_masks = tuple(sum(0xFF << (byte_index * 8) for byte_index in range(data_bus_inversion_width) if data_bus_inversion >> byte_index & 1)
+                                 for data_bus_inversion in range(2**data_bus_inversion_width))
+
+def hbm2e_decode_beat(data:int, data_bus_inversion:int, pseudo_channel:int) -> int:
+  """ Decode a beat of a pseudo-channel from the whole DQ and DBI buses as ints, with shifts and masks. """
+
+  # Read the half of the data bus corresponding to the pseudo-channel
+  beat = data >> (pseudo_channel * data_bus_width) & (2**data_bus_width - 1)
+
+  # Data bus inversion of all bytes at once
+  if enable_data_bus_inversion:
+    beat ^= data_bus_inversion_masks[data_bus_inversion >> (pseudo_channel * data_bus_inversion_width) & (2**data_bus_inversion_width - 1)]
+
+  # Switch the two halves of the data beat
+  half_width = data_bus_width // 2
+  return (beat & (2**half_width - 1)) << half_width | beat >> half_width
+
+def hbm2e_decode_beat_value(data:VCDValue, data_bus_inversion:VCDValue, pseudo_channel:int) -> VCDValue:
+  """ Decode a beat of a pseudo-channel from the whole DQ and DBI buses as VCDValues, for beats with X or Z. """
+
+  # Read the half of the data bus corresponding to the pseudo-channel
+  data_beat = data[pseudo_channel * data_bus_width : (pseudo_channel+1) * data_bus_width]
+
+  # Data bus inversion
+  if enable_data_bus_inversion:
+    data_bus_inversion_beat = data_bus_inversion[pseudo_channel * data_bus_inversion_width : (pseudo_channel+1) * data_bus_inversion_width]
+    for byte_index in range(data_bus_inversion_beat.width):
+      if data_bus_inversion_beat[byte_index]:
+        data_byte_slice = slice(byte_index * 8, (byte_index+1) * 8)
+        data_beat[data_byte_slice] = ~data_beat[data_byte_slice]
+
+  # Switch the two halves of the data beat
+  return data_beat[:len(data_beat)//2] ** data_beat[len(data_beat)//2:]
+
+def hbm2e_decode_beats(data:list[VCDValue], data_bus_inversion:list[VCDValue], pseudo_channel:int) -> list[str]:
+  """ Decode all the beats of a pseudo-channel sampled at once, as binary strings. Beats with X or Z are decoded as VCDValues. """
+  beats = []
+  for data_value, data_bus_inversion_value in zip(data, data_bus_inversion):
+    if data_value.has_xz or (enable_data_bus_inversion and data_bus_inversion_value.has_xz):
+      beats.append(hbm2e_decode_beat_value(data_value, data_bus_inversion_value, pseudo_channel).value)
+    else:
+      data_bus_inversion_int = int(data_bus_inversion_value.value, 2) if enable_data_bus_inversion else 0
+      beats.append(format(hbm2e_decode_beat(int(data_value.value, 2), data_bus_inversion_int, pseudo_channel), f"0{data_bus_width}b"))
+  return beats
+
 class HBM2eCommand(Packet):
   """ HBM2e command base type. """
+  __slots__ = ("timestamp",)
 
 class HBM2eRowCommand(HBM2eCommand):
   """ HBM2e row command base type. """
+  __slots__ = ()
 
 class HBM2eRowCommand_Error(HBM2eRowCommand):
   """ HBM2e incorrect row command. """
+  fields    = ()
+  __slots__ = fields
   def __init__(self, timestamp:int):
     self.timestamp = timestamp
+    self.store_fields()
   def __repr__(self):
     return packet_string(
       timestamp  = self.timestamp,
@@ -62,6 +156,8 @@ class HBM2eRowCommand_Error(HBM2eRowCommand):
 
 class HBM2eRowCommand_Activate(HBM2eRowCommand):
   """ HBM2e activate row command. """
+  fields    = ("parity", "pseudo_channel", "stack_id", "bank_address", "row_address")
+  __slots__ = fields + ("bank_index",)
   def __init__(self,
                timestamp      : int,
                parity         : VCDValue,
@@ -69,20 +165,18 @@ class HBM2eRowCommand_Activate(HBM2eRowCommand):
                stack_id       : VCDValue,
                bank_address   : VCDValue,
                row_address    : VCDValue):
-    self.timestamp      = timestamp
-    self.parity         = parity
-    self.pseudo_channel = pseudo_channel
-    self.stack_id       = stack_id
-    self.bank_address   = bank_address
-    self.row_address    = row_address
+    self.timestamp  = timestamp
+    self.store_fields(parity, pseudo_channel, stack_id, bank_address, row_address)
+    # Indices precomputed at decode for the annotators
+    self.bank_index = hbm2e_bank_index(self.pseudo_channel, self.stack_id, self.bank_address)
   def __repr__(self):
     return packet_string(
       timestamp  = self.timestamp,
       command    = "ACT",
-      parameters = {"PS":  self.pseudo_channel .decimal(),
-                    "SID": self.stack_id       .decimal(),
-                    "BA":  self.bank_address   .decimal(),
-                    "RA":  self.row_address    .decimal()},
+      parameters = {"PS":  self.pseudo_channel,
+                    "SID": self.stack_id,
+                    "BA":  self.bank_address,
+                    "RA":  self.row_address},
       context    = "R",
       color      = Color.BG_RED,
       command_width = command_width,
@@ -93,24 +187,25 @@ class HBM2eRowCommand_Activate(HBM2eRowCommand):
 
 class HBM2eRowCommand_Precharge(HBM2eRowCommand):
   """ HBM2e precharge row command. """
+  fields    = ("parity", "pseudo_channel", "stack_id", "bank_address")
+  __slots__ = fields + ("bank_index",)
   def __init__(self,
                timestamp      : int,
                parity         : VCDValue,
                pseudo_channel : VCDValue,
                stack_id       : VCDValue,
                bank_address   : VCDValue):
-    self.timestamp      = timestamp
-    self.parity         = parity
-    self.pseudo_channel = pseudo_channel
-    self.stack_id       = stack_id
-    self.bank_address   = bank_address
+    self.timestamp  = timestamp
+    self.store_fields(parity, pseudo_channel, stack_id, bank_address)
+    # Indices precomputed at decode for the annotators
+    self.bank_index = hbm2e_bank_index(self.pseudo_channel, self.stack_id, self.bank_address)
   def __repr__(self):
     return packet_string(
       timestamp  = self.timestamp,
       command    = "PRE",
-      parameters = {"PS":  self.pseudo_channel .decimal(),
-                    "SID": self.stack_id       .decimal(),
-                    "BA":  self.bank_address   .decimal()},
+      parameters = {"PS":  self.pseudo_channel,
+                    "SID": self.stack_id,
+                    "BA":  self.bank_address},
       context    = "R",
       color      = Color.BG_GREEN,
       command_width = command_width,
@@ -121,18 +216,19 @@ class HBM2eRowCommand_Precharge(HBM2eRowCommand):
 
 class HBM2eRowCommand_PrechargeAll(HBM2eRowCommand):
   """ HBM2e precharge-all row command. """
+  fields    = ("parity", "pseudo_channel")
+  __slots__ = fields
   def __init__(self,
                timestamp      : int,
                parity         : VCDValue,
                pseudo_channel : VCDValue):
-    self.timestamp      = timestamp
-    self.parity         = parity
-    self.pseudo_channel = pseudo_channel
+    self.timestamp = timestamp
+    self.store_fields(parity, pseudo_channel)
   def __repr__(self):
     return packet_string(
       timestamp  = self.timestamp,
       command    = "PREA",
-      parameters = {"PS": self.pseudo_channel.decimal()},
+      parameters = {"PS": self.pseudo_channel},
       context    = "R",
       color      = Color.BG_GREEN,
       command_width = command_width,
@@ -143,24 +239,25 @@ class HBM2eRowCommand_PrechargeAll(HBM2eRowCommand):
 
 class HBM2eRowCommand_SingleBankRefresh(HBM2eRowCommand):
   """ HBM2e single-bank refresh row command. """
+  fields    = ("parity", "pseudo_channel", "stack_id", "bank_address")
+  __slots__ = fields + ("bank_index",)
   def __init__(self,
                timestamp      : int,
                parity         : VCDValue,
                pseudo_channel : VCDValue,
                stack_id       : VCDValue,
                bank_address   : VCDValue):
-    self.timestamp      = timestamp
-    self.parity         = parity
-    self.pseudo_channel = pseudo_channel
-    self.stack_id       = stack_id
-    self.bank_address   = bank_address
+    self.timestamp  = timestamp
+    self.store_fields(parity, pseudo_channel, stack_id, bank_address)
+    # Indices precomputed at decode for the annotators
+    self.bank_index = hbm2e_bank_index(self.pseudo_channel, self.stack_id, self.bank_address)
   def __repr__(self):
     return packet_string(
       timestamp  = self.timestamp,
       command    = "REFSB",
-      parameters = {"PS":  self.pseudo_channel .decimal(),
-                    "SID": self.stack_id       .decimal(),
-                    "BA":  self.bank_address   .decimal()},
+      parameters = {"PS":  self.pseudo_channel,
+                    "SID": self.stack_id,
+                    "BA":  self.bank_address},
       context    = "R",
       color      = Color.BG_BLUE,
       command_width = command_width,
@@ -171,18 +268,19 @@ class HBM2eRowCommand_SingleBankRefresh(HBM2eRowCommand):
 
 class HBM2eRowCommand_Refresh(HBM2eRowCommand):
   """ HBM2e refresh row command. """
+  fields    = ("parity", "pseudo_channel")
+  __slots__ = fields
   def __init__(self,
                timestamp      : int,
                parity         : VCDValue,
                pseudo_channel : VCDValue):
-    self.timestamp      = timestamp
-    self.parity         = parity
-    self.pseudo_channel = pseudo_channel
+    self.timestamp = timestamp
+    self.store_fields(parity, pseudo_channel)
   def __repr__(self):
     return packet_string(
       timestamp  = self.timestamp,
       command    = "REF",
-      parameters = {"PS": self.pseudo_channel.decimal()},
+      parameters = {"PS": self.pseudo_channel},
       context    = "R",
       color      = Color.BG_BLUE,
       command_width = command_width,
@@ -193,11 +291,13 @@ class HBM2eRowCommand_Refresh(HBM2eRowCommand):
 
 class HBM2eRowCommand_PowerDownEntry(HBM2eRowCommand):
   """ HBM2e power-down entry row command. """
+  fields    = ("parity",)
+  __slots__ = fields
   def __init__(self,
                timestamp : int,
                parity    : VCDValue):
     self.timestamp = timestamp
-    self.parity    = parity
+    self.store_fields(parity)
   def __repr__(self):
     return packet_string(
       timestamp  = self.timestamp,
@@ -213,11 +313,13 @@ class HBM2eRowCommand_PowerDownEntry(HBM2eRowCommand):
 
 class HBM2eRowCommand_SelfRefreshEntry(HBM2eRowCommand):
   """ HBM2e self-refresh entry row command. """
+  fields    = ("parity",)
+  __slots__ = fields
   def __init__(self,
                timestamp : int,
                parity    : VCDValue):
     self.timestamp = timestamp
-    self.parity    = parity
+    self.store_fields(parity)
   def __repr__(self):
     return packet_string(
       timestamp  = self.timestamp,
@@ -233,8 +335,11 @@ class HBM2eRowCommand_SelfRefreshEntry(HBM2eRowCommand):
 
 class HBM2eRowCommand_PowerDownSelfRefreshExit(HBM2eRowCommand):
   """ HBM2e power-down or self-refresh exit row command. """
+  fields    = ()
+  __slots__ = fields
   def __init__(self, timestamp:int):
     self.timestamp = timestamp
+    self.store_fields()
   def __repr__(self):
     return packet_string(
       timestamp  = self.timestamp,
@@ -255,12 +360,15 @@ class HBM2eRowCommand_PowerDownSelfRefreshExit(HBM2eRowCommand):
 
 class HBM2eColumnCommand(HBM2eCommand):
   """ HBM2e column command base type. """
-  pass
+  __slots__ = ()
 
 class HBM2eColumnCommand_Error(HBM2eColumnCommand):
   """ HBM2e incorrect column command. """
+  fields    = ()
+  __slots__ = fields
   def __init__(self, timestamp:int):
     self.timestamp = timestamp
+    self.store_fields()
   def __repr__(self):
     return packet_string(
       timestamp  = self.timestamp,
@@ -276,6 +384,8 @@ class HBM2eColumnCommand_Error(HBM2eColumnCommand):
 
 class HBM2eColumnCommand_Read(HBM2eColumnCommand):
   """ HBM2e read column command. """
+  fields    = ("parity", "pseudo_channel", "stack_id", "bank_address", "column_address")
+  __slots__ = fields + ("data", "bank_index", "column_index")
   def __init__(self,
                timestamp      : int,
                parity         : VCDValue,
@@ -283,21 +393,20 @@ class HBM2eColumnCommand_Read(HBM2eColumnCommand):
                stack_id       : VCDValue,
                bank_address   : VCDValue,
                column_address : VCDValue):
-    self.timestamp      = timestamp
-    self.parity         = parity
-    self.pseudo_channel = pseudo_channel
-    self.stack_id       = stack_id
-    self.bank_address   = bank_address
-    self.column_address = column_address
-    self.data           = None
+    self.timestamp    = timestamp
+    self.store_fields(parity, pseudo_channel, stack_id, bank_address, column_address)
+    self.data         = None
+    # Indices precomputed at decode for the annotators
+    self.bank_index   = hbm2e_bank_index(self.pseudo_channel, self.stack_id, self.bank_address)
+    self.column_index = hbm2e_column_index(self.column_address)
   def __repr__(self):
     return packet_string(
       timestamp  = self.timestamp,
       command    = "RD",
-      parameters = {"PS":  self.pseudo_channel .decimal(),
-                    "SID": self.stack_id       .decimal(),
-                    "BA":  self.bank_address   .decimal(),
-                    "CA":  self.column_address .decimal()},
+      parameters = {"PS":  self.pseudo_channel,
+                    "SID": self.stack_id,
+                    "BA":  self.bank_address,
+                    "CA":  self.column_address},
       context    = "C",
       color      = Color.BG_YELLOW,
       command_width = command_width,
@@ -308,6 +417,8 @@ class HBM2eColumnCommand_Read(HBM2eColumnCommand):
 
 class HBM2eColumnCommand_ReadAutoPrecharge(HBM2eColumnCommand):
   """ HBM2e read with auto-precharge column command. """
+  fields    = ("parity", "pseudo_channel", "stack_id", "bank_address", "column_address")
+  __slots__ = fields + ("data", "bank_index", "column_index")
   def __init__(self,
                timestamp      : int,
                parity         : VCDValue,
@@ -315,21 +426,20 @@ class HBM2eColumnCommand_ReadAutoPrecharge(HBM2eColumnCommand):
                stack_id       : VCDValue,
                bank_address   : VCDValue,
                column_address : VCDValue):
-    self.timestamp      = timestamp
-    self.parity         = parity
-    self.pseudo_channel = pseudo_channel
-    self.stack_id       = stack_id
-    self.bank_address   = bank_address
-    self.column_address = column_address
-    self.data           = None
+    self.timestamp    = timestamp
+    self.store_fields(parity, pseudo_channel, stack_id, bank_address, column_address)
+    self.data         = None
+    # Indices precomputed at decode for the annotators
+    self.bank_index   = hbm2e_bank_index(self.pseudo_channel, self.stack_id, self.bank_address)
+    self.column_index = hbm2e_column_index(self.column_address)
   def __repr__(self):
     return packet_string(
       timestamp  = self.timestamp,
       command    = "RDA",
-      parameters = {"PS":  self.pseudo_channel .decimal(),
-                    "SID": self.stack_id       .decimal(),
-                    "BA":  self.bank_address   .decimal(),
-                    "CA":  self.column_address .decimal()},
+      parameters = {"PS":  self.pseudo_channel,
+                    "SID": self.stack_id,
+                    "BA":  self.bank_address,
+                    "CA":  self.column_address},
       context    = "C",
       color      = Color.BG_YELLOW,
       command_width = command_width,
@@ -340,6 +450,8 @@ class HBM2eColumnCommand_ReadAutoPrecharge(HBM2eColumnCommand):
 
 class HBM2eColumnCommand_Write(HBM2eColumnCommand):
   """ HBM2e write column command. """
+  fields    = ("parity", "pseudo_channel", "stack_id", "bank_address", "column_address")
+  __slots__ = fields + ("data", "bank_index", "column_index")
   def __init__(self,
                timestamp      : int,
                parity         : VCDValue,
@@ -347,21 +459,20 @@ class HBM2eColumnCommand_Write(HBM2eColumnCommand):
                stack_id       : VCDValue,
                bank_address   : VCDValue,
                column_address : VCDValue):
-    self.timestamp      = timestamp
-    self.parity         = parity
-    self.pseudo_channel = pseudo_channel
-    self.stack_id       = stack_id
-    self.bank_address   = bank_address
-    self.column_address = column_address
-    self.data           = None
+    self.timestamp    = timestamp
+    self.store_fields(parity, pseudo_channel, stack_id, bank_address, column_address)
+    self.data         = None
+    # Indices precomputed at decode for the annotators
+    self.bank_index   = hbm2e_bank_index(self.pseudo_channel, self.stack_id, self.bank_address)
+    self.column_index = hbm2e_column_index(self.column_address)
   def __repr__(self):
     return packet_string(
       timestamp  = self.timestamp,
       command    = "WR",
-      parameters = {"PS":  self.pseudo_channel .decimal(),
-                    "SID": self.stack_id       .decimal(),
-                    "BA":  self.bank_address   .decimal(),
-                    "CA":  self.column_address .decimal()},
+      parameters = {"PS":  self.pseudo_channel,
+                    "SID": self.stack_id,
+                    "BA":  self.bank_address,
+                    "CA":  self.column_address},
       context    = "C",
       color      = Color.BG_CYAN,
       command_width = command_width,
@@ -372,6 +483,8 @@ class HBM2eColumnCommand_Write(HBM2eColumnCommand):
 
 class HBM2eColumnCommand_WriteAutoPrecharge(HBM2eColumnCommand):
   """ HBM2e write with auto-precharge column command. """
+  fields    = ("parity", "pseudo_channel", "stack_id", "bank_address", "column_address")
+  __slots__ = fields + ("data", "bank_index", "column_index")
   def __init__(self,
                timestamp      : int,
                parity         : VCDValue,
@@ -379,21 +492,20 @@ class HBM2eColumnCommand_WriteAutoPrecharge(HBM2eColumnCommand):
                stack_id       : VCDValue,
                bank_address   : VCDValue,
                column_address : VCDValue):
-    self.timestamp      = timestamp
-    self.parity         = parity
-    self.pseudo_channel = pseudo_channel
-    self.stack_id       = stack_id
-    self.bank_address   = bank_address
-    self.column_address = column_address
-    self.data           = None
+    self.timestamp    = timestamp
+    self.store_fields(parity, pseudo_channel, stack_id, bank_address, column_address)
+    self.data         = None
+    # Indices precomputed at decode for the annotators
+    self.bank_index   = hbm2e_bank_index(self.pseudo_channel, self.stack_id, self.bank_address)
+    self.column_index = hbm2e_column_index(self.column_address)
   def __repr__(self):
     return packet_string(
       timestamp  = self.timestamp,
       command    = "WRA",
-      parameters = {"PS":  self.pseudo_channel .decimal(),
-                    "SID": self.stack_id       .decimal(),
-                    "BA":  self.bank_address   .decimal(),
-                    "CA":  self.column_address .decimal()},
+      parameters = {"PS":  self.pseudo_channel,
+                    "SID": self.stack_id,
+                    "BA":  self.bank_address,
+                    "CA":  self.column_address},
       context    = "C",
       color      = Color.BG_CYAN,
       command_width = command_width,
@@ -404,21 +516,21 @@ class HBM2eColumnCommand_WriteAutoPrecharge(HBM2eColumnCommand):
 
 class HBM2eColumnCommand_ModeRegisterSet(HBM2eColumnCommand):
   """ HBM2e mode register set column command. """
+  fields    = ("parity", "mode_register", "operation")
+  __slots__ = fields
   def __init__(self,
                timestamp     : int,
                parity        : VCDValue,
                mode_register : VCDValue,
                operation     : VCDValue):
-    self.timestamp     = timestamp
-    self.parity        = parity
-    self.mode_register = mode_register
-    self.operation     = operation
+    self.timestamp = timestamp
+    self.store_fields(parity, mode_register, operation)
   def __repr__(self):
     return packet_string(
       timestamp  = self.timestamp,
       command    = "MRS",
-      parameters = {"MR": self.mode_register .decimal(),
-                    "OP": self.operation     .decimal()},
+      parameters = {"MR": self.mode_register,
+                    "OP": self.operation},
       context    = "C",
       color      = Color.BG_MAGENTA,
       command_width = command_width,
@@ -451,9 +563,22 @@ class HBM2eInterfacePaths:
   DERR   : str = "DERR"
   AERR   : str = "AERR"
 
+@dataclass
+class HBM2eDataCapture:
+  """ Edges of the clock of a whole dump, with the edges of the data strobes and the decoded beats for each direction and pseudo-channel. """
+  clock_edges  : list[int]                                              # Rising edges of CK_C
+  strobe_edges : dict[tuple[bool, int], tuple[list[int], list[int]]]    # Edges of the t and c strobes, by write and pseudo-channel
+  beats        : dict[tuple[bool, int], tuple[list[str], list[str]]]    # Binary strings of the decoded beats at each edge
+
 class HBM2eInterface(Interface):
   """ An HBM2e interface with its VCD signals. """
 
+  paths_class = HBM2eInterfacePaths
+  uppercase   = True
+
+  # Signals checked before use by the decoder
+  optional_signals = ("DBI", "DM", "PAR", "DERR", "AERR")
+
   def __init__(self,
                vcd_file  : VCDFile,
                signals   : HBM2eInterfacePaths = None,
@@ -463,23 +588,10 @@ class HBM2eInterface(Interface):
                uppercase : bool                = True):
     """ Get all the signals of the HBM2e bus. """
     if signals is None:
-      self.paths = HBM2eInterfacePaths()
-      self.paths.CK_T   = f"{path}.{prefix}{change_case('CK_T',   uppercase)}{suffix}"
-      self.paths.CK_C   = f"{path}.{prefix}{change_case('CK_C',   uppercase)}{suffix}"
-      self.paths.CKE    = f"{path}.{prefix}{change_case('CKE',    uppercase)}{suffix}"
-      self.paths.R      = f"{path}.{prefix}{change_case('R',      uppercase)}{suffix}"
-      self.paths.C      = f"{path}.{prefix}{change_case('C',      uppercase)}{suffix}"
-      self.paths.RDQS_T = f"{path}.{prefix}{change_case('RDQS_T', uppercase)}{suffix}"
-      self.paths.RDQS_C = f"{path}.{prefix}{change_case('RDQS_C', uppercase)}{suffix}"
-      self.paths.WDQS_T = f"{path}.{prefix}{change_case('WDQS_T', uppercase)}{suffix}"
-      self.paths.WDQS_C = f"{path}.{prefix}{change_case('WDQS_C', uppercase)}{suffix}"
-      self.paths.DQ     = f"{path}.{prefix}{change_case('DQ',     uppercase)}{suffix}"
-      self.paths.DBI    = f"{path}.{prefix}{change_case('DBI',    uppercase)}{suffix}"
-      self.paths.DM     = f"{path}.{prefix}{change_case('DM',     uppercase)}{suffix}"
-      self.paths.PAR    = f"{path}.{prefix}{change_case('PAR',    uppercase)}{suffix}"
-      self.paths.DERR   = f"{path}.{prefix}{change_case('DERR',   uppercase)}{suffix}"
-      self.paths.AERR   = f"{path}.{prefix}{change_case('AERR',   uppercase)}{suffix}"
+      self.paths = self.interface_paths(path, prefix, suffix, uppercase)
     else: self.paths = signals
+    vcd_file.validate_paths(self.paths, self.optional_signals)
+    vcd_file.load_signals(vars(self.paths).values())
     self.CK_T   = vcd_file.get_signal( self.paths.CK_T   .split('.') )
     self.CK_C   = vcd_file.get_signal( self.paths.CK_C   .split('.') )
     self.CKE    = vcd_file.get_signal( self.paths.CKE    .split('.') )
@@ -495,6 +607,56 @@ class HBM2eInterface(Interface):
     self.PAR    = vcd_file.get_signal( self.paths.PAR    .split('.') )
     self.DERR   = vcd_file.get_signal( self.paths.DERR   .split('.') )
     self.AERR   = vcd_file.get_signal( self.paths.AERR   .split('.') )
+    # Separate cursor over the clock for the column commands, so that the row and column generators can run concurrently
+    self.CK_T_column = self.CK_T.copy()
+    # Bulk data capture, prepared on the first read or write
+    self.data_capture = None
+
+
+
+  def prepare_data_capture(self, write:bool, pseudo_channel:int) -> HBM2eDataCapture:
+    """ Find all the edges of the data strobes of a direction and pseudo-channel once, and decode the beats at all these edges in one batch. """
+    if self.data_capture is None:
+      self.data_capture = HBM2eDataCapture(
+        clock_edges  = self.CK_C.get_edge_timestamps(polarity=EdgePolarity.RISING),
+        strobe_edges = {},
+        beats        = {},
+      )
+
+    # Pseudo-channels use different halves of the *DQS buses
+    strobe_signals       = (self.WDQS_T, self.WDQS_C) if write else (self.RDQS_T, self.RDQS_C)
+    strobe_bus_reference = VCDValue("b11xx",4) if pseudo_channel == 1 else VCDValue("bxx11",4)
+    strobe_edges         = tuple(strobe_signal.get_edge_timestamps(value=strobe_bus_reference) for strobe_signal in strobe_signals)
+
+    # Sample and decode the beats at all the strobe edges
+    beats = []
+    for edges in strobe_edges:
+      data               = self.DQ.get_values_at_timestamps(edges)
+      data_bus_inversion = self.DBI.get_values_at_timestamps(edges) if enable_data_bus_inversion else data
+      beats.append(hbm2e_decode_beats(data, data_bus_inversion, pseudo_channel))
+
+    self.data_capture.strobe_edges [write, pseudo_channel] = strobe_edges
+    self.data_capture.beats        [write, pseudo_channel] = tuple(beats)
+    return self.data_capture
+
+
+
+  def capture_data_burst(self, timestamp:int, data_latency:int, write:bool, pseudo_channel:int) -> VCDValue:
+    """ Get the data burst of a column command from the precomputed edges and decoded beats, built only when first used. """
+    data_capture = self.data_capture
+    if data_capture is None or (write, pseudo_channel) not in data_capture.beats:
+      data_capture = self.prepare_data_capture(write, pseudo_channel)
+    strobe_edges = data_capture.strobe_edges [write, pseudo_channel]
+    beats        = data_capture.beats        [write, pseudo_channel]
+
+    # Use the CK_c to move half a tCK before the data burst
+    clock_index     = bisect_left(data_capture.clock_edges, timestamp)
+    clock_timestamp = data_capture.clock_edges[clock_index + data_latency - 1]
+
+    # The beats are captured alternately on the edges of the t and c data strobes after the clock edge,
+    # the burst only references the decoded beats from the index of its first beat on each strobe
+    strobe_indices = [bisect_right(edges, clock_timestamp) for edges in strobe_edges]
+    return StrobedBurstValue(beats, strobe_indices, burst_length, data_width)
 
 
 
@@ -624,7 +786,7 @@ class HBM2eInterface(Interface):
     """ Generator to iterate over all row commands. """
     while True:
       try:
-        next_row_command = self.next_row_command()
+        next_row_command = stats.decode(self.next_row_command)
         if next_row_command:
           yield next_row_command
         else: return
@@ -640,11 +802,11 @@ class HBM2eInterface(Interface):
     if sample_C is None: return None
 
     # First word of the column command
-    timestamp_column_command_w0 = self.CK_T.get_edge_at_timestamp(sample_C.timestamp, polarity=EdgePolarity.RISING, move=True).timestamp
+    timestamp_column_command_w0 = self.CK_T_column.get_edge_at_timestamp(sample_C.timestamp, polarity=EdgePolarity.RISING, move=True).timestamp
     column_command_w0 = self.C.get_at_timestamp(timestamp_column_command_w0, move=True).value
 
     # Second word of the column command
-    timestamp_column_command_w1 = self.CK_T.get_edge(polarity=EdgePolarity.FALLING, move=True).timestamp
+    timestamp_column_command_w1 = self.CK_T_column.get_edge(polarity=EdgePolarity.FALLING, move=True).timestamp
     column_command_w1 = self.C.get_at_timestamp(timestamp_column_command_w1, move=True).value
 
     # Decode the column command function using the truth table
@@ -734,73 +896,19 @@ class HBM2eInterface(Interface):
       )
 
     # Fetch the data
-    data_latency    = None
-    strobe_signal_t = None
+    data_latency = None
+    write        = None
     if column_command_function in [HBM2eColumnCommand_Read, HBM2eColumnCommand_ReadAutoPrecharge]:
-      data_latency    = read_latency
-      strobe_signal_t = self.RDQS_T
-      strobe_signal_c = self.RDQS_C
+      data_latency = read_latency
+      write        = False
     elif column_command_function in [HBM2eColumnCommand_Write, HBM2eColumnCommand_WriteAutoPrecharge]:
-      data_latency    = write_latency
-      strobe_signal_t = self.WDQS_T
-      strobe_signal_c = self.WDQS_C
+      data_latency = write_latency
+      write        = True
 
     if data_latency is not None:
-
       # Pseudo-channels use different halves of the DQ and *DQS buses
-      data_bus_slice       = None
-      auxiliary_bus_slice  = None
-      strobe_bus_reference = None
-      if column_command.pseudo_channel.decimal() == 1:
-        data_bus_slice       = slice(64,128)
-        auxiliary_bus_slice  = slice(8,16)
-        strobe_bus_reference = VCDValue("b11xx",4)
-      else:
-        data_bus_slice       = slice(0,64)
-        auxiliary_bus_slice  = slice(0,8)
-        strobe_bus_reference = VCDValue("bxx11",4)
-
-      # Use the CK_c to move half a tCK before the data burst
-      self.CK_C.get_edge_at_timestamp(timestamp_column_command_w0, move=True)
-      for t_ck in range(data_latency-1):
-        self.CK_C.get_edge(move=True)
-
-      # Move to the first beat using the read strobe
-      strobe_signal_t.get_at_timestamp(self.CK_C.current_sample.timestamp, move=True)
-      strobe_signal_c.get_at_timestamp(self.CK_C.current_sample.timestamp, move=True)
-
-      # Capture the beats of the data burst
-      beat_timestamp = None
-      even_beat      = True
-      data_burst     = VCDValue.none()
-      for beat in range(burst_length):
-
-        # Capture on rising edge of the t or c data strobe
-        if even_beat:
-          beat_timestamp = strobe_signal_t.get_edge(value=strobe_bus_reference, move=True).timestamp
-        else:
-          beat_timestamp = strobe_signal_c.get_edge(value=strobe_bus_reference, move=True).timestamp
-        even_beat = not even_beat
-
-        # Read the half of the data bus corresponding to the pseudo-channel
-        data_beat = self.DQ.get_at_timestamp(beat_timestamp, move=True).value[data_bus_slice]
-
-        # Data bus inversion
-        if enable_data_bus_inversion:
-          data_bus_inversion_beat = self.DBI.get_at_timestamp(beat_timestamp, move=True).value[auxiliary_bus_slice]
-          for byte_index in range(data_bus_inversion_beat.width):
-            if data_bus_inversion_beat[byte_index]:
-              data_byte_slice = slice(byte_index * 8, (byte_index+1) * 8)
-              data_beat[data_byte_slice] = ~data_beat[data_byte_slice]
-
-        # Switch the two halves of the data beat
-        data_beat = data_beat[:len(data_beat)//2] ** data_beat[len(data_beat)//2:]
-
-        # Append the data to the burst
-        data_burst **= data_beat
-
-      # Set the data of the command
-      column_command.data = data_burst
+      pseudo_channel = 1 if column_command.pseudo_channel == 1 else 0
+      column_command.data = self.capture_data_burst(timestamp_column_command_w0, data_latency, write, pseudo_channel)
 
     return column_command
 
@@ -810,7 +918,7 @@ class HBM2eInterface(Interface):
     """ Generator to iterate over all column commands. """
     while True:
       try:
-        next_column_command = self.next_column_command()
+        next_column_command = stats.decode(self.next_column_command)
         if next_column_command:
           yield next_column_command
         else: return
@@ -821,18 +929,6 @@ class HBM2eInterface(Interface):
 
 
 
-column_address_width = 5 # Only CA1 to CA5 in HBM2e mode
-row_address_width    = 15
-bank_address_width   = 4
-stack_id_width       = 1
-
-columns_per_row            = 2**column_address_width
-rows_per_bank              = 2**row_address_width
-banks_per_stack            = 2**bank_address_width
-banks_per_pseudo_channel   = 2**stack_id_width * banks_per_stack
-pseudo_channel_per_channel = 2
-banks_per_channel          = pseudo_channel_per_channel * banks_per_pseudo_channel
-
 symbol_bank_inactive        = Color.FAINT  + '│' + Color.RESET
 symbol_bank_activate        = Color.RED    + '█' + Color.RESET
 symbol_bank_precharge       = Color.GREEN  + '█' + Color.RESET
@@ -843,106 +939,111 @@ symbol_bank_write_precharge = Color.CYAN   + '█' + Color.RESET
 symbol_bank_refresh         = Color.BLUE   + '█' + Color.RESET
 symbol_bank_idle            =                '┃'
 
+@lru_cache(maxsize=None)
+def pseudo_channel_banks(pseudo_channel:int) -> range:
+  """ Indices of all the banks of a pseudo-channel. """
+  return range(pseudo_channel * banks_per_pseudo_channel, (pseudo_channel + 1) * banks_per_pseudo_channel)
+
 class HBM2eBankAnnotator(Annotator):
   """ Display the status and activity of all banks. """
 
+  __slots__ = ("banks_active", "banks_symbols", "banks_string", "overlay", "annotation_string")
+
   def __init__(self):
     """ At initialization, all banks are considered inactive and the annotation string is empty. """
     self.banks_active      = [False] * banks_per_channel
+    self.banks_symbols     = [symbol_bank_inactive] * banks_per_channel
+    self.banks_string      = None
+    self.overlay           = {}
     self.annotation_string = " "     * banks_per_channel
 
+  def set_bank_active(self, bank_index:int, active:bool):
+    """ Update the status of a bank, and its symbol in the base line only if the status changes. """
+    if self.banks_active[bank_index] != active:
+      self.banks_active[bank_index]  = active
+      self.banks_symbols[bank_index] = symbol_bank_idle if active else symbol_bank_inactive
+      self.banks_string = None
+
   def update(self, command:HBM2eCommand):
     """ Update the annotator status and string with a command. """
+    # The base line of activated and inactive banks is cached, only the banks targeted by the command are overlaid on it
+    self.overlay           = {}
+    self.annotation_string = None
+    # Only row and column commands that affect the bank status or perform operations on banks have a handler
+    super().update(command)
+
+  @handles(HBM2eRowCommand_Activate)
+  def update_activate(self, command:HBM2eCommand):
+    """ Activation of a bank. """
+    self.overlay[command.bank_index] = symbol_bank_activate
+    self.set_bank_active(command.bank_index, True)
+
+  @handles(HBM2eRowCommand_Precharge)
+  def update_precharge(self, command:HBM2eCommand):
+    """ Precharge of a bank. """
+    self.overlay[command.bank_index] = symbol_bank_precharge
+    self.set_bank_active(command.bank_index, False)
+
+  @handles(HBM2eRowCommand_PrechargeAll)
+  def update_precharge_all(self, command:HBM2eCommand):
+    """ Precharge of all the banks of a pseudo-channel. """
+    self.overlay = dict.fromkeys(pseudo_channel_banks(command.pseudo_channel), symbol_bank_precharge)
+    for bank_index in self.overlay:
+      self.set_bank_active(bank_index, False)
+
+  @handles(HBM2eRowCommand_SingleBankRefresh)
+  def update_single_bank_refresh(self, command:HBM2eCommand):
+    """ Refresh of a bank. """
+    self.overlay[command.bank_index] = symbol_bank_refresh
+
+  @handles(HBM2eRowCommand_Refresh)
+  def update_refresh(self, command:HBM2eCommand):
+    """ Refresh of all the banks of a pseudo-channel. """
+    self.overlay = dict.fromkeys(pseudo_channel_banks(command.pseudo_channel), symbol_bank_refresh)
+
+  @handles(HBM2eColumnCommand_Read)
+  def update_read(self, command:HBM2eCommand):
+    """ Read from an activated bank. """
+    self.overlay[command.bank_index] = symbol_bank_read
+
+  @handles(HBM2eColumnCommand_ReadAutoPrecharge)
+  def update_read_auto_precharge(self, command:HBM2eCommand):
+    """ Read from an activated bank, then precharge it. """
+    self.overlay[command.bank_index] = symbol_bank_read
+    self.set_bank_active(command.bank_index, False)
+
+  @handles(HBM2eColumnCommand_Write)
+  def update_write(self, command:HBM2eCommand):
+    """ Write to an activated bank. """
+    self.overlay[command.bank_index] = symbol_bank_write
+
+  @handles(HBM2eColumnCommand_WriteAutoPrecharge)
+  def update_write_auto_precharge(self, command:HBM2eCommand):
+    """ Write to an activated bank, then precharge it. """
+    self.overlay[command.bank_index] = symbol_bank_write
+    self.set_bank_active(command.bank_index, False)
+
+  def render_idle(self) -> str:
+    """ Get the annotation string for a command not targeting any bank, the cached base line. """
+
+    # Join the base line again only if a bank changed status
+    if self.banks_string is None:
+      self.banks_string = "".join(self.banks_symbols)
+    return self.banks_string
+
+  def render(self) -> str:
+    """ Get the current annotation string, built from the cached base line and the overlay of the last command. """
+    if self.annotation_string is None:
+
+      # Commands not targeting any bank reuse the base line as is
+      if not self.overlay:
+        self.annotation_string = self.render_idle()
+      else:
+        annotation_list = self.banks_symbols.copy()
+        for bank_index, symbol in self.overlay.items():
+          annotation_list[bank_index] = symbol
+        self.annotation_string = "".join(annotation_list)
 
-    # Use an annotation list instead of a string to store for each bank the character and optional ANSI format codes
-    annotation_list = []
-
-    # Line for activated and inactive banks
-    for bank_index in range(banks_per_channel):
-      annotation_list.append(symbol_bank_idle if self.banks_active[bank_index] else symbol_bank_inactive)
-
-    # For commands addressing pseudo-channels
-    pseudo_channel = None
-    pseudo_channel_banks_slice = None
-    def fetch_pseudo_channel():
-      nonlocal pseudo_channel
-      nonlocal pseudo_channel_banks_slice
-      pseudo_channel = command.pseudo_channel.decimal()
-      pseudo_channel_banks_slice = slice( pseudo_channel      * banks_per_pseudo_channel,
-                                         (pseudo_channel + 1) * banks_per_pseudo_channel)
-
-    # For commands addressing banks
-    stack_id     = None
-    bank_address = None
-    bank_index   = None
-    def fetch_bank_index():
-      nonlocal stack_id
-      nonlocal bank_address
-      nonlocal bank_index
-      stack_id     = command.stack_id.decimal()
-      bank_address = command.bank_address.decimal()
-      bank_index   = pseudo_channel * banks_per_pseudo_channel  +  stack_id * banks_per_stack  +  bank_address
-
-    # Only consider row and column commands that affect the bank status or perform operations on banks.
-    # For each command, fetch the corresponding addresses, update the annotation, and update the bank status.
-    match command:
-
-      case HBM2eRowCommand_Activate():
-        fetch_pseudo_channel()
-        fetch_bank_index()
-        annotation_list[bank_index] = symbol_bank_activate
-        self.banks_active[bank_index] = True
-
-      case HBM2eRowCommand_Precharge():
-        fetch_pseudo_channel()
-        fetch_bank_index()
-        annotation_list[bank_index] = symbol_bank_precharge
-        self.banks_active[bank_index] = False
-
-      case HBM2eRowCommand_PrechargeAll():
-        fetch_pseudo_channel()
-        annotation_list[pseudo_channel_banks_slice] = [symbol_bank_refresh] * symbol_bank_precharge
-        self.banks_active = [False] * banks_per_channel
-
-      case HBM2eRowCommand_SingleBankRefresh():
-        fetch_pseudo_channel()
-        fetch_bank_index()
-        annotation_list[bank_index] = symbol_bank_refresh
-
-      case HBM2eRowCommand_Refresh():
-        fetch_pseudo_channel()
-        annotation_list[pseudo_channel_banks_slice] = [symbol_bank_refresh] * banks_per_pseudo_channel
-
-      case HBM2eColumnCommand_Read():
-        fetch_pseudo_channel()
-        fetch_bank_index()
-        annotation_list[bank_index] = symbol_bank_read
-
-      case HBM2eColumnCommand_ReadAutoPrecharge():
-        fetch_pseudo_channel()
-        fetch_bank_index()
-        annotation_list[bank_index] = symbol_bank_read
-        self.banks_active[bank_index] = False
-
-      case HBM2eColumnCommand_Write():
-        fetch_pseudo_channel()
-        fetch_bank_index()
-        annotation_list[bank_index] = symbol_bank_write
-
-      case HBM2eColumnCommand_WriteAutoPrecharge():
-        fetch_pseudo_channel()
-        fetch_bank_index()
-        annotation_list[bank_index] = symbol_bank_write
-        self.banks_active[bank_index] = False
-
-      case _:
-        pass
-
-    # Convert the annotation list to a single string
-    self.annotation_string = "".join(annotation_list)
-
-  def __repr__(self):
-    """ Get the current annotation string. """
     return self.annotation_string
 
 
@@ -950,6 +1051,7 @@ class HBM2eBankAnnotator(Annotator):
 
 
 
+
 symbol_column_inactive        = Color.RED + Color.BLINK + '╳' + Color.RESET
 symbol_column_activate        = Color.RED    + '━' + Color.RESET
 symbol_column_precharge_all   = Color.GREEN  + '━' + Color.RESET
@@ -960,161 +1062,138 @@ symbol_column_is_read         = Color.WHITE  + '╍' + Color.RESET
 symbol_column_is_written      = Color.WHITE  + '━' + Color.RESET
 column_precharge_color        = Color.GREEN
 
-class HBM2ePageStatus(Enum):
-  """ Status for a column of a page. """
-  INACTIVE  = 0
-  UNUSED    = 1
-  READ      = 2
-  WRITTEN   = 3
+# Pages are rendered by chunks of columns to keep the cache of symbols small
+page_chunk_width = min(8, columns_per_row)
+page_chunk_mask  = 2**page_chunk_width - 1
+
+def precharge_symbol(symbol:str) -> str:
+  """ Replace the color of a column symbol with the color of precharge. """
+  return column_precharge_color + remove_colors(symbol) + Color.RESET
+
+@lru_cache(maxsize=None)
+def page_chunk_symbols(read_mask:int, written_mask:int, inactive:bool, precharge:bool) -> tuple[str, ...]:
+  """ Symbols of a chunk of columns of a page from the read and written masks of the chunk. """
+  symbols = []
+  for column_index in range(page_chunk_width):
+    # If the column was written, the read status is not displayed
+    if   written_mask >> column_index & 1: symbol = symbol_column_is_written
+    elif read_mask    >> column_index & 1: symbol = symbol_column_is_read
+    elif inactive:                         symbol = symbol_column_inactive
+    else:                                  symbol = symbol_column_unused
+    symbols.append(precharge_symbol(symbol) if precharge else symbol)
+  return tuple(symbols)
+
+def page_symbols(read_mask:int, written_mask:int, inactive:bool, precharge:bool) -> list[str]:
+  """ Symbols of all columns of a page, assembled from the cached chunks. """
+  symbols = []
+  for chunk_offset in range(0, columns_per_row, page_chunk_width):
+    symbols.extend(page_chunk_symbols(read_mask    >> chunk_offset & page_chunk_mask,
+                                      written_mask >> chunk_offset & page_chunk_mask,
+                                      inactive,
+                                      precharge))
+  return symbols
 
 class HBM2ePageAnnotator(Annotator):
   """ Display the status and activity of the page accessed. """
 
+  __slots__ = ("pages_read", "pages_written", "pages_inactive", "annotation_string")
+
   def __init__(self):
     """ At initialization, all columns are considered unused and the annotation string is empty. """
-    self.pages_status = [[HBM2ePageStatus.UNUSED] * columns_per_row for bank in range(banks_per_channel)]
+    # The page of each bank is stored as a bitmask of the read columns and a bitmask of the written columns,
+    # and the bitmask of the banks with an inactive page (precharged and not activated again)
+    self.pages_read        = [0] * banks_per_channel
+    self.pages_written     = [0] * banks_per_channel
+    self.pages_inactive    = 0
     self.annotation_string = " " * columns_per_row
 
   def update(self, command:HBM2eCommand):
     """ Update the annotator status and string with a command. """
+    # Only row and column commands that affect the page status or access pages have a handler
+    self.annotation_string = self.render_idle()
+    super().update(command)
+
+  def load_page_status(self, bank_index:int, precharge:bool=False) -> list[str]:
+    """ Load the status of the page of a bank as a list of symbols, with the special ANSI formatting of precharges. """
+    return page_symbols(self.pages_read[bank_index],
+                        self.pages_written[bank_index],
+                        bool(self.pages_inactive >> bank_index & 1),
+                        precharge)
+
+  def clear_page_status(self, bank_index:int):
+    """ Clear the page status after a precharge (all columns are inactive). """
+    self.pages_read[bank_index]    = 0
+    self.pages_written[bank_index] = 0
+    self.pages_inactive |= 1 << bank_index
+
+  def clear_all_page_status(self):
+    """ Clear all page status after a precharge all banks. """
+    self.pages_read     = [0] * banks_per_channel
+    self.pages_written  = [0] * banks_per_channel
+    self.pages_inactive = 0
+
+  @handles(HBM2eRowCommand_Activate)
+  def update_activate(self, command:HBM2eCommand):
+    """ Activation of a page, all columns are unused. """
+    self.annotation_string = symbol_column_activate * columns_per_row
+    self.pages_read[command.bank_index]    = 0
+    self.pages_written[command.bank_index] = 0
+    self.pages_inactive &= ~(1 << command.bank_index)
+
+  @handles(HBM2eRowCommand_Precharge)
+  def update_precharge(self, command:HBM2eCommand):
+    """ Precharge of the page of a bank. """
+    self.annotation_string = "".join(self.load_page_status(command.bank_index, precharge=True))
+    self.clear_page_status(command.bank_index)
+
+  @handles(HBM2eRowCommand_PrechargeAll)
+  def update_precharge_all(self, command:HBM2eCommand):
+    """ Precharge of all the banks of a pseudo-channel. """
+    self.annotation_string = symbol_column_precharge_all * columns_per_row
+    self.clear_all_page_status()
+
+  @handles(HBM2eColumnCommand_Read)
+  def update_read(self, command:HBM2eCommand):
+    """ Read from a column of the page. """
+    annotation_list = self.load_page_status(command.bank_index)
+    annotation_list[command.column_index] = symbol_column_do_read
+    self.annotation_string = "".join(annotation_list)
+    # If the column was in the state written, the written mask takes precedence over the read mask
+    self.pages_read[command.bank_index] |= 1 << command.column_index
+
+  @handles(HBM2eColumnCommand_ReadAutoPrecharge)
+  def update_read_auto_precharge(self, command:HBM2eCommand):
+    """ Read from a column of the page, then precharge it. """
+    annotation_list = self.load_page_status(command.bank_index, precharge=True)
+    annotation_list[command.column_index] = symbol_column_do_read
+    self.annotation_string = "".join(annotation_list)
+    self.clear_page_status(command.bank_index)
 
-    # Use an annotation list instead of a string to store for each bank the character and optional ANSI format codes
-    annotation_list = [" "] * columns_per_row
-
-    # For commands addressing pseudo-channels
-    pseudo_channel = None
-    def fetch_pseudo_channel():
-      nonlocal pseudo_channel
-      pseudo_channel = command.pseudo_channel.decimal()
-
-    # For commands addressing banks
-    stack_id     = None
-    bank_address = None
-    bank_index   = None
-    def fetch_bank_index():
-      nonlocal stack_id
-      nonlocal bank_address
-      nonlocal bank_index
-      stack_id     = command.stack_id.decimal()
-      bank_address = command.bank_address.decimal()
-      bank_index   = pseudo_channel * banks_per_pseudo_channel  +  stack_id * banks_per_stack  +  bank_address
-
-    # For commands addressing columns
-    column_address = None
-    column_index   = None
-    def fetch_column_index():
-      nonlocal column_address
-      nonlocal column_index
-      column_address = command.column_address.decimal()
-      column_index   = column_address // 2
-
-    # Load the status of the page of a bank and update the annotation
-    def load_page_status():
-      nonlocal annotation_list
-      annotation_list = []
-      page_status = self.pages_status[bank_index]
-      for column_index in range(columns_per_row):
-        match page_status[column_index]:
-          case HBM2ePageStatus.INACTIVE:
-            annotation_list.append(symbol_column_inactive)
-          case HBM2ePageStatus.UNUSED:
-            annotation_list.append(symbol_column_unused)
-          case HBM2ePageStatus.READ:
-            annotation_list.append(symbol_column_is_read)
-          case HBM2ePageStatus.WRITTEN:
-            annotation_list.append(symbol_column_is_written)
-
-    # Update the page status after an activation (all columns are unused)
-    def activate_page_status():
-      nonlocal bank_index
-      self.pages_status[bank_index] = [HBM2ePageStatus.UNUSED] * columns_per_row
-
-    # Clear the page status after a precharge (all columns are inactive)
-    def clear_page_status():
-      nonlocal bank_index
-      self.pages_status[bank_index] = [HBM2ePageStatus.INACTIVE] * columns_per_row
-
-    # Clear all page status after a precharge all banks (all columns are inactive)
-    def clear_all_page_status():
-      self.pages_status = [[HBM2ePageStatus.UNUSED] * columns_per_row for bank in range(banks_per_channel)]
-
-    # For a precharge, the character for all columns gets a special ANSI formatting
-    def apply_precharge_format():
-      # Iterate over the symbols of all columns
-      for column_index in range(columns_per_row):
-        # Remove the previous color
-        annotation_list[column_index] = remove_colors(annotation_list[column_index])
-        # Add the color of precharge
-        annotation_list[column_index] = column_precharge_color + annotation_list[column_index] + Color.RESET
-
-    # Only consider row and column commands that affect the bank status or perform operations on banks.
-    # For each command, fetch the corresponding addresses, update the annotation, and update the page status.
-    match command:
-
-      case HBM2eRowCommand_Activate():
-        fetch_pseudo_channel()
-        fetch_bank_index()
-        annotation_list = [symbol_column_activate] * columns_per_row
-        activate_page_status()
-
-      case HBM2eRowCommand_Precharge():
-        fetch_pseudo_channel()
-        fetch_bank_index()
-        load_page_status()
-        apply_precharge_format()
-        clear_page_status()
-
-      case HBM2eRowCommand_PrechargeAll():
-        fetch_pseudo_channel()
-        annotation_list = [symbol_column_precharge_all] * columns_per_row
-        clear_all_page_status()
-
-      case HBM2eColumnCommand_Read():
-        fetch_pseudo_channel()
-        fetch_bank_index()
-        load_page_status()
-        fetch_column_index()
-        annotation_list[column_index] = symbol_column_do_read
-        # If the column was in the state written, don't overwrite with read
-        if self.pages_status[bank_index][column_index] != HBM2ePageStatus.WRITTEN:
-          self.pages_status[bank_index][column_index] = HBM2ePageStatus.READ
-
-      case HBM2eColumnCommand_ReadAutoPrecharge():
-        fetch_pseudo_channel()
-        fetch_bank_index()
-        load_page_status()
-        apply_precharge_format()
-        fetch_column_index()
-        annotation_list[column_index] = symbol_column_do_read
-        clear_page_status()
-
-      case HBM2eColumnCommand_Write():
-        fetch_pseudo_channel()
-        fetch_bank_index()
-        load_page_status()
-        fetch_column_index()
-        annotation_list[column_index] = symbol_column_do_write
-        self.pages_status[bank_index][column_index] = HBM2ePageStatus.WRITTEN
-
-      case HBM2eColumnCommand_WriteAutoPrecharge():
-        fetch_pseudo_channel()
-        fetch_bank_index()
-        load_page_status()
-        apply_precharge_format()
-        fetch_column_index()
-        annotation_list[column_index] = symbol_column_do_write
-        clear_page_status()
-
-      case _:
-        pass
+  @handles(HBM2eColumnCommand_Write)
+  def update_write(self, command:HBM2eCommand):
+    """ Write to a column of the page. """
+    annotation_list = self.load_page_status(command.bank_index)
+    annotation_list[command.column_index] = symbol_column_do_write
+    self.annotation_string = "".join(annotation_list)
+    self.pages_written[command.bank_index] |= 1 << command.column_index
 
-    # Convert the annotation list to a single string
+  @handles(HBM2eColumnCommand_WriteAutoPrecharge)
+  def update_write_auto_precharge(self, command:HBM2eCommand):
+    """ Write to a column of the page, then precharge it. """
+    annotation_list = self.load_page_status(command.bank_index, precharge=True)
+    annotation_list[command.column_index] = symbol_column_do_write
     self.annotation_string = "".join(annotation_list)
+    self.clear_page_status(command.bank_index)
 
-  def __repr__(self):
+  def render(self) -> str:
     """ Get the current annotation string. """
     return self.annotation_string
 
+  def render_idle(self) -> str:
+    """ Get the empty annotation string for commands not affecting pages. """
+    return " " * columns_per_row
+
+
 
 
 
@@ -1127,38 +1206,160 @@ data_annotation_width = number_words * (word_length // 4 + 1) - 1
 class HBM2eDataAnnotator(Annotator):
   """ Display the content of the data bus for reads and writes. """
 
+  __slots__ = ("annotation_string",)
+
   def __init__(self):
     """ At initialization, the annotation string is empty. """
     self.annotation_string = " " * data_annotation_width
 
   def update(self, command:HBM2eCommand):
     """ Update the annotator string with a command. """
+    # Empty string for commands without data
+    self.annotation_string = self.render_idle()
+    super().update(command)
+
+  # Only reads and writes have data
+  @handles(HBM2eColumnCommand_Read,
+           HBM2eColumnCommand_ReadAutoPrecharge,
+           HBM2eColumnCommand_Write,
+           HBM2eColumnCommand_WriteAutoPrecharge)
+  def update_data(self, command:HBM2eCommand):
+    """ Display the data burst of a read or write. """
 
-    # Only reads and writes have data
-    if type(command) in [HBM2eColumnCommand_Read,
-                         HBM2eColumnCommand_ReadAutoPrecharge,
-                         HBM2eColumnCommand_Write,
-                         HBM2eColumnCommand_WriteAutoPrecharge]:
-
-      # Use an annotation list instead of a string to store for each bank the character and optional ANSI format codes
-      annotation_list = []
-
-      # Separate the burst data into words for easier reading
-      for word_index in range(number_words):
-        word_value = command.data[ word_index    * word_length :
-                                  (word_index+1) * word_length ]
-        word_string = word_value.hexadecimal()
-        # Mark zeros with a faint color for easier reading
-        word_string = word_string.replace('0', Color.FAINT + '0' + Color.RESET)
-        annotation_list.append(word_string)
+    # Use an annotation list instead of a string to store for each bank the character and optional ANSI format codes
+    annotation_list = []
 
-      # Convert the annotation list to a single string
-      self.annotation_string = " ".join(annotation_list)
+    # Separate the burst data into words for easier reading
+    for word_index in range(number_words):
+      word_value = command.data[ word_index    * word_length :
+                                (word_index+1) * word_length ]
+      word_string = word_value.hexadecimal()
+      # Mark zeros with a faint color for easier reading
+      word_string = word_string.replace('0', Color.FAINT + '0' + Color.RESET)
+      annotation_list.append(word_string)
 
-    else:
-      # Empty string for commands without data
-      self.annotation_string = " " * data_annotation_width
+    # Convert the annotation list to a single string
+    self.annotation_string = " ".join(annotation_list)
 
-  def __repr__(self):
+  def render(self) -> str:
     """ Get the current annotation string. """
     return self.annotation_string
+
+  def render_idle(self) -> str:
+    """ Get the empty annotation string for commands without data. """
+    return " " * data_annotation_width
+
+
+
+
+
+
+
+hbm2e_command_kinds = {
+  HBM2eRowCommand_Activate              : CommandKind.ACTIVATE,
+  HBM2eRowCommand_Precharge             : CommandKind.PRECHARGE,
+  HBM2eRowCommand_PrechargeAll          : CommandKind.PRECHARGE_ALL,
+  HBM2eRowCommand_SingleBankRefresh     : CommandKind.REFRESH,
+  HBM2eRowCommand_Refresh               : CommandKind.REFRESH_ALL,
+  HBM2eColumnCommand_Read               : CommandKind.READ,
+  HBM2eColumnCommand_ReadAutoPrecharge  : CommandKind.READ_AUTO_PRECHARGE,
+  HBM2eColumnCommand_Write              : CommandKind.WRITE,
+  HBM2eColumnCommand_WriteAutoPrecharge : CommandKind.WRITE_AUTO_PRECHARGE,
+}
+
+# Pseudo-channels are handled as ranks, and there are no bank groups
+hbm2e_bank_geometry = BankGeometry(
+  ranks                = pseudo_channel_per_channel,
+  banks_per_rank       = banks_per_pseudo_channel,
+  banks_per_bank_group = banks_per_pseudo_channel,
+  columns_per_row      = columns_per_row,
+)
+
+hbm2e_bank_symbols = {
+  CommandKind.ACTIVATE             : symbol_bank_activate,
+  CommandKind.READ                 : symbol_bank_read,
+  CommandKind.READ_AUTO_PRECHARGE  : symbol_bank_read,
+  CommandKind.WRITE                : symbol_bank_write,
+  CommandKind.WRITE_AUTO_PRECHARGE : symbol_bank_write,
+  CommandKind.PRECHARGE            : symbol_bank_precharge,
+  CommandKind.PRECHARGE_ALL        : symbol_bank_precharge,
+  CommandKind.REFRESH              : symbol_bank_refresh,
+  CommandKind.REFRESH_ALL          : symbol_bank_refresh,
+}
+
+def hbm2e_command_table(commands:Iterable[HBM2eCommand]) -> CommandTable:
+  """ Build the columnar table of a stream of HBM2e commands for the batch annotations. """
+  table = CommandTable()
+  for command in commands:
+    kind   = hbm2e_command_kinds.get(type(command), CommandKind.OTHER)
+    rank   = 0
+    bank   = 0
+    column = 0
+    data   = None
+    if kind != CommandKind.OTHER:
+      rank = command.pseudo_channel
+      if kind not in rank_kinds:
+        bank = command.bank_index - rank * banks_per_pseudo_channel
+      if kind in read_kinds or kind in write_kinds:
+        column = command.column_index
+        data   = command.data
+    table.append(command.timestamp, kind, rank, bank, column, data)
+  return table
+
+@lru_cache(maxsize=256)
+def bank_line_symbols(banks_active:int) -> tuple[str, ...]:
+  """ Symbols of the line of activated and inactive banks from the bitmask of active banks. """
+  return tuple(symbol_bank_idle if banks_active >> bank_index & 1 else symbol_bank_inactive for bank_index in range(banks_per_channel))
+
+def hbm2e_bank_annotation_column(table:CommandTable, status:BankAnnotationColumns) -> list[str]:
+  """ Bank annotation of each command of an HBM2e command table. """
+  annotations = []
+  for kind, targets, banks_active in zip(table.kind, status.targets, status.banks_active):
+    annotation_list = list(bank_line_symbols(banks_active))
+    while targets:
+      bank_index = targets.bit_length() - 1
+      annotation_list[bank_index] = hbm2e_bank_symbols[kind]
+      targets &= ~(1 << bank_index)
+    annotations.append("".join(annotation_list))
+  return annotations
+
+def hbm2e_page_annotation_column(table:CommandTable, status:BankAnnotationColumns) -> list[str]:
+  """ Page annotation of each command of an HBM2e command table. """
+  annotations = []
+  for command_index, kind in enumerate(table.kind):
+    if kind == CommandKind.ACTIVATE:
+      annotation_list = [symbol_column_activate] * columns_per_row
+    elif kind == CommandKind.PRECHARGE_ALL:
+      annotation_list = [symbol_column_precharge_all] * columns_per_row
+    elif kind == CommandKind.PRECHARGE or kind in read_kinds or kind in write_kinds:
+      annotation_list = page_symbols(status.page_read     [command_index],
+                                     status.page_written  [command_index],
+                                     status.page_inactive [command_index],
+                                     kind not in (CommandKind.READ, CommandKind.WRITE))
+      if kind in read_kinds:
+        annotation_list[table.column[command_index]] = symbol_column_do_read
+      elif kind in write_kinds:
+        annotation_list[table.column[command_index]] = symbol_column_do_write
+    else:
+      annotation_list = [" "] * columns_per_row
+    annotations.append("".join(annotation_list))
+  return annotations
+
+def hbm2e_data_annotation_column(table:CommandTable) -> list[str]:
+  """ Data annotation of each command of an HBM2e command table, the words of all the data bursts converted at once in a wide value column. """
+  annotations  = [" " * data_annotation_width] * len(table)
+  data_indices = [command_index for command_index, data in enumerate(table.data) if data is not None]
+  if not data_indices:
+    return annotations
+  bursts       = WideValueColumn.from_values((table.data[command_index] for command_index in data_indices), data_width)
+  word_columns = [bursts.slice(word_index * word_length, (word_index+1) * word_length).hexadecimal() for word_index in range(number_words)]
+  faint_zero   = Color.FAINT + '0' + Color.RESET
+  for burst_index, command_index in enumerate(data_indices):
+    # Mark zeros with a faint color for easier reading, like the data annotator
+    annotations[command_index] = " ".join(word_column[burst_index].replace('0', faint_zero) for word_column in word_columns)
+  return annotations
+
+def hbm2e_annotation_columns(table:CommandTable) -> tuple[list[str], list[str], list[str]]:
+  """ Bank, page and data annotations of a whole HBM2e command table, computed in one pass instead of command by command. """
+  status = annotate_command_table(table, hbm2e_bank_geometry)
+  return hbm2e_bank_annotation_column(table, status), hbm2e_page_annotation_column(table, status), hbm2e_data_annotation_column(table)
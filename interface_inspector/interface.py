@@ -1,4 +1,60 @@
+from dataclasses import fields
+from typing      import Iterable
+
+from .vcd   import (
+  VCDFile,
+  VCDClockDomain,
+  EdgePolarity,
+)
+from .utils import change_case
+
+
+
+
+
 
 class Interface:
   """ Base class for interfaces. """
-  pass
+
+  # Dataclass of the paths of the signals of the interface
+  paths_class : type = None
+
+  # Default case of the signal names built from a path
+  uppercase : bool = False
+
+  # Signals of the interface that can be missing from the VCD, the decoders check them before use
+  optional_signals : tuple[str, ...] = ()
+
+  @classmethod
+  def interface_paths(cls, path:str="", prefix:str="", suffix:str="", uppercase:bool=None) -> object:
+    """ Paths of all the signals of the interface, from the path of its scope, a prefix and a suffix around the signal names, and their case. """
+    if uppercase is None:
+      uppercase = cls.uppercase
+    return cls.paths_class(**{field.name: f"{path}.{prefix}{change_case(field.name, uppercase)}{suffix}" for field in fields(cls.paths_class)})
+
+  def clock_domain(self, clock:str, signals:Iterable[str], polarity:EdgePolarity=EdgePolarity.RISING) -> VCDClockDomain:
+    """ Signals of the interface resampled on the edges of one of its clocks, all by attribute name. """
+    return VCDClockDomain(getattr(self, clock), {name: getattr(self, name) for name in signals}, polarity)
+
+
+
+class LoadingSession:
+  """ Interfaces registered on a VCD to be loaded together. The union of their signals is parsed in a single pass over the value changes, then the interfaces are built over them. """
+
+  def __init__(self, vcd_file:VCDFile):
+    """ At initialization, no interface is registered. The VCD should be opened with only its header. """
+    self.vcd_file   = vcd_file
+    self.registered = [] # Classes and paths of the interfaces, in registration order
+
+  def add(self, interface_class:type[Interface], signals:object=None, **path_arguments) -> object:
+    """ Register an interface by its dataclass of paths, or by the path, prefix, suffix and case of its constructor. Its paths are validated from the header. Returns the dataclass of paths. """
+    if signals is None:
+      signals = interface_class.interface_paths(**path_arguments)
+    self.vcd_file.validate_paths(signals, interface_class.optional_signals)
+    self.registered.append((interface_class, signals))
+    return signals
+
+  def load(self) -> list[Interface]:
+    """ Parse and build the signals of all the registered interfaces at once, then build the interfaces in registration order. """
+    self.vcd_file.load_signals(path for interface_class, signals in self.registered for path in vars(signals).values())
+    return [interface_class(self.vcd_file, signals) for interface_class, signals in self.registered]
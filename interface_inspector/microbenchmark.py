@@ -0,0 +1,245 @@
+import sys
+import json
+import random
+import timeit
+import argparse
+
+from typing import Callable
+
+from .vcd import (
+  VCDValue,
+  VCDSample,
+  VCDSignal,
+  SearchMethod,
+)
+
+
+
+
+
+
+# Values of each parameter swept by the scaling curves
+widths       = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+xz_densities = (0.0, 0.001, 0.01, 0.1, 0.5)
+lengths      = (10**2, 10**3, 10**4, 10**5, 10**6)
+
+# Values of the parameters not swept by a curve
+default_width         = 64
+default_xz_density    = 0.0
+default_length        = 10**4
+default_search_method = SearchMethod.BINARY
+
+# Time between the samples of the generated signals
+sample_period = 10
+
+# Number of samples between the samples matching the value searched on buses
+match_period = 8
+
+# Number of operands prepared for each measurement, the operations cycle over them
+operand_count = 256
+
+def random_bits(width:int, xz_density:float, rng:random.Random) -> str:
+  """ Random binary string of a width, with a proportion of X and Z bits. """
+  return "".join(rng.choice("xz") if rng.random() < xz_density else rng.choice("01") for bit in range(width))
+
+def random_value(width:int, xz_density:float, rng:random.Random) -> VCDValue:
+  """ Random VCDValue of a width, with a proportion of X and Z bits. """
+  return VCDValue("b" + random_bits(width, xz_density, rng), width)
+
+def random_signal(length:int, width:int, xz_density:float, search_method:SearchMethod, rng:random.Random) -> VCDSignal:
+  """ Random VCDSignal with a number of samples at a fixed period. Single bit signals toggle at each sample like a clock, with a proportion of X and Z samples. """
+  samples = []
+  for sample_index in range(length):
+    if width == 1:
+      bits = rng.choice("xz") if rng.random() < xz_density else "01"[sample_index % 2]
+    else:
+      bits = random_bits(width, xz_density, rng)
+    samples.append(VCDSample(sample_index * sample_period, VCDValue("b" + bits, width)))
+  return VCDSignal(samples, width, search_method=search_method)
+
+def rewind(signal:VCDSignal) -> None:
+  """ Move a signal back to its first sample. """
+  signal.current_index     = 0
+  signal.current_sample    = signal.vcd[0]
+  signal.current_timestamp = signal.current_sample.timestamp
+  signal.finished          = False
+
+
+
+
+
+
+def cycling(operation:Callable, operands:list) -> Callable:
+  """ Operation without arguments, applied to the next operand at each call. """
+  operand_index = 0
+  def call() -> None:
+    nonlocal operand_index
+    operation(operands[operand_index])
+    operand_index = (operand_index + 1) % len(operands)
+  return call
+
+def value_operands(width:int, xz_density:float, length:int, search_method:SearchMethod, rng:random.Random) -> list[VCDValue]:
+  """ Random values to cycle over. """
+  return [random_value(width, xz_density, rng) for operand_index in range(operand_count)]
+
+def setup_constructor(width:int, xz_density:float, length:int, search_method:SearchMethod, rng:random.Random) -> Callable:
+  """ Building a VCDValue from the raw string of the dump. """
+  raw_values = ["b" + random_bits(width, xz_density, rng) for operand_index in range(operand_count)]
+  return cycling(lambda raw_value: VCDValue(raw_value, width), raw_values)
+
+def setup_getitem_bit(width:int, xz_density:float, length:int, search_method:SearchMethod, rng:random.Random) -> Callable:
+  """ Selection of the middle bit of a value. """
+  return cycling(lambda value: value[width // 2], value_operands(width, xz_density, length, search_method, rng))
+
+def setup_getitem_slice(width:int, xz_density:float, length:int, search_method:SearchMethod, rng:random.Random) -> Callable:
+  """ Selection of the lower half of a value. """
+  return cycling(lambda value: value[0:max(width // 2, 1)], value_operands(width, xz_density, length, search_method, rng))
+
+def setup_pow(width:int, xz_density:float, length:int, search_method:SearchMethod, rng:random.Random) -> Callable:
+  """ Concatenation of two values. """
+  pairs = list(zip(value_operands(width, xz_density, length, search_method, rng), value_operands(width, xz_density, length, search_method, rng)))
+  return cycling(lambda pair: pair[0] ** pair[1], pairs)
+
+def setup_equal_no_xy(width:int, xz_density:float, length:int, search_method:SearchMethod, rng:random.Random) -> Callable:
+  """ Don't care comparison of a value with a copy, the worst case that checks all the bits. """
+  pairs = [(value, VCDValue("b" + value.value, width)) for value in value_operands(width, xz_density, length, search_method, rng)]
+  return cycling(lambda pair: pair[0].equal_no_xy(pair[1]), pairs)
+
+def setup_hexadecimal(width:int, xz_density:float, length:int, search_method:SearchMethod, rng:random.Random) -> Callable:
+  """ Hexadecimal representation of a value. """
+  return cycling(VCDValue.hexadecimal, value_operands(width, xz_density, length, search_method, rng))
+
+def setup_eq_int(width:int, xz_density:float, length:int, search_method:SearchMethod, rng:random.Random) -> Callable:
+  """ Comparison of a value to an int, through its hexadecimal representation like the edge polarity checks. """
+  return cycling(lambda value: value == 1, value_operands(width, xz_density, length, search_method, rng))
+
+def setup_get_at_timestamp(width:int, xz_density:float, length:int, search_method:SearchMethod, rng:random.Random) -> Callable:
+  """ Binary search of the sample at a random timestamp of a signal. """
+  signal     = random_signal(length, width, xz_density, search_method, rng)
+  timestamps = [rng.randrange(length * sample_period) for operand_index in range(operand_count)]
+  return cycling(signal.get_at_timestamp, timestamps)
+
+def setup_get_at_timestamp_walk(width:int, xz_density:float, length:int, search_method:SearchMethod, rng:random.Random) -> Callable:
+  """ Moving search of the sample at increasing timestamps a few samples apart, like the decoders, rewinding at the end of the dump. """
+  signal    = random_signal(length, width, xz_density, search_method, rng)
+  timestamp = 0
+  def call() -> None:
+    nonlocal timestamp
+    timestamp = (timestamp + rng.randrange(4 * sample_period)) % (length * sample_period)
+    signal.get_at_timestamp(timestamp, move=True)
+  return call
+
+def setup_get_edge(width:int, xz_density:float, length:int, search_method:SearchMethod, rng:random.Random) -> Callable:
+  """ Walk to the next rising edge of a toggling single bit signal, rewinding at the end of the dump. """
+  signal = random_signal(length, 1, xz_density, search_method, rng)
+  def call() -> None:
+    if signal.get_edge(move=True) is None:
+      rewind(signal)
+  return call
+
+def setup_get_edge_value(width:int, xz_density:float, length:int, search_method:SearchMethod, rng:random.Random) -> Callable:
+  """ Walk to the next sample of a bus matching a value with don't care X and Z, rewinding at the end of the dump. One sample in some is the value. """
+  signal = random_signal(length, width, xz_density, search_method, rng)
+  value  = random_value(width, 0, rng)
+  for sample in signal.vcd[::match_period]:
+    sample.value = value
+  def call() -> None:
+    if signal.get_edge(value=value, move=True) is None:
+      rewind(signal)
+  return call
+
+def setup_get_edge_at_timestamp(width:int, xz_density:float, length:int, search_method:SearchMethod, rng:random.Random) -> Callable:
+  """ Next rising edge of a toggling single bit signal after a random timestamp, without moving. """
+  signal     = random_signal(length, 1, xz_density, search_method, rng)
+  timestamps = [rng.randrange(length * sample_period) for operand_index in range(operand_count)]
+  return cycling(lambda timestamp: signal.get_edge_at_timestamp(timestamp), timestamps)
+
+# Setup of each primitive, and the parameters swept for its scaling curves
+primitives = {
+  "VCDValue.__init__"              : (setup_constructor,           ("width", "xz_density")),
+  "VCDValue.__getitem__ bit"       : (setup_getitem_bit,           ("width", "xz_density")),
+  "VCDValue.__getitem__ slice"     : (setup_getitem_slice,         ("width", "xz_density")),
+  "VCDValue.__pow__"               : (setup_pow,                   ("width", "xz_density")),
+  "VCDValue.equal_no_xy"           : (setup_equal_no_xy,           ("width", "xz_density")),
+  "VCDValue.hexadecimal"           : (setup_hexadecimal,           ("width", "xz_density")),
+  "VCDValue.__eq__ int"            : (setup_eq_int,                ("width", "xz_density")),
+  "VCDSignal.get_at_timestamp"     : (setup_get_at_timestamp,      ("length", "search_method")),
+  "VCDSignal.get_at_timestamp walk": (setup_get_at_timestamp_walk, ("length", "search_method")),
+  "VCDSignal.get_edge"             : (setup_get_edge,              ("length", "xz_density", "search_method")),
+  "VCDSignal.get_edge value"       : (setup_get_edge_value,        ("width", "xz_density", "length")),
+  "VCDSignal.get_edge_at_timestamp": (setup_get_edge_at_timestamp, ("length", "xz_density", "search_method")),
+}
+
+# Values of each swept parameter
+sweeps = {
+  "width"         : widths,
+  "xz_density"    : xz_densities,
+  "length"        : lengths,
+  "search_method" : tuple(SearchMethod),
+}
+
+
+
+
+
+
+def measure(call:Callable, repeat:int=5) -> float:
+  """ Best time of a call in nanoseconds, over some repetitions of enough calls to last at least 0.2 s. """
+  timer     = timeit.Timer(call)
+  number, _ = timer.autorange()
+  return min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+def scaling_curves(names:list[str], max_length:int=max(lengths), repeat:int=5, seed:int=0) -> dict:
+  """ Time per call of the primitives along each of their parameters, the other parameters being kept at their default values. """
+  curves = {}
+  for name in names:
+    setup, parameters = primitives[name]
+    curves[name] = {}
+    for parameter in parameters:
+      curve = []
+      for parameter_value in sweeps[parameter]:
+        if parameter == "length" and parameter_value > max_length: continue
+        arguments = {"width": default_width, "xz_density": default_xz_density, "length": default_length, "search_method": default_search_method} | {parameter: parameter_value}
+        nanoseconds = measure(setup(**arguments, rng=random.Random(seed)), repeat)
+        if isinstance(parameter_value, SearchMethod):
+          parameter_value = parameter_value.name
+        curve.append([parameter_value, nanoseconds])
+        print(f"{name:<34} {parameter:<10} {parameter_value:>10} {nanoseconds:12.1f} ns", flush=True)
+      curves[name][parameter] = curve
+  return curves
+
+def compare_curves(curves:dict, baseline:dict) -> None:
+  """ Print the speedup of each point of the curves over the same point of a baseline. """
+  for name, parameter_curves in curves.items():
+    for parameter, curve in parameter_curves.items():
+      baseline_points = dict(map(tuple, baseline.get(name, {}).get(parameter, [])))
+      for parameter_value, nanoseconds in curve:
+        if parameter_value in baseline_points:
+          print(f"{name:<34} {parameter:<10} {parameter_value:>10} {baseline_points[parameter_value] / nanoseconds:8.2f}x")
+
+
+
+
+
+
+def main(arguments:list[str]=None) -> int:
+  """ Command line entry point, run with `python -m interface_inspector.microbenchmark`. """
+  parser = argparse.ArgumentParser(description="Scaling curves of the VCDValue and VCDSignal primitives.")
+  parser.add_argument("--primitives", nargs="+", default=list(primitives), choices=list(primitives), metavar="PRIMITIVE", help="primitives to measure, all by default")
+  parser.add_argument("--max-length", type=int,  default=max(lengths),                               help="longest signal of the length curves")
+  parser.add_argument("--repeat",     type=int,  default=5,                                          help="repetitions of each measurement, the best is kept")
+  parser.add_argument("--output",     default=None,                                                  help="path of the JSON curves")
+  parser.add_argument("--baseline",   default=None,                                                  help="path of JSON curves to print the speedups over")
+  arguments = parser.parse_args(arguments)
+
+  curves = scaling_curves(arguments.primitives, arguments.max_length, arguments.repeat)
+  if arguments.output:
+    with open(arguments.output, "w") as output_file:
+      json.dump(curves, output_file, indent=2)
+  if arguments.baseline:
+    with open(arguments.baseline) as baseline_file:
+      compare_curves(curves, json.load(baseline_file))
+  return 0
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -1,4 +1,61 @@
+from .vcd import (
+  VCDValue,
+  VCDFormat,
+  none_value,
+)
+
+# Widths of the fields of packets, shared between all the packets with the same widths
+packet_field_widths = {}
 
 class Packet:
   """ Base class for packets. """
-  pass
+
+  # The fields are stored as plain ints in slots, with their widths and a flag for each field with X or Z.
+  # Fields with X or Z (or empty) are stored as None and their VCDValue is kept aside.
+  # Fields of optional signals missing from the VCD are given as None and stored like empty values.
+  __slots__ = ("field_widths", "xz_flags", "xz_values")
+
+  # Names of the fields stored as ints, in the order of the X/Z flags
+  fields : tuple[str, ...] = ()
+
+  def store_fields(self, *values:VCDValue|None) -> None:
+    """ Store the VCDValues of the fields, in the order of the fields of the class. Missing fields are None. """
+    widths    = []
+    xz_flags  = 0
+    xz_values = None
+    for field_index, (name, value) in enumerate(zip(self.fields, values)):
+      if value is None:
+        value = none_value
+
+      # Real values have no width
+      if value.format == VCDFormat.REAL:
+        widths.append(None)
+        setattr(self, name, value.value)
+      else:
+        widths.append(value.width)
+        if value.has_xz or not value.value:
+          xz_flags |= 1 << field_index
+          if xz_values is None: xz_values = {}
+          xz_values[name] = value
+          setattr(self, name, None)
+        else:
+          setattr(self, name, int(value.value, 2))
+    widths = tuple(widths)
+    self.field_widths = packet_field_widths.setdefault(widths, widths)
+    self.xz_flags     = xz_flags
+    self.xz_values    = xz_values
+
+  def field_has_xz(self, name:str) -> bool:
+    """ Check if a field has X or Z. """
+    return bool(self.xz_flags >> self.fields.index(name) & 1)
+
+  def field_value(self, name:str) -> VCDValue:
+    """ VCDValue view of a field, built on demand from its int. """
+    field_index = self.fields.index(name)
+    if self.xz_flags >> field_index & 1:
+      return self.xz_values[name]
+    value = getattr(self, name)
+    width = self.field_widths[field_index]
+    if width is None:
+      return VCDValue(f"r{value}", 0)
+    return VCDValue("b" + format(value, f"0{width}b"), width)
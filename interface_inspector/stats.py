@@ -0,0 +1,93 @@
+import json
+import time
+
+from collections import defaultdict
+from typing      import Callable
+
+from . import tracing
+
+
+
+
+
+
+# The collection is disabled by default, the instrumented code only checks this flag
+enabled = False
+
+# Counters of events, in total and by signal
+counters        = defaultdict(int)
+signal_counters = defaultdict(lambda: defaultdict(int))
+
+# Number of calls and cumulated time by packet class for the decoders, and by annotator class for the annotators
+decode_times    = defaultdict(lambda: [0, 0.0])
+annotator_times = defaultdict(lambda: [0, 0.0])
+
+def enable_stats() -> None:
+  """ Start collecting the statistics. """
+  global enabled
+  enabled = True
+
+def disable_stats() -> None:
+  """ Stop collecting the statistics, the statistics already collected are kept. """
+  global enabled
+  enabled = False
+
+def reset_stats() -> None:
+  """ Clear all the statistics collected. """
+  counters        .clear()
+  signal_counters .clear()
+  decode_times    .clear()
+  annotator_times .clear()
+
+
+
+
+
+
+def count(name:str, amount:int=1, signal:str=None) -> None:
+  """ Count events, in total and for a signal if given. Only call if the collection is enabled. """
+  counters[name] += amount
+  if signal is not None:
+    signal_counters[signal][name] += amount
+
+def add_time(times:dict, name:str, seconds:float) -> None:
+  """ Add a call and its duration to the times of a class. """
+  class_times     = times[name]
+  class_times[0] += 1
+  class_times[1] += seconds
+
+def decode(next_packet:Callable) -> object:
+  """ Call the method decoding the next packet of a decoder, timed by packet class if the collection is enabled and traced if the tracing is enabled. """
+  if not enabled and not tracing.enabled:
+    return next_packet()
+  start  = time.perf_counter_ns()
+  packet = next_packet()
+  end    = time.perf_counter_ns()
+  if enabled and packet is not None:
+    add_time(decode_times, type(packet).__name__, (end - start) / 1e9)
+  if tracing.enabled:
+    tracing.record(next_packet.__qualname__, "decode", start, end)
+  return packet
+
+
+
+
+
+
+def stats() -> dict:
+  """ Statistics collected, as a JSON-compatible dict. The signals are sorted by decreasing number of edge search steps to show the pathological ones first. """
+  def times_dict(times:dict) -> dict:
+    return {name: {"calls": calls, "seconds": seconds, "seconds_per_call": seconds / calls}
+            for name, (calls, seconds) in sorted(times.items(), key=lambda item: -item[1][1])}
+  signals = sorted(signal_counters.items(), key=lambda item: -item[1].get("get_edge_steps", 0))
+  return {
+    "counters"   : dict(counters),
+    "signals"    : {signal: dict(signal_counts) for signal, signal_counts in signals},
+    "decoders"   : times_dict(decode_times),
+    "annotators" : times_dict(annotator_times),
+  }
+
+def dump_stats(path:str) -> None:
+  """ Write the statistics collected to a JSON file. """
+  with open(path, "w") as stats_file:
+    json.dump(stats(), stats_file, indent=2)
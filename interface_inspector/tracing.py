@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import threading
+
+from collections import defaultdict
+from contextlib  import contextmanager
+from typing      import Iterable
+
+
+
+
+
+
+# The tracing is disabled by default, the traced code only checks this flag
+enabled = False
+
+# Number of spans kept for each name, beyond this the spans of the name are sampled with a doubling stride
+max_spans_per_name = 10000
+
+# Spans kept by name, as Chrome trace events
+events = defaultdict(list)
+
+# Number of spans, total duration in microseconds and sampling stride by name
+totals  = defaultdict(lambda: [0, 0.0])
+strides = defaultdict(lambda: 1)
+
+# Number of spans sampled by name, recorded here or kept by the worker processes
+sampled = defaultdict(int)
+
+# Name of the process shown in the trace viewer, and of the worker processes whose spans were merged by pid
+process_name = None
+worker_names = {}
+
+def enable_tracing(name:str=None) -> None:
+  """ Start recording spans, with an optional name for the process. """
+  global enabled, process_name
+  enabled = True
+  if name is not None:
+    process_name = name
+
+def disable_tracing() -> None:
+  """ Stop recording spans, the spans already recorded are kept. """
+  global enabled
+  enabled = False
+
+def reset_tracing() -> None:
+  """ Clear all the spans recorded. """
+  events       .clear()
+  totals       .clear()
+  strides      .clear()
+  sampled      .clear()
+  worker_names .clear()
+
+
+
+
+
+
+def now() -> int:
+  """ Current time in nanoseconds, comparable between processes on the same machine. """
+  return time.perf_counter_ns()
+
+def record(name:str, category:str, start:int, end:int, args:dict=None) -> None:
+  """ Record a span from start and end times in nanoseconds. Only call if the tracing is enabled. """
+  event = {"name": name, "cat": category, "ph": "X", "ts": start / 1000, "dur": (end - start) / 1000, "pid": os.getpid(), "tid": threading.get_ident()}
+  if args:
+    event["args"] = args
+  add_event(event)
+
+def add_event(event:dict) -> None:
+  """ Count a span event in the totals of its name, and keep it if it is sampled. """
+  name_totals = totals[event["name"]]
+  name_totals[0] += 1
+  name_totals[1] += event["dur"]
+  sample_event(event)
+
+def sample_event(event:dict) -> None:
+  """ Keep a span event if it is sampled, without counting it in the totals. """
+  name = event["name"]
+  sampled[name] += 1
+
+  # Only every stride-th span of the name is kept, when too many are kept every other is dropped and the stride doubles
+  stride = strides[name]
+  if (sampled[name] - 1) % stride: return
+  name_events = events[name]
+  name_events.append(event)
+  if len(name_events) >= max_spans_per_name:
+    events[name]  = name_events[::2]
+    strides[name] = stride * 2
+
+def worker_events() -> list[dict]:
+  """ Spans kept by a worker process, to be sent back to the parent process with the result of the work. """
+  return [event for name_events in events.values() for event in name_events]
+
+def worker_totals() -> dict[str,tuple[int,float]]:
+  """ Number and total duration of the spans of each name recorded by a worker process, including the spans not kept, to be sent back with its spans. """
+  return {name: tuple(name_totals) for name, name_totals in totals.items()}
+
+def merge_worker_events(spans:list[dict], spans_totals:dict[str,tuple[int,float]], name:str=None) -> None:
+  """ Add the spans and the totals sent back by a worker process, the spans are kept under the pid of the worker with an optional name in the trace viewer.
+      The spans are only sampled, they are counted by the totals of the worker which include the spans the worker did not keep. """
+  for event in spans:
+    sample_event(event)
+    if name is not None:
+      worker_names[event["pid"]] = name
+  for span_name, (count, total) in spans_totals.items():
+    name_totals = totals[span_name]
+    name_totals[0] += count
+    name_totals[1] += total
+
+@contextmanager
+def span(name:str, category:str, **args):
+  """ Context manager recording a span around a block if the tracing is enabled. """
+  if not enabled:
+    yield
+    return
+  start = now()
+  try:
+    yield
+  finally:
+    record(name, category, start, now(), args)
+
+
+
+
+
+
+def trace() -> dict:
+  """ Spans recorded, as a Chrome trace-event JSON object. The number and total duration of the spans of each name, including the spans not kept, are in the metadata. """
+  pid          = os.getpid()
+  trace_events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": process_name or f"interface_inspector {pid}"}}]
+  for worker_pid, worker_name in worker_names.items():
+    trace_events.append({"name": "process_name", "ph": "M", "pid": worker_pid, "args": {"name": f"{worker_name} {worker_pid}"}})
+  for name_events in events.values():
+    trace_events.extend(name_events)
+  trace_events.sort(key=lambda event: event.get("ts", 0))
+  return {
+    "traceEvents"     : trace_events,
+    "displayTimeUnit" : "ms",
+    "otherData"       : {
+      "spans": {name: {"count": count, "total_us": total, "sampling_stride": strides[name]} for name, (count, total) in totals.items()},
+    },
+  }
+
+def write_trace(path:str) -> None:
+  """ Write the spans recorded to a JSON file that can be opened in chrome://tracing or Perfetto. """
+  with open(path, "w") as trace_file:
+    json.dump(trace(), trace_file)
+
+def merge_traces(paths:Iterable[str], path:str) -> None:
+  """ Merge the trace files written by several processes into a single trace file. """
+  merged = {"traceEvents": [], "displayTimeUnit": "ms", "otherData": {"processes": []}}
+  for trace_path in paths:
+    with open(trace_path) as trace_file:
+      process_trace = json.load(trace_file)
+    merged["traceEvents"].extend(process_trace["traceEvents"])
+    merged["otherData"]["processes"].append(process_trace.get("otherData", {}))
+  with open(path, "w") as trace_file:
+    json.dump(merged, trace_file)
@@ -0,0 +1,1159 @@
+import json
+import heapq
+import random
+
+from collections import deque
+from contextlib  import nullcontext
+from dataclasses import fields
+from typing      import (
+  Callable,
+  Generator,
+  TextIO,
+)
+
+from .vcd import VCDValue
+
+from .packet import Packet
+
+from . import ddr
+from . import hbm
+
+from .apb import (
+  APBInterfacePaths,
+  APBTransactionRead,
+  APBTransactionWrite,
+)
+
+from .axi import (
+  AXIInterfacePaths,
+  AXITransactionRead,
+  AXITransactionWrite,
+)
+
+
+
+
+
+
+def binary_value(value:int, width:int) -> VCDValue:
+  """ VCDValue of an int with a given width, like the decoders get from a dump. """
+  return VCDValue("b" + format(value, f"0{width}b"), width)
+
+def encode_fields(words:list[int], value:int, layout:tuple[tuple[int, int, int], ...]) -> None:
+  """ Place the bits of a value in command words. The layout lists the (word, LSB, width) of the slices from the MSBs to the LSBs, in the order the decoders concatenate them. """
+  for word_index, lsb, width in reversed(layout):
+    words[word_index] |= (value & (2**width - 1)) << lsb
+    value >>= width
+
+def packet_record(packet:Packet) -> dict:
+  """ Timestamps and fields of a packet as a JSON-compatible dict, to compare decoded packets to the expected packets of a generated dump. """
+  record = {"type": type(packet).__name__}
+  for name in ("timestamp", "timestamp_request", "timestamp_response", "timestamp_address", "timestamp_data_first", "timestamp_data_last"):
+    if hasattr(packet, name):
+      record[name] = getattr(packet, name)
+  for name in packet.fields:
+    record[name] = packet.field_value(name).hexadecimal()
+  for name in ("data", "ecc"):
+    value = getattr(packet, name, None)
+    if value is not None:
+      record[name] = value.hexadecimal()
+  return record
+
+
+
+
+
+
+class VCDWriter:
+  """ Streaming writer of a VCD, the value changes are written as they come in timestamp order. """
+
+  def __init__(self, file:TextIO, timescale:str="1ps"):
+    """ At initialization, there are no signals and nothing is written. """
+    self.file      = file
+    self.timescale = timescale
+    self.signals   = {}    # Identifier code and width by path
+    self.widths    = {}    # Width by identifier code
+    self.values    = {}    # Last value written by identifier code
+    self.pending   = {}    # Changes of the current timestamp by identifier code, the last change wins
+    self.timestamp = None
+    self.size      = 0     # Number of bytes written
+
+  def write(self, string:str) -> None:
+    """ Write a string to the file and count its size. """
+    self.file.write(string)
+    self.size += len(string)
+
+
+
+  def add_signal(self, path:str, width:int) -> str:
+    """ Declare a signal from its dotted path and get its identifier code. """
+    identifier_index = len(self.signals)
+    identifier       = ""
+    while True:
+      identifier       += chr(33 + identifier_index % 94)
+      identifier_index //= 94
+      if not identifier_index: break
+    self.signals[path]      = (identifier, width)
+    self.widths[identifier] = width
+    return identifier
+
+
+
+  def write_header(self) -> None:
+    """ Write the declarations of the scopes and signals. """
+    self.write(f"$timescale {self.timescale} $end\n")
+
+    # Open and close the scopes between consecutive signals
+    current_scopes = []
+    for path, (identifier, width) in sorted(self.signals.items(), key=lambda signal: signal[0].split('.')[:-1]):
+      *scopes, name = path.split('.')
+      common = 0
+      while common < min(len(scopes), len(current_scopes)) and scopes[common] == current_scopes[common]:
+        common += 1
+      for _ in current_scopes[common:]:
+        self.write("$upscope $end\n")
+      for scope in scopes[common:]:
+        self.write(f"$scope module {scope} $end\n")
+      current_scopes = scopes
+      self.write(f"$var wire {width} {identifier} {name} $end\n")
+    for _ in current_scopes:
+      self.write("$upscope $end\n")
+    self.write("$enddefinitions $end\n")
+
+
+
+  def change(self, timestamp:int, identifier:str, value:int|str) -> None:
+    """ Change the value of a signal, the timestamps must not decrease. The value is an int, or a string of binary digits with X or Z. """
+    if timestamp != self.timestamp:
+      self.flush()
+      self.timestamp = timestamp
+    self.pending[identifier] = value
+
+  def flush(self) -> None:
+    """ Write the changes of the current timestamp, skipping the signals keeping their value. """
+    lines = []
+    for identifier, value in self.pending.items():
+      if self.values.get(identifier) == value: continue
+      self.values[identifier] = value
+      if self.widths[identifier] == 1:
+        lines.append(f"{value}{identifier}\n")
+      elif isinstance(value, str):
+        lines.append(f"b{value} {identifier}\n")
+      else:
+        lines.append(f"b{value:b} {identifier}\n")
+    if lines:
+      self.write(f"#{self.timestamp}\n" + "".join(lines))
+    self.pending = {}
+
+  def close(self) -> None:
+    """ Write the last changes. """
+    self.flush()
+
+
+
+
+
+
+class TrafficGenerator:
+  """ Base class for the generators of synthetic traffic on an interface, driving its signals cycle by cycle. """
+
+  # Name and width of each signal of the interface, and the type of the paths of the interface
+  signals    : dict[str, int] = {}
+  paths_type : type           = None
+
+  # Clocks toggled every cycle, and if they are inverted
+  clocks : dict[str, bool] = {}
+
+  # Value of the signals at the start of the dump, zero for the others
+  idle_values : dict[str, int] = {}
+
+  # Number of idle cycles at the end of the traffic, for the decoders to find clock edges after the last packet
+  tail_cycles = 8
+
+  def __init__(self, path:str, clock_period:int, density:float, seed:int=0):
+    """ Traffic of an interface at a dotted path, with a clock period in VCD time units, and a probability to start a packet each cycle. """
+    self.path         = path
+    self.clock_period = clock_period
+    self.density      = density
+    self.random       = random.Random(seed)
+    self.identifiers  = {}
+    self.values       = {}
+    self.events       = []    # Heap of the changes scheduled in the future
+    self.sequence     = 0     # Order of the changes scheduled at the same timestamp, the last one wins
+    self.stopping     = False
+    self.expect       = None  # Callback receiving the expected packets with the name of their stream
+
+  def declare(self, writer:VCDWriter) -> None:
+    """ Declare all the signals of the interface in a VCD writer. """
+    for name, width in self.signals.items():
+      self.identifiers[name] = writer.add_signal(f"{self.path}.{name}", width)
+
+  def interface_paths(self):
+    """ Paths of the signals to open the interface in the generated dump. """
+    return self.paths_type(**{field.name: f"{self.path}.{field.name}" for field in fields(self.paths_type)})
+
+
+
+  def drive(self, timestamp:int, name:str, value:int|str, mask:int=None) -> None:
+    """ Schedule a change of a signal, only the bits of the mask if any. """
+    heapq.heappush(self.events, (timestamp, self.sequence, name, value, mask))
+    self.sequence += 1
+
+  def emit(self, stream:str, packet:Packet) -> None:
+    """ Report an expected packet of a stream of the decoder of the interface. """
+    if self.expect is not None:
+      self.expect(self.path, stream, packet)
+
+  def stop(self) -> None:
+    """ Stop starting new packets, the traffic ends when all the packets started are done. """
+    self.stopping = True
+
+  def busy(self) -> bool:
+    """ Check if some packets are started but their changes are not all scheduled yet. """
+    return False
+
+  def cycle(self, timestamp:int, cycle_index:int) -> None:
+    """ Schedule the changes of the signals from a rising edge of the clock. """
+    pass
+
+
+
+  def changes(self) -> Generator[tuple[int, str, int|str], None, None]:
+    """ Generator of the timestamps, identifier codes and values of the changes of all the signals, in timestamp order. """
+    for name in self.signals:
+      self.drive(0, name, self.idle_values.get(name, 0))
+
+    timestamp   = 0
+    cycle_index = 0
+    tail_cycles = self.tail_cycles
+    while True:
+
+      # Toggle the clocks and drive the signals of the cycle
+      for clock, inverted in self.clocks.items():
+        self.drive(timestamp,                         clock, int(not inverted))
+        self.drive(timestamp + self.clock_period // 2, clock, int(inverted))
+      self.cycle(timestamp, cycle_index)
+      timestamp   += self.clock_period
+      cycle_index += 1
+
+      # The changes before the next cycle are final, following cycles only schedule changes later
+      while self.events and self.events[0][0] < timestamp:
+        event_timestamp, _, name, value, mask = heapq.heappop(self.events)
+        if mask is not None:
+          value = self.values[name] & ~mask | value
+        self.values[name] = value
+        yield event_timestamp, self.identifiers[name], value
+
+      # End after some idle cycles once stopped
+      if self.stopping and not self.events and not self.busy():
+        tail_cycles -= 1
+        if tail_cycles < 0: return
+
+
+
+
+
+
+class APBTrafficGenerator(TrafficGenerator):
+  """ Generator of APB reads and writes with wait states. """
+
+  signals = {
+    "pclock"  : 1,
+    "psel"    : 1,
+    "penable" : 1,
+    "pready"  : 1,
+    "paddr"   : 32,
+    "pprot"   : 3,
+    "pnse"    : 1,
+    "pwrite"  : 1,
+    "pstrb"   : 4,
+    "pwdata"  : 32,
+    "prdata"  : 32,
+    "pslverr" : 1,
+  }
+  paths_type = APBInterfacePaths
+  clocks     = {"pclock": False}
+
+  def __init__(self,
+               path            : str,
+               clock_period    : int   = 10000,
+               density         : float = 0.5,
+               seed            : int   = 0,
+               max_wait_states : int   = 2,
+               error_rate      : float = 0.01):
+    """ Traffic with up to some wait states per transfer, and a probability of slave errors. """
+    super().__init__(path, clock_period, density, seed)
+    self.max_wait_states = max_wait_states
+    self.error_rate      = error_rate
+    self.transfer        = None # Values of the current transfer
+    self.wait_states     = 0    # Remaining wait states of the current transfer
+    self.phase           = None # Phase of the current transfer, None when idle
+
+  def busy(self) -> bool:
+    """ Check if a transfer is ongoing. """
+    return self.phase is not None
+
+
+
+  def cycle(self, timestamp:int, cycle_index:int) -> None:
+    """ Drive the setup and access phases of the transfers. """
+
+    # Access phase, the decoder samples the request on the rising edge where penable is asserted
+    if self.phase == "setup":
+      self.drive(timestamp, "penable", 1)
+      self.transfer["timestamp_request"] = timestamp
+      self.phase = "access"
+    elif self.phase == "access":
+      self.wait_states -= 1
+
+    # The slave is ready after the wait states
+    if self.phase == "access" and self.wait_states < 0:
+      self.drive(timestamp, "pready",  1)
+      self.drive(timestamp, "prdata",  self.transfer["prdata"])
+      self.drive(timestamp, "pslverr", self.transfer["pslverr"])
+      self.complete_transfer(timestamp)
+      self.phase = "done"
+      return
+
+    if self.phase == "access": return
+
+    # End of the previous transfer
+    self.phase = None
+    self.drive(timestamp, "penable", 0)
+    self.drive(timestamp, "pready",  0)
+
+    # Setup phase of a new transfer
+    if cycle_index >= 2 and not self.stopping and self.random.random() < self.density:
+      write = self.random.random() < 0.5
+      self.transfer = {
+        "pwrite"  : int(write),
+        "paddr"   : self.random.getrandbits(30) << 2,
+        "pprot"   : self.random.getrandbits(3),
+        "pnse"    : self.random.getrandbits(1),
+        "pstrb"   : self.random.getrandbits(4) if write else 0,
+        "pwdata"  : self.random.getrandbits(32),
+        "prdata"  : 0 if write else self.random.getrandbits(32),
+        "pslverr" : int(self.random.random() < self.error_rate),
+      }
+      self.drive(timestamp, "psel", 1)
+      for name in ("pwrite", "paddr", "pprot", "pnse", "pstrb", "pwdata"):
+        self.drive(timestamp, name, self.transfer[name])
+      self.wait_states = self.random.randint(0, self.max_wait_states)
+      self.phase       = "setup"
+    else:
+      self.drive(timestamp, "psel", 0)
+
+
+
+  def complete_transfer(self, timestamp:int) -> None:
+    """ Report the expected transaction of the current transfer. """
+    transfer = self.transfer
+    if transfer["pwrite"]:
+      transaction = APBTransactionWrite(
+        timestamp_request  = transfer["timestamp_request"],
+        timestamp_response = timestamp,
+        paddr              = binary_value(transfer["paddr"],   32),
+        pprot              = binary_value(transfer["pprot"],   3),
+        pnse               = binary_value(transfer["pnse"],    1),
+        pstrb              = binary_value(transfer["pstrb"],   4),
+        pwdata             = binary_value(transfer["pwdata"],  32),
+        pslverr            = binary_value(transfer["pslverr"], 1),
+      )
+    else:
+      transaction = APBTransactionRead(
+        timestamp_request  = transfer["timestamp_request"],
+        timestamp_response = timestamp,
+        paddr              = binary_value(transfer["paddr"],   32),
+        pprot              = binary_value(transfer["pprot"],   3),
+        pnse               = binary_value(transfer["pnse"],    1),
+        prdata             = binary_value(transfer["prdata"],  32),
+        pslverr            = binary_value(transfer["pslverr"], 1),
+      )
+    self.emit("transactions", transaction)
+
+
+
+
+
+
+class AXIChannel:
+  """ A valid-ready channel of an AXI interface, presenting its queued beats in order. """
+
+  def __init__(self, generator:TrafficGenerator, valid:str, ready:str, ready_density:float):
+    """ Channel with its valid and ready signals, and the probability of the receiver to be ready each cycle. """
+    self.generator     = generator
+    self.valid         = valid
+    self.ready         = ready
+    self.ready_density = ready_density
+    self.beats         = deque() # Timestamp from which each beat is available, its values, and a callback with the timestamp of its handshake
+
+  def push(self, timestamp:int, values:dict[str, int], handshake:Callable[[int], None]) -> None:
+    """ Queue a beat available from a timestamp. """
+    self.beats.append((timestamp, values, handshake))
+
+  def cycle(self, timestamp:int) -> None:
+    """ Drive the channel on a rising edge of the clock, the handshake happens on the edge where both valid and ready are set. """
+    ready = int(self.generator.random.random() < self.ready_density)
+    self.generator.drive(timestamp, self.ready, ready)
+    if self.beats and self.beats[0][0] <= timestamp:
+      _, values, handshake = self.beats[0]
+      self.generator.drive(timestamp, self.valid, 1)
+      for name, value in values.items():
+        self.generator.drive(timestamp, name, value)
+      if ready:
+        self.beats.popleft()
+        handshake(timestamp)
+    else:
+      self.generator.drive(timestamp, self.valid, 0)
+
+
+
+class AXITrafficGenerator(TrafficGenerator):
+  """ Generator of AXI read and write bursts with outstanding transactions. """
+
+  paths_type = AXIInterfacePaths
+  clocks     = {"aclock": False}
+
+  def __init__(self,
+               path             : str,
+               clock_period     : int   = 2000,
+               density          : float = 0.2,
+               seed             : int   = 0,
+               data_width       : int   = 64,
+               identifier_width : int   = 4,
+               outstanding      : int   = 4,
+               burst_lengths    : tuple = (1, 2, 4, 8, 16),
+               ready_density    : float = 0.8,
+               max_latency      : int   = 8,
+               error_rate       : float = 0.01):
+    """ Traffic with up to some outstanding transactions in each direction, each with its own identifier, and bursts of some lengths. The responses come back in order since the decoders pair them with the requests in order. """
+    super().__init__(path, clock_period, density, seed)
+    self.signals = {
+      "aclock"  : 1,
+      "awid"    : identifier_width,
+      "awaddr"  : 32,
+      "awlen"   : 8,
+      "awsize"  : 3,
+      "awburst" : 2,
+      "awprot"  : 3,
+      "awvalid" : 1,
+      "awready" : 1,
+      "wdata"   : data_width,
+      "wstrb"   : data_width // 8,
+      "wlast"   : 1,
+      "wvalid"  : 1,
+      "wready"  : 1,
+      "bid"     : identifier_width,
+      "bresp"   : 2,
+      "bvalid"  : 1,
+      "bready"  : 1,
+      "arid"    : identifier_width,
+      "araddr"  : 32,
+      "arlen"   : 8,
+      "arsize"  : 3,
+      "arburst" : 2,
+      "arprot"  : 3,
+      "arvalid" : 1,
+      "arready" : 1,
+      "rid"     : identifier_width,
+      "rresp"   : 2,
+      "rdata"   : data_width,
+      "rlast"   : 1,
+      "rvalid"  : 1,
+      "rready"  : 1,
+    }
+    self.data_width       = data_width
+    self.identifier_width = identifier_width
+    self.burst_lengths    = burst_lengths
+    self.max_latency      = max_latency
+    self.error_rate       = error_rate
+    self.size             = (data_width // 8).bit_length() - 1
+    self.write_address    = AXIChannel(self, "awvalid", "awready", ready_density)
+    self.write_data       = AXIChannel(self, "wvalid",  "wready",  ready_density)
+    self.write_response   = AXIChannel(self, "bvalid",  "bready",  ready_density)
+    self.read_address     = AXIChannel(self, "arvalid", "arready", ready_density)
+    self.read_data        = AXIChannel(self, "rvalid",  "rready",  ready_density)
+    self.channels         = (self.write_address, self.write_data, self.write_response, self.read_address, self.read_data)
+    self.write_identifiers = set(range(min(outstanding, 2**identifier_width)))
+    self.read_identifiers  = set(range(min(outstanding, 2**identifier_width)))
+    self.write_outstanding = 0
+    self.read_outstanding  = 0
+
+  def busy(self) -> bool:
+    """ Check if some transactions are outstanding. """
+    return bool(self.write_outstanding or self.read_outstanding)
+
+
+
+  def cycle(self, timestamp:int, cycle_index:int) -> None:
+    """ Start new transactions and drive all the channels. """
+    if cycle_index >= 2 and not self.stopping:
+      if self.write_identifiers and self.random.random() < self.density:
+        self.start_write(timestamp)
+      if self.read_identifiers and self.random.random() < self.density:
+        self.start_read(timestamp)
+    for channel in self.channels:
+      channel.cycle(timestamp)
+
+  def new_transaction(self, identifiers:set[int]) -> dict:
+    """ Pick the identifier and address fields of a new transaction. """
+    identifier = self.random.choice(sorted(identifiers))
+    identifiers.discard(identifier)
+    length = self.random.choice(self.burst_lengths) - 1
+    return {
+      "identifier"  : identifier,
+      "address"     : self.random.getrandbits(32 - self.size - 4) << (self.size + 4),
+      "length"      : length,
+      "burst"       : 1, # INCR
+      "permissions" : self.random.getrandbits(3),
+      "data"        : [self.random.getrandbits(self.data_width) for beat in range(length+1)],
+      "response"    : 2 if self.random.random() < self.error_rate else 0, # SLVERR or OKAY
+    }
+
+  def latency(self) -> int:
+    """ Random latency of a response in time units. """
+    return self.random.randint(1, self.max_latency) * self.clock_period
+
+
+
+  def start_write(self, timestamp:int) -> None:
+    """ Queue the address and data beats of a new write, the response is queued once both are done. """
+    transaction = self.new_transaction(self.write_identifiers)
+    self.write_outstanding += 1
+
+    def address_handshake(handshake_timestamp:int) -> None:
+      transaction["timestamp_address"] = handshake_timestamp
+      if "timestamp_data_last" in transaction:
+        self.queue_write_response(transaction, handshake_timestamp)
+
+    def data_handshake(handshake_timestamp:int) -> None:
+      transaction.setdefault("timestamp_data_first", handshake_timestamp)
+      transaction["beats"] = transaction.get("beats", 0) + 1
+      if transaction["beats"] == transaction["length"] + 1:
+        transaction["timestamp_data_last"] = handshake_timestamp
+        if "timestamp_address" in transaction:
+          self.queue_write_response(transaction, handshake_timestamp)
+
+    self.write_address.push(timestamp, {
+      "awid"    : transaction["identifier"],
+      "awaddr"  : transaction["address"],
+      "awlen"   : transaction["length"],
+      "awsize"  : self.size,
+      "awburst" : transaction["burst"],
+      "awprot"  : transaction["permissions"],
+    }, address_handshake)
+    for beat, data in enumerate(transaction["data"]):
+      self.write_data.push(timestamp, {
+        "wdata" : data,
+        "wstrb" : 2**(self.data_width // 8) - 1,
+        "wlast" : int(beat == transaction["length"]),
+      }, data_handshake)
+
+  def queue_write_response(self, transaction:dict, timestamp:int) -> None:
+    """ Queue the response of a write after its address and data. """
+
+    def response_handshake(handshake_timestamp:int) -> None:
+      self.write_identifiers.add(transaction["identifier"])
+      self.write_outstanding -= 1
+      self.emit("write_transactions", AXITransactionWrite(
+        timestamp_address    = transaction["timestamp_address"],
+        timestamp_data_first = transaction["timestamp_data_first"],
+        timestamp_data_last  = transaction["timestamp_data_last"],
+        timestamp_response   = handshake_timestamp,
+        **self.transaction_values(transaction),
+      ))
+
+    self.write_response.push(timestamp + self.latency(), {
+      "bid"   : transaction["identifier"],
+      "bresp" : transaction["response"],
+    }, response_handshake)
+
+
+
+  def start_read(self, timestamp:int) -> None:
+    """ Queue the address of a new read, the data beats are queued once it is done. """
+    transaction = self.new_transaction(self.read_identifiers)
+    self.read_outstanding += 1
+
+    def data_handshake(handshake_timestamp:int) -> None:
+      transaction.setdefault("timestamp_data_first", handshake_timestamp)
+      transaction["beats"] = transaction.get("beats", 0) + 1
+      if transaction["beats"] == transaction["length"] + 1:
+        self.read_identifiers.add(transaction["identifier"])
+        self.read_outstanding -= 1
+        self.emit("read_transactions", AXITransactionRead(
+          timestamp_address    = transaction["timestamp_address"],
+          timestamp_data_first = transaction["timestamp_data_first"],
+          timestamp_data_last  = handshake_timestamp,
+          **self.transaction_values(transaction),
+        ))
+
+    def address_handshake(handshake_timestamp:int) -> None:
+      transaction["timestamp_address"] = handshake_timestamp
+      data_timestamp = handshake_timestamp + self.latency()
+      for beat, data in enumerate(transaction["data"]):
+        self.read_data.push(data_timestamp, {
+          "rid"   : transaction["identifier"],
+          "rresp" : transaction["response"],
+          "rdata" : data,
+          "rlast" : int(beat == transaction["length"]),
+        }, data_handshake)
+
+    self.read_address.push(timestamp, {
+      "arid"    : transaction["identifier"],
+      "araddr"  : transaction["address"],
+      "arlen"   : transaction["length"],
+      "arsize"  : self.size,
+      "arburst" : transaction["burst"],
+      "arprot"  : transaction["permissions"],
+    }, address_handshake)
+
+
+
+  def transaction_values(self, transaction:dict) -> dict[str, VCDValue]:
+    """ Expected fields of a transaction, the first beat is in the LSBs of the data. """
+    return {
+      "identifier"  : binary_value(transaction["identifier"],  self.identifier_width),
+      "address"     : binary_value(transaction["address"],     32),
+      "length"      : binary_value(transaction["length"],      8),
+      "size"        : binary_value(self.size,                  3),
+      "burst"       : binary_value(transaction["burst"],       2),
+      "permissions" : binary_value(transaction["permissions"], 3),
+      "data"        : VCDValue("b" + "".join(format(data, f"0{self.data_width}b") for data in reversed(transaction["data"])), self.data_width * len(transaction["data"])),
+      "response"    : binary_value(transaction["response"],    2),
+    }
+
+
+
+
+
+
+# Slices of the fields in the four words of the DDR5 commands, from the MSBs to the LSBs
+ddr5_chip_id_layout               = ((1,4,3),)
+ddr5_bank_group_address_layout    = ((1,1,3),)
+ddr5_bank_address_layout          = ((1,0,1), (0,6,1))
+ddr5_row_address_layout           = ((3,0,7), (2,0,7), (0,2,4))
+ddr5_read_column_address_layout   = ((3,0,2), (2,0,7)) # Column address without its 2 LSBs
+ddr5_write_column_address_layout  = ((3,0,2), (2,1,6)) # Column address without its 3 LSBs
+ddr5_burst_length_layout          = ((0,5,1),)
+ddr5_partial_write_layout         = ((3,4,1),)
+ddr5_mode_register_layout         = ((0,5,2), (1,0,6))
+ddr5_operation_layout             = ((2,0,7), (3,0,1))
+ddr5_refresh_interval_rate_layout = ((1,1,1),)
+
+# Function bits of the first word of the DDR5 commands
+ddr5_read_function                = 0b11101
+ddr5_write_function               = 0b01101
+ddr5_precharge_function           = 0b11011
+ddr5_precharge_all_function       = 0b01011
+ddr5_refresh_function             = 0b10011
+ddr5_mode_register_write_function = 0b00101
+
+class DDR5TrafficGenerator(TrafficGenerator):
+  """ Generator of DDR5 commands following the states of the banks, with the data bursts of the reads and writes. """
+
+  signals = {
+    "CK_T"  : 1,
+    "CK_C"  : 1,
+    "CS_N"  : ddr.ranks_per_channel,
+    "CA"    : 7,
+    "DQS_T" : 5,
+    "DQS_C" : 5,
+    "DQ"    : ddr.ddr5_data_bus_width,
+    "CB"    : 8,
+  }
+  paths_type  = ddr.DDR5InterfacePaths
+  clocks      = {"CK_T": False, "CK_C": True}
+  idle_values = {"CS_N": 2**ddr.ranks_per_channel - 1}
+
+  def __init__(self,
+               path         : str,
+               clock_period : int   = 384,
+               density      : float = 0.5,
+               seed         : int   = 0):
+    """ Traffic with a probability to issue a command in each slot of four cycles. The clock period must be a multiple of 4 time units for the strobes. """
+    super().__init__(path, clock_period, density, seed)
+    self.open_rows    = {}  # Row of each open bank by rank, bank group and bank
+    self.bursts       = []  # Start and end timestamps of the data bursts scheduled
+    self.next_command = 2   # Index of the first cycle of the next command slot
+
+
+
+  def cycle(self, timestamp:int, cycle_index:int) -> None:
+    """ Issue a command on the first cycle of each command slot. """
+    if cycle_index < self.next_command or self.stopping: return
+    self.next_command = cycle_index + 4
+    if self.random.random() >= self.density: return
+    command = self.pick_command(timestamp)
+    if command is None: return
+    words, expected, burst = command
+
+    # Chip select for the first cycle, then the four words on consecutive cycles
+    period = self.clock_period
+    self.drive(timestamp,          "CS_N", (2**ddr.ranks_per_channel - 1) & ~(1 << expected.chip_select))
+    self.drive(timestamp + period, "CS_N", 2**ddr.ranks_per_channel - 1)
+    for word_index, word in enumerate(words):
+      self.drive(timestamp + word_index * period, "CA", word)
+
+    if burst is not None:
+      self.drive_burst(*burst)
+      expected.data, expected.ecc = self.burst_values(*burst)
+    self.emit("commands", expected)
+
+
+
+  def pick_command(self, timestamp:int) -> tuple | None:
+    """ Pick a command for a random bank depending on its state, with its words, the expected command, and its data burst if any. """
+    random      = self.random
+    rank        = random.randrange(ddr.ranks_per_channel)
+    bank_group  = random.randrange(ddr.bank_groups_per_chip)
+    bank        = random.randrange(ddr.banks_per_bank_group)
+    open_row    = self.open_rows.get((rank, bank_group, bank))
+    choice      = random.random()
+    words       = [0, 0, 0, 0]
+    period      = self.clock_period
+    chip_select = VCDValue(f"r{rank}", 0)
+    chip_id     = binary_value(0, 3)
+    encode_fields(words, 0, ddr5_chip_id_layout)
+
+    # Closed bank
+    if open_row is None:
+      rank_closed = not any(open_rank == rank for open_rank, _, _ in self.open_rows)
+      if choice < 0.02 and rank_closed:
+        words[0] |= ddr5_refresh_function
+        words[1] |= 0b01 << 2
+        encode_fields(words, 0, ddr5_refresh_interval_rate_layout)
+        return words, ddr.DDR5Command_RefreshAll(
+          timestamp             = timestamp,
+          chip_select           = chip_select,
+          chip_id               = chip_id,
+          refresh_interval_rate = binary_value(0, 1),
+        ), None
+      if choice < 0.04:
+        words[0] |= ddr5_refresh_function
+        words[1] |= 0b11 << 2
+        encode_fields(words, bank, ddr5_bank_address_layout)
+        return words, ddr.DDR5Command_RefreshSameBank(
+          timestamp             = timestamp,
+          chip_select           = chip_select,
+          chip_id               = chip_id,
+          bank_address          = binary_value(bank, 2),
+          refresh_interval_rate = binary_value(0, 1),
+        ), None
+      if choice < 0.05:
+        mode_register = random.getrandbits(8)
+        operation     = random.getrandbits(8)
+        words[0] |= ddr5_mode_register_write_function
+        encode_fields(words, mode_register, ddr5_mode_register_layout)
+        encode_fields(words, operation,     ddr5_operation_layout)
+        return words, ddr.DDR5Command_ModeRegisterWrite(
+          timestamp     = timestamp + 2 * period,
+          chip_select   = chip_select,
+          mode_register = binary_value(mode_register, 8),
+          operation     = binary_value(operation,     8),
+          control_word  = binary_value(0,             1),
+        ), None
+      row = random.randrange(ddr.rows_per_bank)
+      self.open_rows[rank, bank_group, bank] = row
+      encode_fields(words, bank_group, ddr5_bank_group_address_layout)
+      encode_fields(words, bank,       ddr5_bank_address_layout)
+      encode_fields(words, row,        ddr5_row_address_layout)
+      return words, ddr.DDR5Command_Activate(
+        timestamp          = timestamp + 2 * period,
+        chip_select        = chip_select,
+        chip_id            = chip_id,
+        bank_group_address = binary_value(bank_group, 3),
+        bank_address       = binary_value(bank,       2),
+        row_address        = binary_value(row,        18),
+      ), None
+
+    # Precharge of an open bank or of all the banks of the rank
+    encode_fields(words, bank_group, ddr5_bank_group_address_layout)
+    encode_fields(words, bank,       ddr5_bank_address_layout)
+    if choice >= 0.99:
+      words[0] = ddr5_precharge_all_function
+      words[1] &= ~0b1111
+      for open_bank in [open_bank for open_bank in self.open_rows if open_bank[0] == rank]:
+        del self.open_rows[open_bank]
+      return words, ddr.DDR5Command_PrechargeAll(
+        timestamp   = timestamp,
+        chip_select = chip_select,
+        chip_id     = chip_id,
+      ), None
+    if choice >= 0.95:
+      words[0] |= ddr5_precharge_function
+      del self.open_rows[rank, bank_group, bank]
+      return words, ddr.DDR5Command_Precharge(
+        timestamp          = timestamp,
+        chip_select        = chip_select,
+        chip_id            = chip_id,
+        bank_group_address = binary_value(bank_group, 3),
+        bank_address       = binary_value(bank,       2),
+      ), None
+
+    # Read or write of a column of an open bank, only if the data bus is free for the burst
+    write          = choice >= 0.45
+    auto_precharge = choice >= 0.85
+    data_latency   = ddr.write_latency if write else ddr.read_latency
+    burst_start    = timestamp + 2 * period + period // 2 + (data_latency - 1) * period
+    burst_end      = burst_start + (ddr.ddr5_burst_length + 1) * period // 2
+    self.bursts    = [burst for burst in self.bursts if burst[1] > timestamp]
+    if any(start < burst_end and burst_start < end for start, end in self.bursts): return None
+    self.bursts.append((burst_start, burst_end))
+    if auto_precharge:
+      del self.open_rows[rank, bank_group, bank]
+
+    column_address = random.randrange(ddr.columns_per_row) << 4
+    words[0] |= ddr5_write_function if write else ddr5_read_function
+    words[3] |= int(not auto_precharge) << 3
+    encode_fields(words, 1, ddr5_burst_length_layout)
+    command_fields = {
+      "timestamp"          : timestamp + 2 * period,
+      "chip_select"        : chip_select,
+      "chip_id"            : chip_id,
+      "bank_group_address" : binary_value(bank_group,     3),
+      "bank_address"       : binary_value(bank,           2),
+      "column_address"     : binary_value(column_address, 11),
+      "burst_length"       : binary_value(1,              1),
+    }
+    if write:
+      encode_fields(words, column_address >> 3, ddr5_write_column_address_layout)
+      encode_fields(words, 1,                   ddr5_partial_write_layout)
+      command_fields["partial_write"] = binary_value(1, 1)
+      command_type = ddr.DDR5Command_WriteAutoPrecharge if auto_precharge else ddr.DDR5Command_Write
+    else:
+      encode_fields(words, column_address >> 2, ddr5_read_column_address_layout)
+      command_type = ddr.DDR5Command_ReadAutoPrecharge if auto_precharge else ddr.DDR5Command_Read
+
+    data = [random.getrandbits(ddr.ddr5_data_bus_width) for beat in range(ddr.ddr5_burst_length)]
+    ecc  = [random.getrandbits(8)                       for beat in range(ddr.ddr5_burst_length)]
+    return words, command_type(**command_fields), (burst_start, data, ecc)
+
+
+
+  def drive_burst(self, burst_start:int, data:list[int], ecc:list[int]) -> None:
+    """ Drive the beats of a data burst, each beat is captured on an edge of DQS_T or DQS_C in the middle of the beat. """
+    unit_interval = self.clock_period // 2
+    for beat, (data_beat, ecc_beat) in enumerate(zip(data, ecc)):
+      beat_timestamp = burst_start + beat * unit_interval
+      self.drive(beat_timestamp, "DQ", data_beat)
+      self.drive(beat_timestamp, "CB", ecc_beat)
+      self.drive(beat_timestamp + unit_interval // 2, "DQS_T", 0b11111 if beat % 2 == 0 else 0)
+      self.drive(beat_timestamp + unit_interval // 2, "DQS_C", 0 if beat % 2 == 0 else 0b11111)
+    burst_end = burst_start + len(data) * unit_interval + unit_interval // 2
+    self.drive(burst_end, "DQS_T", 0)
+    self.drive(burst_end, "DQS_C", 0)
+
+  def burst_values(self, burst_start:int, data:list[int], ecc:list[int]) -> tuple[VCDValue, VCDValue]:
+    """ Expected data and check bits of a burst, the first beat is in the MSBs. """
+    data_value = VCDValue("b" + "".join(format(beat, f"0{ddr.ddr5_data_bus_width}b") for beat in data), ddr.ddr5_data_bus_width * len(data))
+    ecc_value  = VCDValue("b" + "".join(format(beat, "08b") for beat in ecc), 8 * len(ecc)) if ddr.enable_ecc else VCDValue.none()
+    return data_value, ecc_value
+
+
+
+
+
+
+# Slices of the fields in the words of the HBM2e row and column commands, from the MSBs to the LSBs
+hbm2e_activate_stack_id_layout     = ((1,6,1), (0,2,1))
+hbm2e_activate_row_address_layout  = ((0,6,1), (1,4,1), (1,0,2), (2,0,6), (3,3,3), (3,0,2))
+hbm2e_row_stack_id_layout          = ((0,6,1), (1,1,1))
+hbm2e_row_bank_address_layout      = ((1,5,1), (0,3,3))
+hbm2e_column_stack_id_layout       = ((0,8,1), (1,0,1))
+hbm2e_column_bank_address_layout   = ((0,4,3),)
+hbm2e_column_address_layout        = ((1,3,4), (1,1,1)) # Column address without its LSB
+hbm2e_mode_register_layout         = ((0,4,3),)
+hbm2e_operation_layout             = ((1,3,5), (1,0,2))
+
+# NOP of the row and column buses
+hbm2e_row_nop    = 0b111
+hbm2e_column_nop = 0b111
+
+# Function bits of the first word of the HBM2e commands
+hbm2e_activate_function   = 0b10
+hbm2e_precharge_function  = 0b011
+hbm2e_refresh_function    = 0b100
+hbm2e_read_function       = 0b0101
+hbm2e_write_function      = 0b0001
+hbm2e_auto_precharge_flag = 0b1000
+
+def hbm2e_parity(*words:int) -> int:
+  """ Even parity bit of some command words. """
+  return sum(word.bit_count() for word in words) % 2
+
+class HBM2eTrafficGenerator(TrafficGenerator):
+  """ Generator of HBM2e row and column commands following the states of the banks, with the data bursts of the reads and writes on both pseudo-channels. """
+
+  signals = {
+    "CK_T"   : 1,
+    "CK_C"   : 1,
+    "CKE"    : 1,
+    "R"      : 7,
+    "C"      : 9,
+    "RDQS_T" : 4,
+    "RDQS_C" : 4,
+    "WDQS_T" : 4,
+    "WDQS_C" : 4,
+    "DQ"     : 2 * hbm.data_bus_width,
+    "DBI"    : 2 * hbm.data_bus_inversion_width,
+    "DM"     : 2 * hbm.data_bus_inversion_width,
+    "PAR"    : 4,
+    "DERR"   : 2,
+    "AERR"   : 1,
+  }
+  paths_type  = hbm.HBM2eInterfacePaths
+  clocks      = {"CK_T": False, "CK_C": True}
+  idle_values = {"CKE": 1, "R": hbm2e_row_nop, "C": hbm2e_column_nop}
+
+  # The column commands only carry three bits of bank address, the traffic only uses the banks they can address
+  banks_per_stack = 2**3
+
+  def __init__(self,
+               path         : str,
+               clock_period : int   = 624,
+               density      : float = 0.3,
+               seed         : int   = 0):
+    """ Traffic with a probability to issue a row command and a column command each cycle. The clock period must be a multiple of 4 time units for the strobes. """
+    super().__init__(path, clock_period, density, seed)
+    self.open_rows  = {}  # Row of each open bank by pseudo-channel, stack and bank
+    self.bursts     = [[] for _ in range(hbm.pseudo_channel_per_channel)] # Start and end timestamps of the data bursts scheduled on each pseudo-channel
+    self.next_row   = 2   # Index of the next cycle where the row bus is free
+    self.last_words = {}  # Timestamp of the end and last word of the last command on each bus
+
+
+
+  def cycle(self, timestamp:int, cycle_index:int) -> None:
+    """ Issue a row command and a column command. """
+    if cycle_index < 2 or self.stopping: return
+    if cycle_index >= self.next_row and self.random.random() < self.density:
+      self.issue_row_command(timestamp, cycle_index)
+    if self.random.random() < self.density:
+      self.issue_column_command(timestamp)
+
+  def drive_words(self, timestamp:int, bus:str, words:list[int], nop:int) -> None:
+    """ Drive the words of a command on the rising and falling edges of the clock, then a NOP. """
+    half_period = self.clock_period // 2
+    for word_index, word in enumerate(words):
+      self.drive(timestamp + word_index * half_period, bus, word)
+    self.drive(timestamp + len(words) * half_period, bus, nop)
+    self.last_words[bus] = (timestamp + len(words) * half_period, words[-1])
+
+  def collides(self, timestamp:int, bus:str, word:int) -> bool:
+    """ Check if the first word of a command is the last word of the command just before, the decoders need a change of the bus to find a command. """
+    return self.last_words.get(bus) == (timestamp, word)
+
+
+
+  def issue_row_command(self, timestamp:int, cycle_index:int) -> None:
+    """ Issue a row command for a random bank depending on its state. """
+    random         = self.random
+    pseudo_channel = random.randrange(hbm.pseudo_channel_per_channel)
+    stack_id       = random.randrange(2**hbm.stack_id_width)
+    bank           = random.randrange(self.banks_per_stack)
+    open_row       = self.open_rows.get((pseudo_channel, stack_id, bank))
+    choice         = random.random()
+    words          = [0, 0]
+    words[1]      |= pseudo_channel << 3
+    command_fields = {"pseudo_channel": binary_value(pseudo_channel, 1)}
+
+    # Activate of a closed bank over two cycles
+    if open_row is None and choice >= 0.05:
+      command_type = hbm.HBM2eRowCommand_Activate
+      row          = random.randrange(hbm.rows_per_bank)
+      words       += [0, 0]
+      words[0]    |= hbm2e_activate_function
+      encode_fields(words, stack_id, hbm2e_activate_stack_id_layout)
+      encode_fields(words, bank,     hbm2e_row_bank_address_layout)
+      encode_fields(words, row,      hbm2e_activate_row_address_layout)
+      parity = hbm2e_parity(words[2], words[3]) << 1 | hbm2e_parity(words[0], words[1])
+      words[1] |= (parity & 1)  << 2
+      words[3] |= (parity >> 1) << 2
+      command_fields |= {
+        "timestamp"    : timestamp + self.clock_period,
+        "parity"       : binary_value(parity,   2),
+        "stack_id"     : binary_value(stack_id, 2),
+        "bank_address" : binary_value(bank,     4),
+        "row_address"  : binary_value(row,      15),
+      }
+
+    else:
+
+      # Refresh of a closed bank, or of the pseudo-channel if all its banks are closed
+      if open_row is None:
+        pseudo_channel_closed = not any(open_pseudo_channel == pseudo_channel for open_pseudo_channel, _, _ in self.open_rows)
+        words[0] |= hbm2e_refresh_function
+        if choice < 0.01 and pseudo_channel_closed:
+          words[1] |= 1 << 4
+          command_type = hbm.HBM2eRowCommand_Refresh
+        else:
+          command_type = hbm.HBM2eRowCommand_SingleBankRefresh
+
+      # Precharge of an open bank, or of all the banks of the pseudo-channel
+      else:
+        if choice >= 0.3: return
+        words[0] |= hbm2e_precharge_function
+        if choice < 0.02:
+          words[1] |= 1 << 4
+          command_type = hbm.HBM2eRowCommand_PrechargeAll
+        else:
+          command_type = hbm.HBM2eRowCommand_Precharge
+
+      # Single cycle row commands
+      if command_type in (hbm.HBM2eRowCommand_Precharge, hbm.HBM2eRowCommand_SingleBankRefresh):
+        encode_fields(words, stack_id, hbm2e_row_stack_id_layout)
+        encode_fields(words, bank,     hbm2e_row_bank_address_layout)
+        command_fields["stack_id"]     = binary_value(stack_id, 2)
+        command_fields["bank_address"] = binary_value(bank,     4)
+      parity = hbm2e_parity(*words)
+      words[1] |= parity << 2
+      command_fields["timestamp"] = timestamp
+      command_fields["parity"]    = binary_value(parity, 1)
+
+    if self.collides(timestamp, "R", words[0]): return
+
+    # Update the states of the banks
+    if command_type == hbm.HBM2eRowCommand_Activate:
+      self.open_rows[pseudo_channel, stack_id, bank] = row
+    elif command_type == hbm.HBM2eRowCommand_Precharge:
+      del self.open_rows[pseudo_channel, stack_id, bank]
+    elif command_type == hbm.HBM2eRowCommand_PrechargeAll:
+      for open_bank in [open_bank for open_bank in self.open_rows if open_bank[0] == pseudo_channel]:
+        del self.open_rows[open_bank]
+
+    self.next_row = cycle_index + len(words) // 2
+    self.drive_words(timestamp, "R", words, hbm2e_row_nop)
+    self.emit("row_commands", command_type(**command_fields))
+
+
+
+  def issue_column_command(self, timestamp:int) -> None:
+    """ Issue a read or write to a random open bank, only if the data bus of its pseudo-channel is free for the burst. """
+    random = self.random
+    words  = [0, 0]
+
+    # Mode register set when no bank is open
+    if not self.open_rows:
+      if random.random() >= 0.01: return
+      mode_register = random.randrange(2**3)
+      operation     = random.getrandbits(7)
+      encode_fields(words, mode_register, hbm2e_mode_register_layout)
+      encode_fields(words, operation,     hbm2e_operation_layout)
+      parity = hbm2e_parity(*words)
+      words[1] |= parity << 2
+      if self.collides(timestamp, "C", words[0]): return
+      self.drive_words(timestamp, "C", words, hbm2e_column_nop)
+      self.emit("column_commands", hbm.HBM2eColumnCommand_ModeRegisterSet(
+        timestamp     = timestamp,
+        parity        = binary_value(parity,        1),
+        mode_register = binary_value(mode_register, 3),
+        operation     = binary_value(operation,     7),
+      ))
+      return
+
+    pseudo_channel, stack_id, bank = random.choice(list(self.open_rows))
+    choice         = random.random()
+    write          = choice >= 0.5
+    auto_precharge = choice >= 0.9 or 0.4 <= choice < 0.5
+    column         = random.randrange(hbm.columns_per_row)
+    words[0] |= hbm2e_write_function if write else hbm2e_read_function
+    if auto_precharge:
+      words[0] |= hbm2e_auto_precharge_flag
+    words[1] |= pseudo_channel << 7
+    encode_fields(words, stack_id, hbm2e_column_stack_id_layout)
+    encode_fields(words, bank,     hbm2e_column_bank_address_layout)
+    encode_fields(words, column,   hbm2e_column_address_layout)
+    parity = hbm2e_parity(*words)
+    words[1] |= parity << 2
+    if self.collides(timestamp, "C", words[0]): return
+
+    # Reserve the data bus of the pseudo-channel for the burst
+    data_latency = hbm.write_latency if write else hbm.read_latency
+    period       = self.clock_period
+    burst_start  = timestamp + period // 2 + (data_latency - 1) * period
+    burst_end    = burst_start + (hbm.burst_length + 1) * period // 2
+    bursts       = [burst for burst in self.bursts[pseudo_channel] if burst[1] > timestamp]
+    self.bursts[pseudo_channel] = bursts
+    if any(start < burst_end and burst_start < end for start, end in bursts): return
+    bursts.append((burst_start, burst_end))
+    if auto_precharge:
+      del self.open_rows[pseudo_channel, stack_id, bank]
+    self.drive_words(timestamp, "C", words, hbm2e_column_nop)
+
+    if write: command_type = hbm.HBM2eColumnCommand_WriteAutoPrecharge if auto_precharge else hbm.HBM2eColumnCommand_Write
+    else:     command_type = hbm.HBM2eColumnCommand_ReadAutoPrecharge  if auto_precharge else hbm.HBM2eColumnCommand_Read
+    command = command_type(
+      timestamp      = timestamp,
+      parity         = binary_value(parity,         1),
+      pseudo_channel = binary_value(pseudo_channel, 1),
+      stack_id       = binary_value(stack_id,       2),
+      bank_address   = binary_value(bank,           3),
+      column_address = binary_value(column << 1,    6),
+    )
+    beats = [random.getrandbits(hbm.data_bus_width) for beat in range(hbm.burst_length)]
+    self.drive_burst(burst_start, beats, write, pseudo_channel)
+    command.data = VCDValue("b" + "".join(format(beat, f"0{hbm.data_bus_width}b") for beat in beats), hbm.data_width)
+    self.emit("column_commands", command)
+
+
+
+  def drive_burst(self, burst_start:int, beats:list[int], write:bool, pseudo_channel:int) -> None:
+    """ Drive the beats of a data burst on the half of the buses of a pseudo-channel, with the halves of the beats switched and the bytes with more ones than zeros inverted. """
+    unit_interval   = self.clock_period // 2
+    strobe_t        = "WDQS_T" if write else "RDQS_T"
+    strobe_c        = "WDQS_C" if write else "RDQS_C"
+    data_shift      = pseudo_channel * hbm.data_bus_width
+    data_mask       = (2**hbm.data_bus_width - 1) << data_shift
+    inversion_shift = pseudo_channel * hbm.data_bus_inversion_width
+    inversion_mask  = (2**hbm.data_bus_inversion_width - 1) << inversion_shift
+    strobe_mask     = 0b11 << (pseudo_channel * 2)
+    half_width      = hbm.data_bus_width // 2
+    for beat_index, beat in enumerate(beats):
+      beat_timestamp = burst_start + beat_index * unit_interval
+      wire_beat      = (beat & (2**half_width - 1)) << half_width | beat >> half_width
+      inversion      = 0
+      if hbm.enable_data_bus_inversion:
+        for byte_index in range(hbm.data_bus_inversion_width):
+          if (wire_beat >> (byte_index * 8) & 0xFF).bit_count() > 4:
+            inversion |= 1 << byte_index
+        wire_beat ^= hbm.data_bus_inversion_masks[inversion]
+      self.drive(beat_timestamp, "DQ",  wire_beat << data_shift,      data_mask)
+      self.drive(beat_timestamp, "DBI", inversion << inversion_shift, inversion_mask)
+      self.drive(beat_timestamp + unit_interval // 2, strobe_t, strobe_mask if beat_index % 2 == 0 else 0, strobe_mask)
+      self.drive(beat_timestamp + unit_interval // 2, strobe_c, 0 if beat_index % 2 == 0 else strobe_mask, strobe_mask)
+    burst_end = burst_start + len(beats) * unit_interval + unit_interval // 2
+    self.drive(burst_end, strobe_t, 0, strobe_mask)
+    self.drive(burst_end, strobe_c, 0, strobe_mask)
+
+
+
+
+
+
+def generate_vcd(vcd_path      : str,
+                 generators    : list[TrafficGenerator],
+                 size          : int,
+                 timescale     : str = "1ps",
+                 expected_path : str = None) -> None:
+  """ Write a VCD with the traffic of some interfaces until it reaches a size in bytes, streaming in constant memory. The expected packets of each decoder are written as JSON lines. """
+  with open(vcd_path, "w") as vcd_file, (open(expected_path, "w") if expected_path else nullcontext()) as expected_file:
+    writer = VCDWriter(vcd_file, timescale)
+    for generator in generators:
+      generator.declare(writer)
+
+      # Expected packets are written as soon as they are generated, with the interface and stream of the decoder
+      if expected_file is not None:
+        def expect(path:str, stream:str, packet:Packet) -> None:
+          expected_file.write(json.dumps({"interface": path, "stream": stream} | packet_record(packet)) + "\n")
+        generator.expect = expect
+    writer.write_header()
+
+    # Merge the changes of all the interfaces, stop starting packets once the dump is large enough
+    stopping = False
+    for timestamp, identifier, value in heapq.merge(*(generator.changes() for generator in generators), key=lambda change: change[0]):
+      writer.change(timestamp, identifier, value)
+      if not stopping and writer.size >= size:
+        stopping = True
+        for generator in generators:
+          generator.stop()
+    writer.close()
@@ -1,4 +1,5 @@
 import re
+import time
 import heapq
 import subprocess
 
@@ -10,6 +11,8 @@ from typing import (
 
 from .packet import Packet
 from .annotator import Annotator
+from . import stats
+from . import tracing
 
 
 
@@ -115,10 +118,39 @@ def merge_packet_generators(*packet_generators : Generator[Packet, None, None],
   yield from heapq.merge(*packet_generators, key=key)
 
 def packet_and_annotator_generator(packet_generator:Generator[Packet, None, None], *annotators:Annotator) -> Generator[str, None, None]:
+  """ Display packets with annotations, each packet is only passed to the annotators interested in its class. """
+
+  # Interest of each annotator, resolved once per packet class
+  annotators_interested = {}
+
   for packet in packet_generator:
-    for annotator in annotators:
-      annotator.update(packet)
-    yield repr(packet) + "  " + " ".join(repr(annotator) for annotator in annotators)
+    packet_type = type(packet)
+    interested  = annotators_interested.get(packet_type)
+    if interested is None:
+      interested = tuple(annotator.accepts(packet_type) for annotator in annotators)
+      annotators_interested[packet_type] = interested
+
+    # Annotators not interested in the packet keep their state and display their idle annotation
+    annotations = []
+    for annotator, annotator_interested in zip(annotators, interested):
+      if stats.enabled or tracing.enabled: start = time.perf_counter_ns()
+      if annotator_interested:
+        annotator.update(packet)
+        annotations.append(annotator.render())
+      else:
+        annotations.append(annotator.render_idle())
+      if stats.enabled or tracing.enabled:
+        end = time.perf_counter_ns()
+        if stats.enabled:   stats.add_time(stats.annotator_times, type(annotator).__name__, (end - start) / 1e9)
+        if tracing.enabled: tracing.record(type(annotator).__name__, "annotate", start, end)
+
+    if tracing.enabled:
+      start = time.perf_counter_ns()
+      line  = repr(packet) + "  " + " ".join(annotations)
+      tracing.record("render", "render", start, time.perf_counter_ns())
+      yield line
+    else:
+      yield repr(packet) + "  " + " ".join(annotations)
 
 
 
@@ -127,8 +159,9 @@ def display_packets_with_pager(packet_generator:Generator[Packet|str, None, None
   pager = subprocess.Popen(['less', '-R', '-S', '-#', '8'], stdin=subprocess.PIPE, text=True)
   try:
     for packet in packet_generator:
-      pager.stdin.write(str(packet)+'\n')
-      pager.stdin.flush()
+      with tracing.span("pager write", "pager"):
+        pager.stdin.write(str(packet)+'\n')
+        pager.stdin.flush()
     pager.stdin.close()
     pager.wait()
   except BrokenPipeError:
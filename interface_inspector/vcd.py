@@ -1,11 +1,30 @@
 from __future__ import annotations
+import re
+import fnmatch
+from abc import ABCMeta, abstractmethod
+from array import array
 from enum import Enum
-from bisect import bisect_right
-from pyDigitalWaveTools.vcd.parser import (
-  VcdParser,
-  VcdVarScope,
+from typing import Iterable, Sequence
+from bisect import bisect_left, bisect_right
+from operator import sub
+from math import gcd
+from . import stats
+from . import tracing
+from .vcd_parser import (
+  VCDScope,
+  VCDSeries,
+  VCDVariable,
+  parse_vcd_header,
+  parse_vcd_values,
 )
 
+# The pyDigitalWaveTools parser is optional, only needed for its backend
+try:
+  from pyDigitalWaveTools.vcd.parser import VcdParser, VcdVarScope
+except ImportError:
+  VcdParser   = None
+  VcdVarScope = VCDScope
+
 
 
 
@@ -21,9 +40,14 @@ class VCDFormat(Enum):
 class VCDValue:
   """ A value from a VCD. """
 
+  # Only the interned values are shared and immutable
+  interned = False
+
   def __init__(self, value:str="", width:int=0):
     """ VCD value from the raw values from the VCD and the width of the signal. """
 
+    if stats.enabled: stats.count("vcd_value_allocations")
+
     self.width = width
 
     # Empty string means empty binary value
@@ -76,7 +100,7 @@ class VCDValue:
     return VCDValue("b"+value_sliced, len(value_sliced))
 
   def __setitem__(self, key:int|slice, value:VCDValue) -> None:
-    """ The [] operator uses binary indexing instead of string indexing. """
+    """ The [] operator uses binary indexing instead of string indexing. Interned values can't be modified, copy them first. """
     value_modified      = list(self.value)        # String to list to use item assignment
     value_modified      = value_modified[::-1]    # Reverse to use binary indexing
     value_modified[key] = list(value.value)[::-1] # Assign item with reverse order
@@ -222,6 +246,28 @@ class VCDValue:
     return True
 
 
+  def copy(self) -> VCDValue:
+    """ New value that can be modified, equal to this one. """
+    value = VCDValue.__new__(VCDValue)
+    value.__dict__.update(self.__dict__)
+    return value
+
+  @staticmethod
+  def intern(value:str, width:int) -> VCDValue:
+    """ VCD value from the raw values from the VCD and the width of the signal, shared and immutable for small widths.
+      Only used by the parsers and the sample columns, the values built by the callers with the constructor, the factories or the [] operator can be modified. """
+    if width > intern_max_width:
+      return VCDValue(value, width)
+    key            = (width, value)
+    interned_value = interned_values.get(key)
+    if interned_value is None:
+      interned_value           = VCDValue(value, width)
+      interned_value.__class__ = InternedVCDValue
+      interned_values[key]     = interned_value
+    elif stats.enabled: stats.count("vcd_value_interned")
+    return interned_value
+
+
   @classmethod
   def none(cls):
     """ Empty value. """
@@ -249,6 +295,90 @@ class VCDValue:
 
 
 
+class InternedVCDValue(VCDValue):
+  """ A VCDValue shared by all the samples and callers with the same raw value and width, which can't be modified. """
+
+  interned = True
+
+  def __setattr__(self, name:str, value:object) -> None:
+    raise TypeError("Interned VCDValues are immutable, modify a copy instead")
+
+  def __delattr__(self, name:str) -> None:
+    raise TypeError("Interned VCDValues are immutable, modify a copy instead")
+
+  def __setitem__(self, key:int|slice, value:VCDValue) -> None:
+    raise TypeError("Interned VCDValues are immutable, modify a copy instead")
+
+# Values of at most this width are interned by the parsers, with the shared values by width and raw value
+intern_max_width = 8
+interned_values  = {}
+
+# Shared empty value used as default by the decoders for the missing signals and fields, VCDValue.none() returns a new one that can be modified
+none_value = VCDValue.intern("",0)
+
+
+
+class LazyVCDValue(VCDValue, metaclass=ABCMeta):
+  """ A VCDValue of a data burst holding only references to the beats in the shared storage of the signals. The raw value is built on the first access to it, by any method of VCDValue.
+      Abstract, the subclasses define how the beats are joined. """
+
+  def __init__(self, width:int):
+    """ At initialization, only the width is known. """
+    self.width = width
+
+  def __getattr__(self, name:str) -> object:
+    """ Only called for the attributes not built yet, the raw value is built from the beats on the first access. """
+    if name not in ("value", "format", "has_xz"):
+      raise AttributeError(name)
+    if stats.enabled: stats.count("lazy_value_materializations")
+    VCDValue.__init__(self, "b" + self.beat_string(), self.width)
+    return getattr(self, name)
+
+  @abstractmethod
+  def beat_string(self) -> str:
+    """ Raw binary values of the beats joined in the order of the burst. """
+
+  def copy(self) -> VCDValue:
+    """ New value that can be modified, equal to this one, without the references to the beats. """
+    return VCDValue("b" + self.value, self.width)
+
+class SampledBurstValue(LazyVCDValue):
+  """ The beats of a bus sampled at some timestamps, the last beat in the MSBs like when concatenating beat after beat. """
+
+  def __init__(self, waveform:VCDWaveform, timestamps:list[int]):
+    """ Burst of the samples of a waveform at the timestamps of the beats. """
+    super().__init__(waveform.width * len(timestamps))
+    self.waveform   = waveform
+    self.timestamps = timestamps
+
+  def beat_string(self) -> str:
+    """ Raw values of the last samples at or before the timestamps of the beats, like get_at_timestamp. """
+    waveform = self.waveform
+    return "".join(waveform.vcd[bisect_right(waveform.timestamps, timestamp) - 1].value.value for timestamp in reversed(self.timestamps))
+
+class StrobedBurstValue(LazyVCDValue):
+  """ The beats of a bus captured alternately on the edges of two data strobes, the first beat in the MSBs. """
+
+  def __init__(self, beats:tuple[list[str], list[str]], strobe_indices:list[int], burst_length:int, width:int):
+    """ Burst of the raw beats captured on the edges of each strobe, shared with the other bursts, from the index of the first beat of each strobe. """
+    super().__init__(width)
+    self.beats          = beats
+    self.strobe_indices = strobe_indices
+    self.burst_length   = burst_length
+
+    # A burst cut by the end of the dump fails at once like when the beats were joined eagerly
+    for strobe in range(min(burst_length, 2)):
+      last_beat_index = strobe_indices[strobe] + (burst_length - 1 - strobe) // 2
+      if last_beat_index >= len(beats[strobe]):
+        raise IndexError(f"Burst of {burst_length} beats cut by the end of the dump, only {len(beats[strobe]) - strobe_indices[strobe]} beats captured on strobe {strobe}")
+
+  def beat_string(self) -> str:
+    """ Raw values of the beats, alternating between the strobes. """
+    beats, strobe_indices = self.beats, self.strobe_indices
+    return "".join(beats[beat % 2][strobe_indices[beat % 2] + beat // 2] for beat in range(self.burst_length))
+
+
+
 
 
 
@@ -274,10 +404,10 @@ class VCDSample:
 
 
 class SearchMethod(Enum):
-  """ Algorithm to search for a timestamp in a VCD. """
-  WALKING = 0
-  BINARY  = 1
-  SMART   = 2
+  """ Algorithm to search for a timestamp or an edge in a VCD. """
+  WALKING = 0 # Walk sample by sample from the last sample found
+  BINARY  = 1 # Bisect the whole dump, or the indices of the edges by polarity
+  SMART   = 2 # Gallop from the last sample found, or bisect the whole dump after a run of far jumps
 
 class EdgePolarity(Enum):
   """ Signal edge polarity. """
@@ -299,26 +429,262 @@ class TimeDirection(Enum):
 
 
 
+class ParserBackend(Enum):
+  """ Parser of the VCD files. """
+  BUILTIN            = 0 # Memory-mapped parser of this package, storing the value changes in columns
+  PYDIGITALWAVETOOLS = 1 # pyDigitalWaveTools.VcdParser, storing the value changes as tuples
+
+
+
+class WaveformStorage(Enum):
+  """ Storage of the samples of a waveform. """
+  SAMPLES = 0 # Sparse change list of VCDSample objects, the fastest to search
+  COLUMNS = 1 # Compact change list of timestamps and raw values, the VCDSamples are built on access
+  CYCLES  = 2 # Compact values of changes on a regular grid of timestamps, like a clock or a busy bus, the timestamps are offsets in cycles of the grid or a range
+
+
+
+class VCDCycleTimestamps:
+  """ The timestamps of the changes of a signal on a regular grid, stored as their offsets in cycles of the grid from the first change, in the smallest integers holding the last offset. """
+
+  __slots__ = ("start", "step", "cycles")
+
+  def __init__(self, timestamps:Sequence[int], step:int):
+    """ Offsets of sorted timestamps on the grid of a step starting at the first timestamp. """
+    self.start  = timestamps[0]
+    self.step   = step
+    cycles      = [(timestamp - self.start) // step for timestamp in timestamps]
+    typecode    = next((typecode for typecode in "BHI" if cycles[-1] >> 8 * array(typecode).itemsize == 0), "q")
+    self.cycles = array(typecode, cycles)
+
+  def __len__(self) -> int:
+    return len(self.cycles)
+
+  def __getitem__(self, index:int|slice) -> int|list[int]:
+    if isinstance(index, slice):
+      return [self.start + self.step * cycle for cycle in self.cycles[index]]
+    return self.start + self.step * self.cycles[index]
+
+  def __iter__(self):
+    start, step = self.start, self.step
+    for cycle in self.cycles:
+      yield start + step * cycle
+
+
+
+class VCDSampleColumns:
+  """ The samples of a waveform as columns of timestamps and raw values from the VCD, indexed like a list of VCDSamples built on access. """
+
+  __slots__ = ("timestamps", "values", "width")
+
+  def __init__(self, timestamps:Sequence[int], values:list[str], width:int):
+    """ Columns of timestamps, as an array, cycle offsets or a range, and raw values of the samples of a signal of a width. """
+    self.timestamps = timestamps
+    self.values     = values
+    self.width      = width
+
+  def __len__(self) -> int:
+    return len(self.timestamps)
+
+  def __getitem__(self, index:int|slice) -> VCDSample|list[VCDSample]:
+    if isinstance(index, slice):
+      return [VCDSample(timestamp, VCDValue.intern(value, self.width)) for timestamp, value in zip(self.timestamps[index], self.values[index])]
+    return VCDSample(self.timestamps[index], VCDValue.intern(self.values[index], self.width))
+
+  def __iter__(self):
+    width = self.width
+    for timestamp, value in zip(self.timestamps, self.values):
+      yield VCDSample(timestamp, VCDValue.intern(value, width))
+
+
+
+class VCDWaveform:
+  """ The samples of a signal of a VCD, never modified after creation and shared by all the cursors over the signal. """
+
+  __slots__ = ("name", "vcd", "width", "timestamps", "storage", "edge_indices")
+
+  def __init__(self, vcd:list[VCDSample]|VCDSampleColumns, width:int, name:str=None, timestamps:Sequence[int]=None):
+    """ Waveform from a list of VCDSamples or from sample columns, and a width, with an optional name for the statistics, and the timestamps of the samples if already known. """
+    self.name         = name
+    self.vcd          = vcd if isinstance(vcd, VCDSampleColumns) else tuple(vcd)
+    self.width        = width
+    self.edge_indices = {} # Indices of the samples matching each edge polarity, built on the first search
+
+    # Timestamps of the samples, searched without key function
+    if timestamps is None:
+      timestamps = vcd.timestamps if isinstance(vcd, VCDSampleColumns) else tuple(sample.timestamp for sample in vcd)
+    self.timestamps = timestamps
+
+    # Storage of the samples, for the statistics
+    if not isinstance(vcd, VCDSampleColumns):
+      self.storage = WaveformStorage.SAMPLES
+    elif isinstance(vcd.timestamps, (range, VCDCycleTimestamps)):
+      self.storage = WaveformStorage.CYCLES
+    else:
+      self.storage = WaveformStorage.COLUMNS
+
+  def get_edge_indices(self, polarity:EdgePolarity) -> list[int]:
+    """ Indices of the samples matching a rising or falling edge polarity, with the same condition as the walking search. Built once for all the cursors. """
+    edge_indices = self.edge_indices.get(polarity)
+    if edge_indices is None:
+      match_value  = 1 if polarity == EdgePolarity.RISING else 0
+      edge_indices = [sample_index for sample_index, sample in enumerate(self.vcd) if sample.value == match_value]
+      self.edge_indices[polarity] = edge_indices
+    return edge_indices
+
+
+
+# Distance in samples from the last search over which a search is a far jump, and number of far jumps in a row after which the smart search bisects the whole dump
+smart_far_distance = 64
+smart_far_run      = 4
+
 class VCDSignal:
-  """ A signal of a VCD with its dump. """
+  """ A cursor over a signal of a VCD, moving over the shared samples of its waveform. """
+
+  __slots__ = ("waveform", "name", "vcd", "width", "timestamps",
+               "current_index", "current_sample", "current_timestamp", "finished",
+               "search_hint", "search_far_run", "search_method", "search_edges", "search_timestamp")
+
+  def __init__(self, vcd:list[VCDSample]|VCDWaveform, width:int=None, name:str=None, search_method:SearchMethod=SearchMethod.BINARY):
+    """ Cursor at the start of a waveform, or of a new waveform from a list of VCDSamples and a width, with the search method. """
+    if not isinstance(vcd, VCDWaveform):
+      vcd = VCDWaveform(vcd, width, name)
 
-  def __init__(self, vcd:list[VCDSample], width:int):
-    """ VCDSignal from a list of VCDSamples and a width. """
-    self.vcd               = vcd
+    # The samples are shared with the waveform
+    self.waveform          = vcd
+    self.name              = vcd.name
+    self.vcd               = vcd.vcd
+    self.width             = vcd.width
+    self.timestamps        = vcd.timestamps
+
+    # Only the position is specific to the cursor
     self.current_index     = 0
-    self.current_sample    = vcd[self.current_index]
+    self.current_sample    = self.vcd[self.current_index]
     self.current_timestamp = self.current_sample.timestamp
     self.finished          = False
-    self.width             = width
+    self.search_hint       = 0 # Index found by the last timestamp search, moving or not
+    self.search_far_run    = 0 # Number of the last timestamp searches that landed far from the previous one
+    self.set_search_method(search_method)
+
+
+
+  def snapshot(self) -> tuple:
+    """ Position of the cursor, to restore it later. """
+    return (self.current_index, self.current_sample, self.current_timestamp, self.finished)
+
+  def restore(self, snapshot:tuple) -> None:
+    """ Move the cursor back to a position from a snapshot. """
+    self.current_index, self.current_sample, self.current_timestamp, self.finished = snapshot
+
+  def copy(self) -> VCDSignal:
+    """ New cursor over the same waveform at the same position, moving independently. """
+    cursor = VCDSignal(self.waveform, search_method=self.search_method)
+    cursor.restore(self.snapshot())
+    cursor.search_hint    = self.search_hint
+    cursor.search_far_run = self.search_far_run
+    return cursor
+
+
+
+  def set_search_method(self, search_method:SearchMethod) -> None:
+    """ Select the search method, and the timestamp search function implementing it. """
+    self.search_method    = search_method
+    self.search_edges     = search_method != SearchMethod.WALKING
+    self.search_timestamp = {SearchMethod.WALKING : self.walk_to_timestamp,
+                             SearchMethod.BINARY  : self.bisect_timestamp,
+                             SearchMethod.SMART   : self.smart_search_timestamp}[search_method]
+
+  def bisect_timestamp(self, timestamp:int) -> int:
+    """ Index of the last sample at or before a timestamp with a binary search of the whole dump, -1 if the timestamp is before the first sample. """
+    return bisect_right(self.timestamps, timestamp) - 1
+
+  def walk_to_timestamp(self, timestamp:int) -> int:
+    """ Index of the last sample at or before a timestamp, walking sample by sample from the last sample found. """
+    timestamps   = self.timestamps
+    length       = len(timestamps)
+    search_index = max(self.search_hint, 0)
+    while search_index + 1 < length and timestamps[search_index+1] <= timestamp:
+      search_index += 1
+    while search_index >= 0 and timestamps[search_index] > timestamp:
+      search_index -= 1
+    return search_index
+
+  def gallop_to_timestamp(self, timestamp:int) -> int:
+    """ Index of the last sample at or before a timestamp, probing at doubling distances from the last sample found on the side of the timestamp,
+        then bisecting between the last two probes. A search costs the logarithm of the distance moved instead of the length of the dump. """
+    timestamps = self.timestamps
+    length     = len(timestamps)
+    hint_index = self.search_hint if self.search_hint > 0 else 0
+    step       = 1
+
+    # Forward searches probe after the last sample found, which is at or before the timestamp.
+    # The first probe is the next sample, where most searches of the decoders stop
+    if timestamps[hint_index] <= timestamp:
+      low_index = hint_index
+      while True:
+        probe_index = low_index + step
+        if probe_index >= length:
+          high_index = length
+          break
+        if timestamps[probe_index] > timestamp:
+          high_index = probe_index
+          break
+        low_index  = probe_index
+        step      *= 2
+
+    # Backward searches probe before the last sample found, which is after the timestamp
+    else:
+      high_index = hint_index
+      while True:
+        probe_index = high_index - step
+        if probe_index < 0:
+          low_index = -1
+          break
+        if timestamps[probe_index] <= timestamp:
+          low_index = probe_index
+          break
+        high_index  = probe_index
+        step       *= 2
+
+    return bisect_right(timestamps, timestamp, low_index + 1, high_index) - 1
+
+  def smart_search_timestamp(self, timestamp:int) -> int:
+    """ Index of the last sample at or before a timestamp, galloping from the last sample found while the searches stay close to each other,
+        and bisecting the whole dump after a run of far jumps until a search lands close to the previous one again. """
+
+    # Most searches of the decoders land on the last sample found or the next one, checked before any search
+    timestamps = self.timestamps
+    hint_index = self.search_hint
+    if hint_index >= 0 and timestamps[hint_index] <= timestamp:
+      next_index = hint_index + 1
+      if next_index == len(timestamps) or timestamps[next_index] > timestamp:
+        self.search_far_run = 0
+        return hint_index
+      if next_index + 1 == len(timestamps) or timestamps[next_index + 1] > timestamp:
+        self.search_far_run = 0
+        return next_index
+
+    if self.search_far_run >= smart_far_run:
+      search_index = self.bisect_timestamp(timestamp)
+    else:
+      search_index = self.gallop_to_timestamp(timestamp)
+    if abs(search_index - self.search_hint) > smart_far_distance:
+      self.search_far_run += 1
+    else:
+      self.search_far_run = 0
+    return search_index
 
 
 
   def get_at_timestamp(self, timestamp:int, move:bool=False) -> VCDSample:
     """ Get the last sample at or before a timestamp. """
 
-    # Use binary search
-    search_index  = bisect_right(self.vcd, timestamp, key=lambda x:x.timestamp)-1
-    search_sample = self.vcd[search_index]
+    if stats.enabled: stats.count("bisect_calls", signal=self.name)
+
+    # Search with the method of the signal, the next search starts from the sample found
+    search_index     = self.search_timestamp(timestamp)
+    search_sample    = self.vcd[search_index]
+    self.search_hint = search_index
 
     # Update the state of the signal
     if move:
@@ -342,6 +708,28 @@ class VCDSignal:
     if direction == TimeDirection.NEXT and self.finished:
       return None
 
+    if stats.enabled:
+      stats.count("get_edge_calls", signal=self.name)
+      start_index = self.current_index
+
+    # Edges by polarity are searched in the indices of the matching samples instead of walking, except with the walking search
+    if value is None and polarity != EdgePolarity.ANY and self.search_edges:
+      if stats.enabled: stats.count("bisect_calls", signal=self.name)
+      search_index = self.search_edge(polarity, direction)
+
+      # If there is no edge before the start or end of the dump
+      if search_index == 0 or search_index == len(self.vcd):
+        if move: self.move_to_boundary(search_index, direction)
+        return None
+
+      # Else update the state of the signal and return the edge
+      search_sample = self.vcd[search_index]
+      if move:
+        self.current_index     = search_index
+        self.current_sample    = search_sample
+        self.current_timestamp = search_sample.timestamp
+      return search_sample
+
     # Iterate over the indices from the current one in the selected direction
     search_index = self.current_index
     while True:
@@ -356,16 +744,10 @@ class VCDSignal:
       if search_index == 0 or search_index == len(self.vcd):
 
         # Update the state of the signal
-        if move:
-          self.current_index = search_index
-          if search_index == len(self.vcd):
-            self.current_sample = self.vcd[-1]
-          else: self.current_sample = self.vcd[search_index]
-          self.current_timestamp = self.current_sample.timestamp
+        if move: self.move_to_boundary(search_index, direction)
 
-          # Update the finished flag at the end of the dump
-          if direction == TimeDirection.NEXT:
-            self.finished = True
+        # Count the samples walked, only once per call
+        if stats.enabled: stats.count("get_edge_steps", abs(search_index - start_index), self.name)
 
         # Return None if no matching edge found
         return None
@@ -400,11 +782,96 @@ class VCDSignal:
           self.current_sample = search_sample
           self.current_timestamp = self.current_sample.timestamp
 
+        # Count the samples walked, only once per call
+        if stats.enabled: stats.count("get_edge_steps", abs(search_index - start_index), self.name)
+
         # Return the matching edge
         return search_sample
 
 
 
+  def move_to_boundary(self, search_index:int, direction:TimeDirection) -> None:
+    """ Update the state of the signal when an edge search reaches the start or end of the dump without finding an edge. """
+    self.current_index = search_index
+    if search_index == len(self.vcd):
+      self.current_sample = self.vcd[-1]
+    else: self.current_sample = self.vcd[search_index]
+    self.current_timestamp = self.current_sample.timestamp
+
+    # Update the finished flag at the end of the dump
+    if direction == TimeDirection.NEXT:
+      self.finished = True
+
+
+
+  def search_edge(self, polarity:EdgePolarity, direction:TimeDirection) -> int:
+    """ Index of the next or previous rising or falling edge from the current index, or of the start or end of the dump reached by the walking search if there is none. """
+    edge_indices = self.waveform.get_edge_indices(polarity)
+
+    # The walking search never checks the first sample
+    if direction == TimeDirection.NEXT:
+      if self.current_index < 0: return 0
+      edge_position = bisect_right(edge_indices, self.current_index)
+      if edge_position < len(edge_indices):
+        return edge_indices[edge_position]
+      return len(self.vcd)
+    else:
+      edge_position = bisect_left(edge_indices, self.current_index) - 1
+      if edge_position >= 0 and edge_indices[edge_position] > 0:
+        return edge_indices[edge_position]
+      return 0
+
+
+
+  def get_edge_timestamps(self,
+                          polarity   : EdgePolarity        = EdgePolarity.RISING,
+                          value      : VCDValue            = None,
+                          comparison : ComparisonOperation = ComparisonOperation.EQUAL_NO_XY,
+                          ) -> list[int]:
+    """ Get the timestamps of all the edges by polarity or value of the dump in one pass, without moving. """
+
+    # Check the same search condition as get_edge on all samples
+    edge_timestamps = []
+    for sample in self.vcd:
+
+      # Search by value
+      if value is not None:
+        if comparison == ComparisonOperation.EQUAL_EXACT:
+          sample_match = sample.value == value
+        elif comparison == ComparisonOperation.EQUAL_NO_XY:
+          sample_match = sample.value.equal_no_xy(value)
+        elif comparison == ComparisonOperation.NOT_EQUAL_EXACT:
+          sample_match = sample.value != value
+        elif comparison == ComparisonOperation.NOT_EQUAL_NO_XY:
+          sample_match = not sample.value.equal_no_xy(value)
+
+      # Search by edge polarity
+      else:
+        sample_match = (   (polarity == EdgePolarity.RISING  and sample.value == 1)
+                        or (polarity == EdgePolarity.FALLING and sample.value == 0)
+                        or (polarity == EdgePolarity.ANY) )
+
+      if sample_match:
+        edge_timestamps.append(sample.timestamp)
+
+    return edge_timestamps
+
+
+
+  def get_values_at_timestamps(self, timestamps:list[int]) -> list[VCDValue]:
+    """ Get the values of the last samples at or before a sorted list of timestamps in one sweep, without moving. """
+    values       = []
+    search_index = -1
+    last_index   = len(self.vcd) - 1
+    for timestamp in timestamps:
+      # Advance to the last sample at or before the timestamp, like get_at_timestamp
+      while search_index < last_index and self.vcd[search_index+1].timestamp <= timestamp:
+        search_index += 1
+      values.append(self.vcd[search_index].value)
+    return values
+
+
+
   def get_edge_at_timestamp(self,
                             timestamp          : int,
                             polarity           : EdgePolarity  = EdgePolarity.RISING,
@@ -414,12 +881,14 @@ class VCDSignal:
                             ) -> VCDSample:
     """ Get the next or previous rising or falling edge from a timestamp. """
 
-    # If don't move, then backup the current state
+    # Edges by polarity are searched directly in the indices of the matching samples if the cursor doesn't move, except with the walking search
+    if not move and polarity != EdgePolarity.ANY and self.search_edges:
+      return self.search_edge_at_timestamp(timestamp, polarity, direction, match_on_timestamp)
+
+    # If don't move, then snapshot the position of the cursor
     if not move:
-      backup_current_index     = self.current_index
-      backup_current_sample    = self.current_sample
-      backup_current_timestamp = self.current_timestamp
-      backup_finished          = self.finished
+      if stats.enabled: stats.count("cursor_backups", signal=self.name)
+      snapshot = self.snapshot()
 
     # First move to the last edge at or before the timestamp
     search_sample = self.get_at_timestamp(timestamp, move=True)
@@ -436,17 +905,52 @@ class VCDSignal:
     else:
       search_sample = self.get_edge(polarity=polarity, direction=direction, move=True)
 
-    # If don't move, then restore the backup state
+    # If don't move, then restore the position of the cursor
     if not move:
-      self.current_index     = backup_current_index
-      self.current_sample    = backup_current_sample
-      self.current_timestamp = backup_current_timestamp
-      self.finished          = backup_finished
+      if stats.enabled: stats.count("cursor_restores", signal=self.name)
+      self.restore(snapshot)
 
     return search_sample
 
 
 
+  def search_edge_at_timestamp(self,
+                               timestamp          : int,
+                               polarity           : EdgePolarity,
+                               direction          : TimeDirection,
+                               match_on_timestamp : bool,
+                               ) -> VCDSample:
+    """ Next or previous rising or falling edge from a timestamp, bisecting the samples then the indices of the matching samples, without moving.
+        Same result as moving to the last sample at or before the timestamp and searching the edge from there. """
+    if stats.enabled: stats.count("bisect_calls", 2, self.name)
+
+    # The edge indices are bisected whatever the search method, the position found is only kept as the hint of the next search
+    search_index     = self.bisect_timestamp(timestamp)
+    self.search_hint = search_index
+    edge_indices     = self.waveform.get_edge_indices(polarity)
+
+    # If the sample at the timestamp is a matching edge, return it
+    if match_on_timestamp and search_index >= 0 and self.timestamps[search_index] == timestamp:
+      edge_position = bisect_left(edge_indices, search_index)
+      if edge_position < len(edge_indices) and edge_indices[edge_position] == search_index:
+        return self.vcd[search_index]
+
+    # Else search the edge from there like search_edge, the first sample is never an edge
+    if direction == TimeDirection.NEXT:
+      if self.finished or search_index < 0:
+        return None
+      edge_position = bisect_right(edge_indices, search_index)
+      if edge_position < len(edge_indices):
+        return self.vcd[edge_indices[edge_position]]
+      return None
+    else:
+      edge_position = bisect_left(edge_indices, search_index) - 1
+      if edge_position >= 0 and edge_indices[edge_position] > 0:
+        return self.vcd[edge_indices[edge_position]]
+      return None
+
+
+
 def get_value_at_timestamp_if_signal_exists(signal  : VCDSignal|None,
                                             default : VCDValue|None = None,
                                             **kwargs
@@ -463,6 +967,17 @@ def get_value_at_timestamp_if_signal_exists(signal  : VCDSignal|None,
 
 
 
+def sampled_burst_if_signal_exists(signal     : VCDSignal|None,
+                                   timestamps : list[int],
+                                   ) -> VCDValue:
+  """ Get the burst of the values of the last samples at or before the timestamps of the beats if the signal exists, built only when first used, else an empty value. """
+  if signal is None:
+    return none_value
+  else:
+    return SampledBurstValue(signal.waveform, timestamps)
+
+
+
 def get_value_of_edge_if_signal_exists(signal  : VCDSignal|None,
                                        default : VCDValue|None = None,
                                        **kwargs
@@ -552,46 +1067,263 @@ def get_next_valid_ready_handshake_timestamp(clock : VCDSignal,
 
 
 
-class VCDFile:
-  """ A wrapper around pyDigitalWaveTools.VcdParser for a VCD file. """
-
-  def __init__(self, vcd_path:str):
-    """ Parse the VCD from the file. """
-    vcd = VcdParser()
-    with open(vcd_path) as vcd_file:
-      vcd.parse(vcd_file)
-    self.vcd = vcd.scope
-
-  def get_signal(self, path:list[str], scope:VcdVarScope=None) -> VCDSignal:
-    """ Get a VCDSignal from the VCD recursively. """
-
-    # Initialize the recursion at the root of the dump scope
-    if scope is None:
-      scope = self.vcd
-
-    # If the path is empty, the scope is the signal, end of recursion
-    if not path:
-
-      # Build the list of samples
-      vcd_samples = []
-      signal_width = scope.width
-      for sample_tuple in scope.data:
-        sample_timestamp = sample_tuple[0]
-        sample_value     = VCDValue(sample_tuple[1], signal_width)
-        vcd_sample       = VCDSample(sample_timestamp, sample_value)
-        vcd_samples.append(vcd_sample)
-
-      # Return the VCDSignal
-      vcd_signal = VCDSignal(vcd_samples, signal_width)
-      return vcd_signal
-
-    # Else continue recursion
+class VCDClockDomain:
+  """ Signals resampled on the edges of a clock: the value of each signal at each cycle, in a dense column per signal. """
+
+  __slots__ = ("clock", "timestamps", "columns")
+
+  def __init__(self, clock:VCDSignal, signals:dict[str,VCDSignal], polarity:EdgePolarity=EdgePolarity.RISING):
+    """ Cycles of a clock at its edges of a polarity, with the values of named signals at each cycle. Signals that don't exist (None) have no column. """
+    self.clock = clock
+
+    # Timestamps of the cycles, the first sample of the clock is not an edge like for get_edge
+    waveform        = clock.waveform
+    self.timestamps = [waveform.timestamps[edge_index] for edge_index in waveform.get_edge_indices(polarity) if edge_index]
+
+    # Columns of values by signal name
+    self.columns = {}
+    with tracing.span("VCDClockDomain.__init__", "resample", clock=clock.name, cycles=len(self.timestamps)):
+      for name, signal in signals.items():
+        if signal is not None:
+          self.columns[name] = self.resample(signal)
+
+  def resample(self, signal:VCDSignal) -> list[VCDValue]:
+    """ Values of a signal at each cycle, the last sample at or before the edge like get_at_timestamp, None before the first sample.
+        Single merge sweep of the edges and the samples, each step only bisecting the samples from the previous one. """
+    sample_timestamps = signal.timestamps
+    samples           = signal.vcd
+    column            = []
+    sample_index      = 0
+    for timestamp in self.timestamps:
+      sample_index = bisect_right(sample_timestamps, timestamp, sample_index)
+      column.append(samples[sample_index - 1].value if sample_index else None)
+    return column
+
+
+
+  def __len__(self) -> int:
+    return len(self.timestamps)
+
+  def __getitem__(self, name:str) -> list[VCDValue]:
+    """ Column of values of a signal by name. """
+    return self.columns[name]
+
+  def row(self, cycle:int) -> dict[str,VCDValue]:
+    """ Values of all the signals at a cycle, by signal name. """
+    return {name: column[cycle] for name, column in self.columns.items()}
+
+  def cycle_at_timestamp(self, timestamp:int, match_on_timestamp:bool=True) -> int|None:
+    """ Index of the next cycle from a timestamp, at the timestamp included if matching on it, like get_edge_at_timestamp. None after the last cycle. """
+    if match_on_timestamp:
+      cycle = bisect_left(self.timestamps, timestamp)
     else:
+      cycle = bisect_right(self.timestamps, timestamp)
+    return cycle if cycle < len(self.timestamps) else None
+
+  def next_cycle(self, column:str, value:VCDValue|int, cycle:int=0) -> int|None:
+    """ Index of the first cycle from a cycle where a signal equals a value, exactly. None if there is none. """
+    column_values = self.columns[column]
+    for search_cycle in range(cycle, len(column_values)):
+      if column_values[search_cycle] == value:
+        return search_cycle
+    return None
 
-      # Check if searched path or signal exists to continue
-      if path[0] in scope.children:
-        return self.get_signal(path[1:], scope.children[path[0]])
 
-      # Return None if path or signal doesn't exist
+
+# Estimated memory of a sample by storage, in bytes plus one byte per bit of the signal, the timestamps on a grid take the size of their offsets instead of a full integer
+samples_sample_bytes = 256 # VCDSample, VCDValue with its attributes and binary string
+columns_sample_bytes = 64  # Timestamp in an array and raw string referenced by a list
+timestamp_bytes      = 8
+
+# Default transition density from which the compact waveforms store their timestamps on the grid of the changes
+default_cycles_density = 0.5
+
+def grid_step(timestamps:Sequence[int]) -> int:
+  """ Step of the grid holding all the timestamps of a signal, the greatest common divisor of the gaps between them. 0 if a timestamp repeats and 1 for less than two timestamps. """
+  if len(timestamps) < 2:
+    return 1
+  gaps = list(map(sub, timestamps[1:], timestamps[:-1]))
+  if min(gaps) <= 0:
+    return 0
+  return gcd(*gaps)
+
+def transition_density(timestamps:Sequence[int]) -> float:
+  """ Proportion of the steps of the grid of the timestamps of a signal that have a change, 1 when the signal changes at every step. """
+  if len(timestamps) < 2:
+    return 1.0
+  step = grid_step(timestamps)
+  if step == 0:
+    return 0.0
+  return (len(timestamps) - 1) * step / (timestamps[-1] - timestamps[0])
+
+
+
+class VCDPathError(KeyError):
+  """ Signals of an interface not found in a VCD. """
+
+
+
+class VCDFile:
+  """ The scopes and value changes of a VCD file, parsed by the built-in parser or by pyDigitalWaveTools.VcdParser. """
+
+  def __init__(self,
+               vcd_path       : str,
+               search_method  : SearchMethod  = SearchMethod.BINARY,
+               backend        : ParserBackend = ParserBackend.BUILTIN,
+               processes      : int           = 1,
+               header_only    : bool          = False,
+               memory_budget  : int           = None,
+               cycles_density : float         = default_cycles_density):
+    """ Parse the VCD from the file with a parser backend, the signals use a search method. The built-in parser can parse the value changes with several processes,
+        or only the header, the value changes of a signal are then parsed when it is requested, or with the other signals given to load_signals.
+        With a memory budget in bytes, the waveforms of the built-in parser exceeding it are stored compactly, on the grid of their changes if their transition density reaches the cycles density. """
+    self.vcd_path       = vcd_path
+    self.search_method  = search_method
+    self.backend        = backend
+    self.processes      = processes
+    self.memory_budget  = memory_budget
+    self.cycles_density = cycles_density
+    self.memory_used    = 0 # Estimated memory of the waveforms built
+    self.waveforms      = {} # Waveforms built by get_signal by identifier code, shared by all the cursors over all the aliases of the code
+    with tracing.span("VCDFile.__init__", "parse", path=vcd_path, backend=backend.name, processes=processes, header_only=header_only):
+      if backend == ParserBackend.BUILTIN:
+        self.vcd, self.series, self.declarations = parse_vcd_header(vcd_path)
+        self.parsed_codes = set() # Identifier codes whose value changes are parsed
+        if not header_only:
+          self.parse_values()
       else:
-        return None
+        if VcdParser is None:
+          raise ImportError("The pyDigitalWaveTools parser backend requires the pyDigitalWaveTools package")
+        vcd = VcdParser()
+        with open(vcd_path) as vcd_file:
+          vcd.parse(vcd_file)
+        self.vcd           = vcd.scope
+        self.series        = vcd.idcode2series
+        self.declarations  = {}
+        self.parsed_codes  = set(self.series)
+
+    # Variables by full dotted path from the root of the dump in declaration order, the scopes are not indexed
+    self.index = {}
+    def index_scope(scope:VCDScope, scope_path:str) -> None:
+      for child_name, child in scope.children.items():
+        if isinstance(child, (VCDScope, VcdVarScope)):
+          index_scope(child, scope_path + child_name + ".")
+        else:
+          self.index[scope_path + child_name] = child
+    index_scope(self.vcd, "")
+
+  def parse_values(self, codes:Iterable[str]=None) -> None:
+    """ Parse the value changes of some identifier codes, all by default, for a VCD opened with only its header. The codes already parsed are skipped. """
+    if codes is None:
+      codes = self.series
+    series = {code: self.series[code] for code in codes if code not in self.parsed_codes}
+    if not series: return
+    with tracing.span("VCDFile.parse_values", "parse", path=self.vcd_path, processes=self.processes, codes=len(series)):
+      parse_vcd_values(self.vcd_path, series, self.processes)
+    self.parsed_codes.update(series)
+
+  def load_signals(self, paths:Iterable[str]) -> None:
+    """ Parse the value changes of the union of the signals of dotted paths in a single pass, and build their waveforms. The signals not found are ignored. """
+    paths = [path for path in paths if path in self.index]
+    self.parse_values({self.index[path].code for path in paths if isinstance(self.index[path], VCDVariable)})
+
+    # The signals with the fewest changes are built first, so that they get the memory budget as samples
+    for path in sorted(paths, key=lambda path: len(self.index[path].series) if isinstance(self.index[path], VCDVariable) else 0):
+      self.get_signal(path)
+
+
+
+  def has_signal(self, path:str) -> bool:
+    """ Check if a signal exists from its dotted path, from the header only. """
+    return path in self.index
+
+  def find_signals(self, pattern:str, regex:bool=False) -> list[str]:
+    """ Dotted paths of the signals matching a glob pattern, or a regular expression matching the whole path, from the header only. """
+    if regex:
+      path_regex = re.compile(pattern)
+      return [path for path in self.index if path_regex.fullmatch(path)]
+    return fnmatch.filter(self.index, pattern)
+
+  def validate_paths(self, paths:object, optional:Iterable[str]=()) -> None:
+    """ Check that the signals of the dataclass of paths of an interface exist, except the optional ones, from the header only.
+        Raises a VCDPathError listing all the signals missing. """
+    missing_paths = [f"{name}={path}" for name, path in vars(paths).items() if name not in optional and path not in self.index]
+    if missing_paths:
+      raise VCDPathError(f"Signals not found in {self.vcd_path}: {', '.join(missing_paths)}")
+
+  def get_signals(self, paths:Iterable[str]) -> list[VCDSignal]:
+    """ Get new VCDSignal cursors from dotted paths, None for the signals not found. """
+    return [self.get_signal(path) for path in paths]
+
+  def get_signal(self, path:list[str]|str) -> VCDSignal:
+    """ Get a new VCDSignal cursor from the VCD by path, as a list of names or dotted. The waveform of an identifier code is only built once for all its paths. """
+
+    # Find the variable in the index, return None if the signal doesn't exist
+    signal_name = path if isinstance(path, str) else ".".join(path)
+    variable    = self.index.get(signal_name)
+    if variable is None:
+      return None
+
+    # The built-in parser stores the value changes of an identifier code in a series shared by all its variables.
+    # pyDigitalWaveTools stores them in the variable declared first with the code, the other variables with the same code
+    # are aliases referencing this list instead of their code, with no data, so the list identifies the code
+    if isinstance(variable, VCDVariable):
+      if variable.code not in self.parsed_codes:
+        self.parse_values((variable.code,))
+      series       = variable.series
+      waveform_key = variable.code
+    else:
+      series       = variable.vcdId if isinstance(variable.vcdId, list) else variable.data
+      waveform_key = id(series)
+
+    # Build the list of samples and the waveform only the first time the code is requested
+    waveform = self.waveforms.get(waveform_key)
+    if waveform is None:
+      signal_width = variable.width
+      with tracing.span("get_signal", "signal", signal=signal_name):
+        if isinstance(series, VCDSeries):
+          waveform = self.build_waveform(series, signal_width, signal_name)
+        else:
+          vcd_samples = []
+          for sample_tuple in series:
+            sample_timestamp = sample_tuple[0]
+            sample_value     = VCDValue.intern(sample_tuple[1], signal_width)
+            vcd_sample       = VCDSample(sample_timestamp, sample_value)
+            vcd_samples.append(vcd_sample)
+          waveform = VCDWaveform(vcd_samples, signal_width, signal_name)
+      self.waveforms[waveform_key] = waveform
+
+    # Return a new cursor over the waveform
+    vcd_signal = VCDSignal(waveform, search_method=self.search_method)
+    return vcd_signal
+
+  def build_waveform(self, series:VCDSeries, width:int, name:str) -> VCDWaveform:
+    """ Waveform of a series of the built-in parser. The samples are built as VCDSamples while they fit in the memory budget,
+        else the raw values are kept in columns. The timestamps of the busy signals, with a transition density of at least the cycles density,
+        are stored as offsets on the grid of their changes, or as a range if the signal changes at every step of the grid. """
+
+    # The series has its timestamps in a column, used directly by the waveform
+    samples_bytes = len(series) * (samples_sample_bytes + width)
+    if self.memory_budget is None or self.memory_used + samples_bytes <= self.memory_budget:
+      self.memory_used += samples_bytes
+      vcd_samples = [VCDSample(sample_timestamp, VCDValue.intern(sample_value, width))
+                     for sample_timestamp, sample_value in zip(series.timestamps, series.values)]
+      waveform = VCDWaveform(vcd_samples, width, name, series.timestamps)
+
+    # Compact storage, on the grid of the changes if the density of transitions reaches the threshold
+    else:
+      timestamps     = series.timestamps
+      step           = grid_step(timestamps)
+      timestamp_size = timestamp_bytes
+      if timestamps and step > 0 and transition_density(timestamps) >= self.cycles_density:
+        if (timestamps[-1] - timestamps[0]) // step == len(timestamps) - 1:
+          timestamps     = range(timestamps[0], timestamps[-1] + 1, step)
+          timestamp_size = 0
+        else:
+          timestamps     = VCDCycleTimestamps(timestamps, step)
+          timestamp_size = timestamps.cycles.itemsize
+      self.memory_used += len(series) * (columns_sample_bytes - timestamp_bytes + timestamp_size + width)
+      waveform = VCDWaveform(VCDSampleColumns(timestamps, series.values, width), width, name)
+
+    if stats.enabled: stats.count(f"waveforms_{waveform.storage.name.lower()}")
+    return waveform
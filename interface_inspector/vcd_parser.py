@@ -0,0 +1,290 @@
+from __future__ import annotations
+import mmap
+
+from array              import array
+from concurrent.futures import ProcessPoolExecutor
+
+from . import tracing
+
+
+
+
+
+
+# Size of the blocks of the value change section decoded and split at once
+block_size = 16 * 1024 * 1024
+
+# First characters of the value changes followed by the identifier code as a separate token
+vector_prefixes = "bBrR"
+
+
+
+class VCDSyntaxError(Exception):
+  """ Error in the structure of a VCD file. """
+
+
+
+class VCDScope:
+  """ A scope of the VCD header, with the same attributes as the scopes of pyDigitalWaveTools. """
+
+  __slots__ = ("name", "parent", "children")
+
+  def __init__(self, name:str, parent:VCDScope=None):
+    """ Empty scope with a name, in a parent scope. """
+    self.name     = name
+    self.parent   = parent
+    self.children = {}
+
+
+
+class VCDSeries:
+  """ The value changes of an identifier code, in two columns. """
+
+  __slots__ = ("timestamps", "values")
+
+  def __init__(self):
+    """ At initialization, the series is empty. """
+    self.timestamps = array('q')
+    self.values     = []
+
+  def __len__(self) -> int:
+    return len(self.timestamps)
+
+  def __iter__(self):
+    """ Iterate over (timestamp, value) tuples like the series of pyDigitalWaveTools. """
+    return zip(self.timestamps, self.values)
+
+
+
+class VCDVariable:
+  """ A variable of the VCD header, all the variables declared with the same identifier code share the same series. """
+
+  __slots__ = ("name", "parent", "width", "var_type", "code", "series")
+
+  def __init__(self, name:str, parent:VCDScope, width:int, var_type:str, code:str, series:VCDSeries):
+    """ Variable of a scope, with its width, type, identifier code and series. """
+    self.name     = name
+    self.parent   = parent
+    self.width    = width
+    self.var_type = var_type
+    self.code     = code
+    self.series   = series
+
+
+
+
+
+
+def parse_header(tokens:list[str]) -> tuple[VCDScope, dict[str,VCDSeries], dict[str,str]]:
+  """ Scopes and variables from the tokens of the header, with the series by identifier code and the declarations like the timescale. """
+  root         = VCDScope("root")
+  scope        = root
+  series       = {}
+  declarations = {}
+  token_index  = 0
+
+  def read_until_end() -> list[str]:
+    """ Tokens up to the next $end, which is consumed. """
+    nonlocal token_index
+    end_index = tokens.index("$end", token_index)
+    section   = tokens[token_index:end_index]
+    token_index = end_index + 1
+    return section
+
+  while token_index < len(tokens):
+    keyword = tokens[token_index]
+    token_index += 1
+
+    # Declarations kept as text, comments dropped
+    if keyword in ("$date", "$version", "$timescale"):
+      declarations[keyword[1:]] = " ".join(read_until_end())
+    elif keyword == "$comment":
+      read_until_end()
+
+    # Scopes with the same name in the same parent are merged
+    elif keyword == "$scope":
+      scope_type, scope_name = read_until_end()[:2]
+      child = scope.children.get(scope_name)
+      if child is None:
+        child = VCDScope(scope_name, scope)
+        scope.children[scope_name] = child
+      elif not isinstance(child, VCDScope):
+        raise VCDSyntaxError(f"Scope '{scope_name}' has the name of a variable")
+      scope = child
+    elif keyword == "$upscope":
+      read_until_end()
+      if scope.parent is None:
+        raise VCDSyntaxError("$upscope outside of any scope")
+      scope = scope.parent
+
+    # Variables declared again with the same code are aliases sharing the series, the range after the name is ignored
+    elif keyword == "$var":
+      var_type, width, code, name = read_until_end()[:4]
+      if name in scope.children:
+        raise VCDSyntaxError(f"Variable '{name}' declared twice in the same scope")
+      code_series = series.get(code)
+      if code_series is None:
+        code_series = series[code] = VCDSeries()
+      scope.children[name] = VCDVariable(name, scope, int(width), var_type, code, code_series)
+
+    elif keyword == "$enddefinitions":
+      read_until_end()
+      break
+    else:
+      raise VCDSyntaxError(f"Unexpected keyword '{keyword}' in the header")
+
+  return root, series, declarations
+
+def parse_value_changes(tokens:list[str], series:dict[str,VCDSeries], state:list) -> None:
+  """ Append the value changes of a block of tokens to the series of their codes.
+      The state is carried between blocks: current timestamp, vector value waiting for its code, and if inside a comment. """
+  timestamp, pending_value, in_comment = state
+  for token in tokens:
+
+    # Everything up to the end of a comment is dropped
+    if in_comment:
+      in_comment = token != "$end"
+      continue
+
+    # Code of the vector value of the previous token
+    if pending_value is not None:
+      code_series = series.get(token)
+      if code_series is not None:
+        code_series.timestamps.append(timestamp)
+        code_series.values.append(pending_value)
+      pending_value = None
+      continue
+
+    first = token[0]
+    if first == "#":
+      timestamp = int(token[1:])
+
+    # Vector and real values keep their prefix, strings lose it, like pyDigitalWaveTools
+    elif first in vector_prefixes:
+      pending_value = token
+    elif first == "s":
+      pending_value = token[1:]
+
+    # The value changes of the dump sections are the same as outside of them
+    elif first == "$":
+      in_comment = token == "$comment"
+
+    # Single bit value directly followed by its code
+    else:
+      code_series = series.get(token[1:])
+      if code_series is not None:
+        code_series.timestamps.append(timestamp)
+        code_series.values.append(first)
+
+  state[:] = timestamp, pending_value, in_comment
+
+def find_header_end(vcd_map:mmap.mmap) -> int:
+  """ Position just after the $end of the $enddefinitions of a memory-mapped VCD. """
+  header_end = vcd_map.find(b"$enddefinitions")
+  if header_end < 0:
+    raise VCDSyntaxError("Missing $enddefinitions")
+  header_end = vcd_map.find(b"$end", header_end + len(b"$enddefinitions"))
+  if header_end < 0:
+    raise VCDSyntaxError("Missing $end of $enddefinitions")
+  return header_end + len(b"$end")
+
+def parse_range(vcd_map:mmap.mmap, series:dict[str,VCDSeries], range_start:int, range_end:int) -> None:
+  """ Append the value changes of a byte range of a memory-mapped VCD to the series, by blocks ending at a line break so that the tokens never span two blocks. """
+  state       = [0, None, False]
+  block_start = range_start
+  while block_start < range_end:
+    block_end = vcd_map.find(b"\n", min(block_start + block_size, range_end), range_end)
+    block_end = range_end if block_end < 0 else block_end + 1
+    with tracing.span("parse_value_changes", "parse"):
+      parse_value_changes(vcd_map[block_start:block_end].decode().split(), series, state)
+    block_start = block_end
+
+def find_timestamp_line(vcd_map:mmap.mmap, position:int, previous_boundary:int) -> int:
+  """ Position of the first line break followed by a timestamp from a position, skipping the lines inside the comments opened after the previous boundary. -1 if there is none. """
+  while True:
+    boundary = vcd_map.find(b"\n#", position)
+    if boundary < 0:
+      return -1
+
+    # The line is outside of any comment if the last comment opened before it is closed before it
+    comment_start = vcd_map.rfind(b"$comment", previous_boundary, boundary)
+    if comment_start < 0 or vcd_map.find(b"$end", comment_start, boundary) >= 0:
+      return boundary
+
+    # Else the search continues after the end of the comment
+    position = vcd_map.find(b"$end", boundary)
+    if position < 0:
+      return -1
+
+def chunk_boundaries(vcd_map:mmap.mmap, section_start:int, chunk_count:int) -> list[int]:
+  """ Boundaries of about equal chunks of the value change section, each chunk but the first starting at a line with a timestamp outside of comments. """
+  section_size = len(vcd_map) - section_start
+  boundaries   = [section_start]
+  for chunk_index in range(1, chunk_count):
+    boundary = find_timestamp_line(vcd_map, max(section_start + section_size * chunk_index // chunk_count, boundaries[-1]), boundaries[-1])
+    if boundary < 0: break
+    if boundary + 1 > boundaries[-1]:
+      boundaries.append(boundary + 1)
+  boundaries.append(len(vcd_map))
+  return boundaries
+
+def parse_chunk(vcd_path:str, codes:list[str], range_start:int, range_end:int, trace:bool=False) -> tuple[dict[str,tuple[bytes,str]], list[dict], dict[str,tuple[int,float]]]:
+  """ Value changes of a chunk of the value change section, parsed in a worker process.
+      The timestamps of each code are returned as the bytes of their array and the values joined by line breaks, faster to send back than lists.
+      The spans traced in the worker are returned with them and their totals, to be merged in the trace of the parent process. """
+
+  # A forked worker starts with the tracing state of the parent, and a worker is reused for several chunks
+  tracing.reset_tracing()
+  if trace:
+    tracing.enable_tracing()
+  else: tracing.disable_tracing()
+
+  series = {code: VCDSeries() for code in codes}
+  with tracing.span("parse_chunk", "parse", start=range_start, end=range_end):
+    with open(vcd_path, "rb") as vcd_file, mmap.mmap(vcd_file.fileno(), 0, access=mmap.ACCESS_READ) as vcd_map:
+      parse_range(vcd_map, series, range_start, range_end)
+  chunk_series = {code: (code_series.timestamps.tobytes(), "\n".join(code_series.values)) for code, code_series in series.items() if code_series.timestamps}
+  return chunk_series, tracing.worker_events(), tracing.worker_totals()
+
+def parse_vcd_header(vcd_path:str) -> tuple[VCDScope, dict[str,VCDSeries], dict[str,str]]:
+  """ Parse only the header of a VCD file memory-mapped, without reading the value change section.
+      Returns the root scope, the empty series by identifier code, and the declarations of the header. """
+  with open(vcd_path, "rb") as vcd_file, mmap.mmap(vcd_file.fileno(), 0, access=mmap.ACCESS_READ) as vcd_map:
+    header_end = find_header_end(vcd_map)
+    with tracing.span("parse_header", "parse"):
+      return parse_header(vcd_map[:header_end].decode().split())
+
+def parse_vcd_values(vcd_path:str, series:dict[str,VCDSeries], processes:int=1) -> None:
+  """ Parse the value change section of a VCD file memory-mapped into the series of its header, decoded and split by large blocks cut between lines.
+      With several processes, the section is split in as many chunks at timestamps, parsed in parallel and stitched in order. """
+  with open(vcd_path, "rb") as vcd_file, mmap.mmap(vcd_file.fileno(), 0, access=mmap.ACCESS_READ) as vcd_map:
+
+    # Value changes in a single process
+    header_end = find_header_end(vcd_map)
+    boundaries = chunk_boundaries(vcd_map, header_end, processes) if processes > 1 else [header_end, len(vcd_map)]
+    if len(boundaries) <= 2:
+      parse_range(vcd_map, series, header_end, len(vcd_map))
+      return
+
+  # Value changes of each chunk in a worker process. The series of the chunks are only appended to each other in order:
+  # a signal without change in a chunk keeps the last value of the previous chunks, and a change to the same value at
+  # the start of a chunk is kept like in the sequential parse
+  codes = list(series)
+  with ProcessPoolExecutor(max_workers=processes) as executor:
+    chunk_futures = [executor.submit(parse_chunk, vcd_path, codes, range_start, range_end, tracing.enabled)
+                     for range_start, range_end in zip(boundaries[:-1], boundaries[1:])]
+    for chunk_future in chunk_futures:
+      chunk_series, chunk_events, chunk_totals = chunk_future.result()
+      if tracing.enabled:
+        tracing.merge_worker_events(chunk_events, chunk_totals, "parse worker")
+      with tracing.span("stitch_chunk", "parse"):
+        for code, (timestamps, values) in chunk_series.items():
+          series[code].timestamps.frombytes(timestamps)
+          series[code].values.extend(values.split("\n"))
+
+def parse_vcd(vcd_path:str, processes:int=1) -> tuple[VCDScope, dict[str,VCDSeries], dict[str,str]]:
+  """ Parse the header and the value changes of a VCD file, with some processes for the value changes.
+      Returns the root scope, the series by identifier code, and the declarations of the header. """
+  root, series, declarations = parse_vcd_header(vcd_path)
+  parse_vcd_values(vcd_path, series, processes)
+  return root, series, declarations
@@ -0,0 +1,191 @@
+from __future__ import annotations
+from array     import array
+from functools import lru_cache
+from typing    import Iterable
+
+from .vcd import VCDValue
+
+
+
+
+
+
+# Bits of a limb of a wide value column
+limb_width = 64
+
+# Characters of the binary strings mapped to the value and X/Z mask bits: X is an unknown 0 and Z an unknown 1
+value_bits = str.maketrans("xXzZ", "0011")
+mask_bits  = str.maketrans("01xXzZ", "001111")
+
+@lru_cache(maxsize=None)
+def lane_mask(limb_mask:int, count:int) -> int:
+  """ Integer repeating a limb mask in each of a number of lanes of a limb. """
+  return int.from_bytes(limb_mask.to_bytes(limb_width // 8, "little") * count, "little")
+
+def lane_mask_bytes(width:int) -> bytes:
+  """ Bytes of the limbs of a sample with all the bits of a width set. """
+  limb_count = max((width + limb_width - 1) // limb_width, 1)
+  return ((1 << width) - 1).to_bytes(limb_count * limb_width // 8, "little")
+
+def limb_lane(limbs:array, limb_count:int, limb_index:int, count:int) -> int:
+  """ One limb of all the samples of a column, as an integer with a lane of a limb for each sample, 0 outside of the limbs. """
+  if limb_index < 0 or limb_index >= limb_count:
+    return 0
+  return int.from_bytes(limbs[limb_index::limb_count].tobytes(), "little")
+
+def lanes_to_limbs(lanes:list[int], count:int) -> array:
+  """ Limbs of a column from the lanes of each of its limbs. """
+  limbs = array('Q', bytes(limb_width // 8 * count * len(lanes)))
+  for limb_index, lane in enumerate(lanes):
+    limbs[limb_index::len(lanes)] = array('Q', lane.to_bytes(limb_width // 8 * count, "little"))
+  return limbs
+
+def extract_lanes(limbs:array, limb_count:int, count:int, bit_offset:int, width:int) -> list[int]:
+  """ Lanes of the limbs of a field of a width from a bit offset of each sample of a column, the bits outside of the samples are 0.
+      The bits crossing limbs are shifted on all the samples at once, the lanes being masked so that no bit crosses to the next sample. """
+  lanes = []
+  for limb_index in range((width + limb_width - 1) // limb_width):
+    source_limb, shift = divmod(bit_offset + limb_index * limb_width, limb_width)
+    lane               = limb_lane(limbs, limb_count, source_limb, count)
+    if shift:
+      low_lane  = (lane >> shift) & lane_mask((1 << (limb_width - shift)) - 1, count)
+      high_lane = (limb_lane(limbs, limb_count, source_limb + 1, count) << (limb_width - shift)) & lane_mask(((1 << shift) - 1) << (limb_width - shift), count)
+      lane      = low_lane | high_lane
+    lanes.append(lane)
+  if width % limb_width:
+    lanes[-1] &= lane_mask((1 << (width % limb_width)) - 1, count)
+  return lanes
+
+
+
+class WideValueColumn:
+  """ Column of binary values of a bus of any width, each sample stored as limbs of 64 bits from the LSBs, with a parallel mask of the X and Z bits.
+      The operations work on whole limbs of all the samples at once instead of on each sample. """
+
+  def __init__(self, width:int, limbs:array=None, mask:array=None):
+    """ Column of a width from the limbs of the values and of the X/Z mask of the samples, empty by default. """
+    self.width      = width
+    self.limb_count = max((width + limb_width - 1) // limb_width, 1)
+    self.limbs      = limbs if limbs is not None else array('Q')
+    self.mask       = mask  if mask  is not None else array('Q', bytes(len(self.limbs) * 8))
+
+  @classmethod
+  def from_values(cls, values:Iterable[VCDValue|str], width:int) -> WideValueColumn:
+    """ Column of the binary values of a signal, as VCDValues or binary strings. """
+    limb_bytes  = (width + limb_width - 1) // limb_width * limb_width // 8 or limb_width // 8
+    value_bytes = []
+    mask_bytes  = []
+    no_mask     = bytes(limb_bytes)
+    for value in values:
+      bits = value.value if isinstance(value, VCDValue) else value
+      if bits.isdigit():
+        value_bytes.append(int(bits, 2).to_bytes(limb_bytes, "little"))
+        mask_bytes.append(no_mask)
+      else:
+        value_bytes.append(int(bits.translate(value_bits), 2).to_bytes(limb_bytes, "little"))
+        mask_bytes.append(int(bits.translate(mask_bits), 2).to_bytes(limb_bytes, "little"))
+    return cls(width, array('Q', b"".join(value_bytes)), array('Q', b"".join(mask_bytes)))
+
+  def __len__(self) -> int:
+    """ Length is the number of samples. """
+    return len(self.limbs) // self.limb_count
+
+  def __getitem__(self, index:int) -> VCDValue:
+    """ Value of a sample. """
+    if index < 0:
+      index += len(self)
+    sample_slice = slice(index * self.limb_count, (index + 1) * self.limb_count)
+    value = int.from_bytes(self.limbs [sample_slice].tobytes(), "little")
+    mask  = int.from_bytes(self.mask  [sample_slice].tobytes(), "little")
+    bits  = format(value, f"0{self.width}b")
+    if mask:
+      mask_string = format(mask, f"0{self.width}b")
+      bits = "".join(("z" if bit == "1" else "x") if unknown == "1" else bit for bit, unknown in zip(bits, mask_string))
+    return VCDValue("b" + bits, self.width)
+
+  def values(self) -> list[VCDValue]:
+    """ Values of all the samples. """
+    return [self[index] for index in range(len(self))]
+
+
+
+  def slice(self, low:int, high:int) -> WideValueColumn:
+    """ Bits from low included to high excluded of all the samples, with binary indexing like VCDValue slicing. """
+    width = high - low
+    count = len(self)
+    limbs = extract_lanes(self.limbs, self.limb_count, count, low, width)
+    mask  = extract_lanes(self.mask,  self.limb_count, count, low, width)
+    return WideValueColumn(width, lanes_to_limbs(limbs, count), lanes_to_limbs(mask, count))
+
+  def concatenate(self, other:WideValueColumn) -> WideValueColumn:
+    """ Concatenation of the samples of two columns of the same length, this column in the MSBs like VCDValue concatenation. """
+    width = self.width + other.width
+    count = len(self)
+    lanes = []
+    for self_limbs, other_limbs in ((self.limbs, other.limbs), (self.mask, other.mask)):
+      high_lanes = extract_lanes(self_limbs,  self.limb_count,  count, -other.width, width)
+      low_lanes  = extract_lanes(other_limbs, other.limb_count, count, 0,            width)
+      lanes.append([high_lane | low_lane for high_lane, low_lane in zip(high_lanes, low_lanes)])
+    return WideValueColumn(width, lanes_to_limbs(lanes[0], count), lanes_to_limbs(lanes[1], count))
+
+  def __pow__(self, other:WideValueColumn) -> WideValueColumn:
+    """ Exponentiation overloaded for concatenation, like VCDValue. """
+    return self.concatenate(other)
+
+  def invert(self) -> WideValueColumn:
+    """ Binary inversion of all the samples, the X and Z bits are kept like VCDValue inversion. """
+    return self.invert_bits(WideValueColumn(self.width, array('Q', lane_mask_bytes(self.width) * len(self))))
+
+  def __invert__(self) -> WideValueColumn:
+    return self.invert()
+
+  def invert_bytes(self, flags:WideValueColumn) -> WideValueColumn:
+    """ Inversion of the bytes of each sample flagged by the bits of a column of the same length, bit i of the flags inverting byte i, like data bus inversion. """
+    count = len(self)
+    lanes = [0] * self.limb_count
+    for byte_index in range(min(flags.width, (self.width + 7) // 8)):
+      limb_index, byte_offset = divmod(byte_index * 8, limb_width)
+      flag_lane = extract_lanes(flags.limbs, flags.limb_count, count, byte_index, 1)[0]
+      lanes[limb_index] |= flag_lane * 0xFF << byte_offset
+    if self.width % limb_width:
+      lanes[-1] &= lane_mask((1 << (self.width % limb_width)) - 1, count)
+    return self.invert_bits(WideValueColumn(self.width, lanes_to_limbs(lanes, count)))
+
+  def invert_bits(self, inversion:WideValueColumn) -> WideValueColumn:
+    """ Inversion of the bits set in a column of inversion masks of the same shape, except the X and Z bits. """
+    count = len(self)
+    limbs = []
+    for limb_index in range(self.limb_count):
+      value_lane     = limb_lane(self.limbs,      self.limb_count, limb_index, count)
+      mask_lane      = limb_lane(self.mask,       self.limb_count, limb_index, count)
+      inversion_lane = limb_lane(inversion.limbs, self.limb_count, limb_index, count)
+      limbs.append(value_lane ^ (inversion_lane & ~mask_lane))
+    return WideValueColumn(self.width, lanes_to_limbs(limbs, count), array('Q', self.mask))
+
+
+
+  def to_bytes(self, byteorder:str="big") -> list[bytes]:
+    """ Bytes of the values of all the samples, on the width rounded up to bytes. The X and Z bits are 0 and 1. """
+    sample_bytes = self.limb_count * limb_width // 8
+    value_bytes  = (self.width + 7) // 8
+    buffer       = self.limbs.tobytes()
+    if byteorder == "little":
+      return [buffer[offset:offset + value_bytes] for offset in range(0, len(buffer), sample_bytes)]
+
+    # The whole buffer is reversed at once, which reverses the order of the samples and makes each of them big endian
+    buffer = buffer[::-1]
+    return [buffer[offset - value_bytes:offset] for offset in range(len(buffer), 0, -sample_bytes)]
+
+  def hexadecimal(self) -> list[str]:
+    """ Hexadecimal representations of all the samples, the same as VCDValue.hexadecimal. The samples with X or Z fall back to VCDValue. """
+    sample_digits = self.limb_count * limb_width // 4
+    value_digits  = (self.width + 3) // 4
+    digits        = self.limbs.tobytes()[::-1].hex().upper()
+    hexadecimals  = [digits[offset - value_digits:offset] for offset in range(len(digits), 0, -sample_digits)]
+    mask_buffer   = self.mask.tobytes()
+    sample_bytes  = sample_digits // 2
+    no_mask       = bytes(sample_bytes)
+    for index, offset in enumerate(range(0, len(mask_buffer), sample_bytes)):
+      if mask_buffer[offset:offset + sample_bytes] != no_mask:
+        hexadecimals[index] = self[index].hexadecimal()
+    return hexadecimals
@@ -0,0 +1,116 @@
+from interface_inspector.annotator import Annotator, handles
+from interface_inspector.packet    import Packet
+from interface_inspector.utils     import packet_and_annotator_generator
+
+
+
+
+
+
+class Read(Packet):
+  """ Read packet of the tests. """
+  __slots__ = ("address",)
+  def __init__(self, address:int):
+    self.address = address
+  def __repr__(self) -> str:
+    return f"RD {self.address}"
+
+class ReadBurst(Read):
+  """ Read packet subclass, handled by the handler of the reads. """
+  __slots__ = ()
+
+class Write(Packet):
+  """ Write packet of the tests. """
+  __slots__ = ("address",)
+  def __init__(self, address:int):
+    self.address = address
+  def __repr__(self) -> str:
+    return f"WR {self.address}"
+
+class Refresh(Packet):
+  """ Packet no annotator of the tests handles. """
+  __slots__ = ()
+  def __repr__(self) -> str:
+    return "REF"
+
+class CountingAnnotator(Annotator):
+  """ Minimal annotator counting the reads and writes, and the updates and idle renders. """
+  __slots__ = ("reads", "writes", "updates", "idles")
+
+  def __init__(self):
+    self.reads   = 0
+    self.writes  = 0
+    self.updates = 0
+    self.idles   = 0
+
+  def update(self, packet:Packet) -> None:
+    self.updates += 1
+    super().update(packet)
+
+  @handles(Read)
+  def read(self, packet:Read) -> None:
+    self.reads += 1
+
+  @handles(Write)
+  def write(self, packet:Write) -> None:
+    self.writes += 1
+
+  def render(self) -> str:
+    return f"R{self.reads}W{self.writes}"
+
+  def render_idle(self) -> str:
+    self.idles += 1
+    return "-"
+
+class WriteOnlyAnnotator(CountingAnnotator):
+  """ Annotator inheriting the handlers and only interested in the writes. """
+  __slots__ = ()
+  packet_types = (Write,)
+
+class DoubleWriteAnnotator(CountingAnnotator):
+  """ Annotator overriding the handler of the writes, and inheriting the one of the reads. """
+  __slots__ = ()
+
+  @handles(Write)
+  def write_twice(self, packet:Write) -> None:
+    self.writes += 2
+
+
+
+
+
+
+def test_handles_dispatch():
+  """ The handlers are found by packet class or by closest parent class, the classes of interest are those handled, and the subclasses inherit and override the handlers. """
+  assert CountingAnnotator.packet_types == (Read, Write)
+  assert CountingAnnotator.handlers[Read] is CountingAnnotator.read
+  annotator = CountingAnnotator()
+  for packet in (Read(1), ReadBurst(2), Write(3), Refresh()):
+    annotator.update(packet)
+  assert (annotator.reads, annotator.writes) == (2, 1)
+  assert CountingAnnotator.handlers[ReadBurst] is CountingAnnotator.read
+  assert CountingAnnotator.handlers[Refresh] is None
+
+  annotator = DoubleWriteAnnotator()
+  for packet in (Read(1), Write(2)):
+    annotator.update(packet)
+  assert (annotator.reads, annotator.writes) == (1, 2)
+  assert CountingAnnotator.handlers[Write] is CountingAnnotator.write
+
+def test_accepts_packet_types():
+  """ An annotator accepts the subclasses of its classes of interest, and all the packets if it has none. """
+  assert CountingAnnotator.accepts(ReadBurst)
+  assert not CountingAnnotator.accepts(Refresh)
+  assert WriteOnlyAnnotator.accepts(Write)
+  assert not WriteOnlyAnnotator.accepts(Read)
+  assert Annotator.packet_types is None and Annotator.accepts(Refresh)
+
+def test_generator_skips_uninterested_annotators():
+  """ Each packet is only passed to the annotators interested in its class, the others display their idle annotation without being updated. """
+  counting   = CountingAnnotator()
+  write_only = WriteOnlyAnnotator()
+  lines      = list(packet_and_annotator_generator(iter([Read(1), Write(2), Refresh(), ReadBurst(3)]), counting, write_only))
+  assert lines == ["RD 1  R1W0 -", "WR 2  R1W1 R0W1", "REF  - -", "RD 3  R2W1 -"]
+  assert (counting.updates,   counting.idles)   == (3, 1)
+  assert (write_only.updates, write_only.idles) == (1, 3)
+  assert write_only.reads == 0
@@ -0,0 +1,31 @@
+import json
+
+from interface_inspector.apb     import APBInterface
+from interface_inspector.traffic import APBTrafficGenerator, generate_vcd
+from interface_inspector.vcd     import VCDFile, none_value
+
+
+
+
+
+
+def test_decode_without_pnse(tmp_path):
+  """ The optional pnse signal removed from the header, the transactions are decoded with an empty pnse. """
+  vcd_path      = tmp_path / "apb.vcd"
+  expected_path = tmp_path / "expected.jsonl"
+  generate_vcd(str(vcd_path), [APBTrafficGenerator("top.apb")], 20000, expected_path=str(expected_path))
+
+  # The value changes of a code without declaration are ignored by the parser
+  lines = vcd_path.read_text().splitlines(keepends=True)
+  vcd_path.write_text("".join(line for line in lines if not (line.startswith("$var") and " pnse " in line)))
+
+  interface    = APBInterface(VCDFile(str(vcd_path)), path="top.apb")
+  transactions = list(interface.transactions())
+  expected     = [json.loads(line) for line in expected_path.read_text().splitlines()]
+
+  assert interface.pnse is None
+  assert len(transactions) == len(expected) > 0
+  for transaction, record in zip(transactions, expected):
+    assert type(transaction).__name__ == record["type"]
+    assert transaction.field_value("paddr").hexadecimal() == record["paddr"]
+    assert transaction.field_value("pnse") is none_value
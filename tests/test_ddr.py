@@ -0,0 +1,197 @@
+import pytest
+
+from interface_inspector.ddr     import (
+  DDR5BankAnnotator,
+  DDR5Command,
+  DDR5Command_Activate,
+  DDR5Command_Precharge,
+  DDR5Command_PrechargeAll,
+  DDR5Command_PrechargeSameBank,
+  DDR5Command_Read,
+  DDR5Command_ReadAutoPrecharge,
+  DDR5Command_RefreshAll,
+  DDR5Command_RefreshSameBank,
+  DDR5Command_Write,
+  DDR5Command_WriteAutoPrecharge,
+  DDR5Interface,
+  DDR5PageAnnotator,
+  banks_per_bank_group,
+  banks_per_channel,
+  banks_per_chip,
+  chips_per_rank,
+  columns_per_row,
+  ddr5_annotation_columns,
+  ddr5_command_table,
+  page_chunk_symbols,
+  page_chunk_width,
+  page_symbols,
+  precharge_symbol,
+  symbol_bank_activate,
+  symbol_bank_idle,
+  symbol_bank_inactive,
+  symbol_bank_precharge,
+  symbol_bank_read,
+  symbol_bank_refresh,
+  symbol_bank_write,
+  symbol_column_activate,
+  symbol_column_do_read,
+  symbol_column_do_write,
+  symbol_column_inactive,
+  symbol_column_is_read,
+  symbol_column_is_written,
+  symbol_column_precharge_all,
+  symbol_column_unused,
+)
+from interface_inspector.traffic import DDR5TrafficGenerator, generate_vcd
+from interface_inspector.vcd     import VCDFile, VCDValue
+
+
+
+
+
+
+@pytest.fixture(scope="module")
+def ddr_commands(tmp_path_factory) -> list:
+  """ Commands decoded from a generated DDR5 dump. """
+  vcd_path = tmp_path_factory.mktemp("ddr") / "ddr.vcd"
+  generate_vcd(str(vcd_path), [DDR5TrafficGenerator("top.ddr", seed=3)], 600000)
+  return list(DDR5Interface(VCDFile(str(vcd_path)), path="top.ddr").commands())
+
+def streaming_annotations(annotator, commands:list) -> list[str]:
+  """ Annotation of each command by a streaming annotator. """
+  annotations = []
+  for command in commands:
+    annotator.update(command)
+    annotations.append(annotator.render())
+  return annotations
+
+def value(integer:int, width:int) -> VCDValue:
+  """ VCDValue of an int on a width. """
+  return VCDValue("b" + format(integer, f"0{width}b"), width)
+
+def activate(bank_group:int, bank:int, rank:int=0) -> DDR5Command_Activate:
+  """ Activate command of a bank. """
+  return DDR5Command_Activate(0, value(rank, 1), value(0, 3), value(bank_group, 3), value(bank, 2), value(0, 18))
+
+def read(bank_group:int, bank:int, column:int, auto_precharge:bool=False) -> DDR5Command_Read:
+  """ Read command of a column of the page of a bank of the first rank. """
+  command_class = DDR5Command_ReadAutoPrecharge if auto_precharge else DDR5Command_Read
+  return command_class(0, value(0, 1), value(0, 3), value(bank_group, 3), value(bank, 2), value(column << 4, 11), value(0, 1))
+
+def write(bank_group:int, bank:int, column:int, auto_precharge:bool=False) -> DDR5Command_Write:
+  """ Write command of a column of the page of a bank of the first rank. """
+  command_class = DDR5Command_WriteAutoPrecharge if auto_precharge else DDR5Command_Write
+  return command_class(0, value(0, 1), value(0, 3), value(bank_group, 3), value(bank, 2), value(column << 4, 11), value(0, 1), value(0, 1))
+
+def precharge(bank_group:int, bank:int) -> DDR5Command_Precharge:
+  """ Precharge command of a bank of the first rank. """
+  return DDR5Command_Precharge(0, value(0, 1), value(0, 3), value(bank_group, 3), value(bank, 2))
+
+def line(default:str, symbols:dict[int,str], width:int) -> str:
+  """ Annotation line of a width with a default symbol, except at some indices. """
+  return "".join(symbols.get(index, default) for index in range(width))
+
+def test_bank_annotator_lines():
+  """ The bank lines overlay the banks targeted by the command on the cached base line of the activated and inactive banks. """
+  annotator = DDR5BankAnnotator()
+  same_bank = range(1, 32, 4)
+  commands_lines = [
+    (activate(1, 1),                                                                     {5: symbol_bank_activate}),
+    (read(1, 1, 3),                                                                      {5: symbol_bank_read}),
+    (activate(0, 2),                                                                     {2: symbol_bank_activate, 5: symbol_bank_idle}),
+    (DDR5Command_RefreshSameBank(0, value(0, 1), value(0, 3), value(1, 2), value(0, 1)), {2: symbol_bank_idle} | dict.fromkeys(same_bank, symbol_bank_refresh)),
+    (DDR5Command_RefreshAll(0, value(1, 1), value(0, 3), value(0, 1)),                   {2: symbol_bank_idle, 5: symbol_bank_idle} | dict.fromkeys(range(32, 64), symbol_bank_refresh)),
+    (DDR5Command_PrechargeSameBank(0, value(0, 1), value(0, 3), value(1, 2)),            {2: symbol_bank_idle} | dict.fromkeys(same_bank, symbol_bank_precharge)),
+    (write(0, 2, 4, auto_precharge=True),                                                {2: symbol_bank_write}),
+    (activate(7, 3),                                                                     {31: symbol_bank_activate}),
+    (DDR5Command_PrechargeAll(0, value(0, 1), value(0, 3)),                              dict.fromkeys(range(32), symbol_bank_precharge)),
+  ]
+  for command, symbols in commands_lines:
+    annotator.update(command)
+    assert annotator.render() == line(symbol_bank_inactive, symbols, banks_per_channel), repr(command)
+  assert annotator.render_idle() == symbol_bank_inactive * banks_per_channel
+
+def test_bank_annotator_base_line_cached():
+  """ The base line is joined again only when a bank changes status, not for accesses, refreshes or precharges of inactive banks. """
+  annotator = DDR5BankAnnotator()
+  annotator.update(activate(1, 1))
+  base_line = annotator.render_idle()
+  assert base_line == line(symbol_bank_inactive, {5: symbol_bank_idle}, banks_per_channel)
+  annotator.update(read(1, 1, 3))
+  assert annotator.render_idle() is base_line
+  annotator.update(DDR5Command_RefreshAll(0, value(1, 1), value(0, 3), value(0, 1)))
+  annotator.update(precharge(3, 3))
+  assert annotator.render_idle() is base_line
+  annotator.update(precharge(1, 1))
+  assert annotator.render_idle() == symbol_bank_inactive * banks_per_channel
+
+def test_page_annotator_lines():
+  """ The page lines show the columns accessed by the command over the columns read and written since the activation, in precharge colors for precharges. """
+  annotator = DDR5PageAnnotator()
+  commands_lines = [
+    (activate(1, 1),                                                   symbol_column_activate * columns_per_row),
+    (write(1, 1, 3),                                                   line(symbol_column_unused, {3: symbol_column_do_write}, columns_per_row)),
+    (read(1, 1, 3),                                                    line(symbol_column_unused, {3: symbol_column_do_read}, columns_per_row)),
+    (read(1, 1, 9),                                                    line(symbol_column_unused, {3: symbol_column_is_written, 9: symbol_column_do_read}, columns_per_row)),
+    (activate(0, 2),                                                   symbol_column_activate * columns_per_row),
+    (write(0, 2, 9),                                                   line(symbol_column_unused, {9: symbol_column_do_write}, columns_per_row)),
+    (DDR5Command_RefreshAll(0, value(0, 1), value(0, 3), value(0, 1)), " " * columns_per_row),
+    (precharge(1, 1),                                                  line(precharge_symbol(symbol_column_unused), {3: precharge_symbol(symbol_column_is_written), 9: precharge_symbol(symbol_column_is_read)}, columns_per_row)),
+    (read(1, 1, 0),                                                    line(symbol_column_inactive, {0: symbol_column_do_read}, columns_per_row)),
+    (read(1, 1, 1, auto_precharge=True),                               line(precharge_symbol(symbol_column_inactive), {0: precharge_symbol(symbol_column_is_read), 1: symbol_column_do_read}, columns_per_row)),
+    (DDR5Command_PrechargeAll(0, value(0, 1), value(0, 3)),            symbol_column_precharge_all * columns_per_row),
+    (read(1, 1, 2),                                                    line(symbol_column_unused, {2: symbol_column_do_read}, columns_per_row)),
+    (read(0, 2, 9),                                                    line(symbol_column_unused, {9: symbol_column_do_read}, columns_per_row)),
+  ]
+  for command, expected in commands_lines:
+    annotator.update(command)
+    assert annotator.render() == expected, repr(command)
+
+def test_page_chunk_symbols_cached():
+  """ The symbols of a page are assembled from cached chunks, each column showing written over read over inactive. """
+  read_mask    = 0b1100 << 8 | 0b1010
+  written_mask = 0b1001 << 8 | 0b0110
+  expected     = [symbol_column_unused] * columns_per_row
+  for column_index in (1, 3, 10, 11):
+    expected[column_index] = symbol_column_is_read
+  for column_index in (1, 2, 8, 11):
+    expected[column_index] = symbol_column_is_written
+  page_chunk_symbols.cache_clear()
+  assert page_symbols(read_mask, written_mask, False, False) == expected
+  misses = page_chunk_symbols.cache_info().misses
+  assert misses == 3
+  assert page_symbols(read_mask, written_mask, False, True) == [precharge_symbol(symbol) for symbol in expected]
+  assert page_symbols(read_mask, written_mask, False, False) == expected
+  assert page_chunk_symbols.cache_info().misses == 2 * misses
+  assert page_chunk_symbols.cache_info().hits   == 3 * columns_per_row // page_chunk_width - 2 * misses
+
+def test_bank_page_columns(ddr_commands):
+  """ The bank and page annotations of a command table are the same as those of the streaming annotators, including the precharges of all banks and the same bank refreshes. """
+  command_types = {type(command).__name__ for command in ddr_commands}
+  assert {"DDR5Command_PrechargeAll", "DDR5Command_RefreshSameBank", "DDR5Command_WriteAutoPrecharge"} <= command_types
+  bank_column, page_column = ddr5_annotation_columns(ddr5_command_table(ddr_commands))
+  assert bank_column == streaming_annotations(DDR5BankAnnotator(), ddr_commands)
+  assert page_column == streaming_annotations(DDR5PageAnnotator(), ddr_commands)
+
+def test_precomputed_indices(ddr_commands):
+  """ The rank, bank and column indices precomputed at decode locate the addresses of the commands in the channel. """
+  indexed_types = set()
+  for command in ddr_commands:
+    if hasattr(command, "rank_index"):
+      assert command.rank_index == command.chip_select * chips_per_rank + command.chip_id
+    if hasattr(command, "bank_index"):
+      indexed_types.add(type(command))
+      if hasattr(command, "bank_group_address"):
+        assert command.bank_index == command.rank_index * banks_per_chip + command.bank_group_address * banks_per_bank_group + command.bank_address
+        assert 0 <= command.bank_index < banks_per_channel
+      else:
+        assert command.bank_index == command.bank_address
+    if hasattr(command, "column_index"):
+      assert command.column_index == command.column_address >> 4 < columns_per_row
+  assert {DDR5Command_Activate, DDR5Command_Read, DDR5Command_Write, DDR5Command_RefreshSameBank} <= indexed_types
+
+def test_handlers_need_indices():
+  """ The bank annotator handles exactly the command classes carrying a rank index, and the page annotator all the command classes carrying a column index. """
+  for command_type in DDR5Command.__subclasses__():
+    assert DDR5BankAnnotator.accepts(command_type) == ("rank_index" in command_type.__slots__), command_type
+    assert DDR5PageAnnotator.accepts(command_type) >= ("column_index" in command_type.__slots__), command_type
@@ -0,0 +1,186 @@
+import random
+
+import pytest
+
+from interface_inspector.hbm     import (
+  HBM2eBankAnnotator,
+  HBM2eColumnCommand,
+  HBM2eColumnCommand_Read,
+  HBM2eColumnCommand_Write,
+  HBM2eColumnCommand_WriteAutoPrecharge,
+  HBM2eDataAnnotator,
+  HBM2eInterface,
+  HBM2ePageAnnotator,
+  HBM2eRowCommand,
+  HBM2eRowCommand_Activate,
+  HBM2eRowCommand_Precharge,
+  HBM2eRowCommand_PrechargeAll,
+  HBM2eRowCommand_Refresh,
+  banks_per_channel,
+  banks_per_pseudo_channel,
+  banks_per_stack,
+  columns_per_row,
+  data_bus_inversion_masks,
+  hbm2e_annotation_columns,
+  hbm2e_command_table,
+  hbm2e_data_annotation_column,
+  hbm2e_decode_beat,
+  hbm2e_decode_beat_value,
+  hbm2e_decode_beats,
+  precharge_symbol,
+  symbol_bank_activate,
+  symbol_bank_idle,
+  symbol_bank_inactive,
+  symbol_bank_precharge,
+  symbol_bank_read,
+  symbol_bank_refresh,
+  symbol_column_activate,
+  symbol_column_do_read,
+  symbol_column_do_write,
+  symbol_column_inactive,
+  symbol_column_is_written,
+  symbol_column_precharge_all,
+  symbol_column_unused,
+)
+from interface_inspector.traffic import HBM2eTrafficGenerator, generate_vcd
+from interface_inspector.vcd     import VCDFile, VCDValue
+
+
+
+
+
+
+@pytest.fixture(scope="module")
+def hbm_commands(tmp_path_factory) -> list:
+  """ Row and column commands decoded from a generated HBM2e dump, in timestamp order. """
+  vcd_path = tmp_path_factory.mktemp("hbm") / "hbm.vcd"
+  generate_vcd(str(vcd_path), [HBM2eTrafficGenerator("top.hbm", seed=4)], 300000)
+  interface = HBM2eInterface(VCDFile(str(vcd_path)), path="top.hbm")
+  return sorted(list(interface.row_commands()) + list(interface.column_commands()), key=lambda command: command.timestamp)
+
+def streaming_annotations(annotator, commands:list) -> list[str]:
+  """ Annotation of each command by a streaming annotator. """
+  annotations = []
+  for command in commands:
+    annotator.update(command)
+    annotations.append(annotator.render())
+  return annotations
+
+def test_data_annotation_column(hbm_commands):
+  """ The data annotations of a command table, converted in a wide value column, are the same as those of the streaming data annotator. """
+  table = hbm2e_command_table(hbm_commands)
+  assert any(data is not None for data in table.data)
+  assert hbm2e_data_annotation_column(table) == streaming_annotations(HBM2eDataAnnotator(), hbm_commands)
+
+def test_bank_page_columns(hbm_commands):
+  """ The bank and page annotations of a command table are the same as those of the streaming annotators, including the precharges of all banks. """
+  command_types = {type(command).__name__ for command in hbm_commands}
+  assert {"HBM2eRowCommand_PrechargeAll", "HBM2eRowCommand_SingleBankRefresh", "HBM2eColumnCommand_ReadAutoPrecharge"} <= command_types
+  bank_column, page_column, _ = hbm2e_annotation_columns(hbm2e_command_table(hbm_commands))
+  assert bank_column == streaming_annotations(HBM2eBankAnnotator(), hbm_commands)
+  assert page_column == streaming_annotations(HBM2ePageAnnotator(), hbm_commands)
+
+def value(integer:int, width:int) -> VCDValue:
+  """ VCDValue of an int on a width. """
+  return VCDValue("b" + format(integer, f"0{width}b"), width)
+
+def activate(pseudo_channel:int, bank:int) -> HBM2eRowCommand_Activate:
+  """ Activate command of a bank of the first stack of a pseudo-channel. """
+  return HBM2eRowCommand_Activate(0, value(0, 1), value(pseudo_channel, 1), value(0, 1), value(bank, 4), value(0, 15))
+
+def column_command(command_class:type, pseudo_channel:int, bank:int, column:int):
+  """ Read or write command of a column of the page of a bank of the first stack of a pseudo-channel. """
+  return command_class(0, value(0, 1), value(pseudo_channel, 1), value(0, 1), value(bank, 4), value(column * 2, 6))
+
+def line(default:str, symbols:dict[int,str], width:int) -> str:
+  """ Annotation line of a width with a default symbol, except at some indices. """
+  return "".join(symbols.get(index, default) for index in range(width))
+
+def test_page_annotator_lines():
+  """ The page lines show the columns accessed over the columns written since the activation, and a precharge of all banks clears the pages of both pseudo-channels. """
+  annotator = HBM2ePageAnnotator()
+  commands_lines = [
+    (activate(1, 3),                                                 symbol_column_activate * columns_per_row),
+    (column_command(HBM2eColumnCommand_Write, 1, 3, 4),              line(symbol_column_unused, {4: symbol_column_do_write}, columns_per_row)),
+    (column_command(HBM2eColumnCommand_WriteAutoPrecharge, 1, 3, 5), line(precharge_symbol(symbol_column_unused), {4: precharge_symbol(symbol_column_is_written), 5: symbol_column_do_write}, columns_per_row)),
+    (HBM2eRowCommand_Refresh(0, value(0, 1), value(1, 1)),           " " * columns_per_row),
+    (column_command(HBM2eColumnCommand_Read, 1, 3, 0),               line(symbol_column_inactive, {0: symbol_column_do_read}, columns_per_row)),
+    (HBM2eRowCommand_PrechargeAll(0, value(0, 1), value(0, 1)),      symbol_column_precharge_all * columns_per_row),
+    (column_command(HBM2eColumnCommand_Read, 1, 3, 1),               line(symbol_column_unused, {1: symbol_column_do_read}, columns_per_row)),
+  ]
+  for command, expected in commands_lines:
+    annotator.update(command)
+    assert annotator.render() == expected, repr(command)
+
+def test_bank_annotator_precharge_all():
+  """ A precharge of all banks overlays the banks of its pseudo-channel only and makes them inactive in the base line, the banks of the other pseudo-channel stay activated. """
+  annotator = HBM2eBankAnnotator()
+  commands_lines = [
+    (activate(1, 3),                                                                   {35: symbol_bank_activate}),
+    (activate(0, 4),                                                                   {4: symbol_bank_activate, 35: symbol_bank_idle}),
+    (HBM2eRowCommand_Refresh(0, value(0, 1), value(0, 1)),                             {35: symbol_bank_idle} | dict.fromkeys(range(32), symbol_bank_refresh)),
+    (HBM2eRowCommand_PrechargeAll(0, value(0, 1), value(1, 1)),                        {4: symbol_bank_idle} | dict.fromkeys(range(32, 64), symbol_bank_precharge)),
+    (column_command(HBM2eColumnCommand_Read, 0, 4, 2),                                 {4: symbol_bank_read}),
+    (HBM2eRowCommand_Precharge(0, value(0, 1), value(0, 1), value(0, 1), value(4, 4)), {4: symbol_bank_precharge}),
+  ]
+  for command, symbols in commands_lines:
+    annotator.update(command)
+    assert annotator.render() == line(symbol_bank_inactive, symbols, banks_per_channel), repr(command)
+  assert annotator.render_idle() == symbol_bank_inactive * banks_per_channel
+
+def test_precomputed_indices(hbm_commands):
+  """ The bank and column indices precomputed at decode locate the addresses of the commands in the channel, and the bank and page annotators handle every command class carrying them. """
+  indexed_types = set()
+  for command in hbm_commands:
+    if hasattr(command, "bank_index"):
+      indexed_types.add(type(command))
+      assert command.bank_index == command.pseudo_channel * banks_per_pseudo_channel + command.stack_id * banks_per_stack + command.bank_address
+      assert 0 <= command.bank_index < banks_per_channel
+    if hasattr(command, "column_index"):
+      assert command.column_index == command.column_address // 2 < columns_per_row
+  assert {HBM2eRowCommand_Activate, HBM2eRowCommand_Precharge, HBM2eColumnCommand_Read, HBM2eColumnCommand_Write} <= indexed_types
+  for command_type in HBM2eRowCommand.__subclasses__() + HBM2eColumnCommand.__subclasses__():
+    if "bank_index" in command_type.__slots__:
+      assert HBM2eBankAnnotator.accepts(command_type), command_type
+    if "column_index" in command_type.__slots__:
+      assert HBM2ePageAnnotator.accepts(command_type), command_type
+
+def decoded_bits(data:str, data_bus_inversion:str, pseudo_channel:int) -> str:
+  """ Beat of a pseudo-channel decoded from the binary strings of the whole DQ and DBI buses, byte by byte, with the X and Z bits kept. """
+  beat  = data[len(data) - (pseudo_channel+1) * 64 : len(data) - pseudo_channel * 64]
+  flags = data_bus_inversion[len(data_bus_inversion) - (pseudo_channel+1) * 8 : len(data_bus_inversion) - pseudo_channel * 8]
+  beat_bytes = [beat[offset : offset+8] for offset in range(0, 64, 8)]
+  for byte_index, flag in enumerate(flags):
+    if flag == "1":
+      beat_bytes[byte_index] = beat_bytes[byte_index].translate(str.maketrans("01", "10"))
+  beat = "".join(beat_bytes)
+  return beat[32:] + beat[:32]
+
+def test_data_bus_inversion_masks():
+  """ The mask of each value of the DBI bits of a pseudo-channel covers the bytes of the set bits. """
+  assert len(data_bus_inversion_masks) == 256
+  assert data_bus_inversion_masks[0]          == 0
+  assert data_bus_inversion_masks[0b00000001] == 0xFF
+  assert data_bus_inversion_masks[0b10000001] == 0xFF00_0000_0000_00FF
+  assert data_bus_inversion_masks[0b11111111] == 2**64 - 1
+
+def test_decode_beat():
+  """ The beat of each pseudo-channel is its half of DQ with the bytes flagged by its half of DBI inverted, and the two halves of the beat switched. """
+  data               = 0x0123_4567_89AB_CDEF << 64 | 0xFEDC_BA98_7654_3210
+  data_bus_inversion = 0b00000001 << 8 | 0b10000000
+  assert hbm2e_decode_beat(data, data_bus_inversion, 0) == 0x7654_3210_01DC_BA98
+  assert hbm2e_decode_beat(data, data_bus_inversion, 1) == 0x89AB_CD10_0123_4567
+
+def test_decode_beats_with_xz():
+  """ The beats with and without X or Z are decoded the same as inverting the flagged bytes one by one, the X and Z bits staying as they are. """
+  generator = random.Random(6)
+  data      = []
+  for index in range(40):
+    bits = "01xz" if index % 4 == 0 else "01"
+    data.append(VCDValue("b" + "".join(generator.choice(bits) for _ in range(128)), 128))
+  data_bus_inversion = [VCDValue("b" + format(generator.getrandbits(16), "016b"), 16) for _ in data]
+  assert any(value.has_xz for value in data)
+  for pseudo_channel in (0, 1):
+    expected = [decoded_bits(value.value, flags.value, pseudo_channel) for value, flags in zip(data, data_bus_inversion)]
+    assert hbm2e_decode_beats(data, data_bus_inversion, pseudo_channel) == expected
+    assert [hbm2e_decode_beat_value(value, flags, pseudo_channel).value for value, flags in zip(data, data_bus_inversion)] == expected
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from interface_inspector.apb       import APBInterface
+from interface_inspector.axi       import AXIInterface
+from interface_inspector.interface import LoadingSession
+from interface_inspector.traffic   import APBTrafficGenerator, AXITrafficGenerator, DDR5TrafficGenerator, generate_vcd, packet_record
+from interface_inspector.vcd       import VCDFile, VCDPathError
+
+
+
+
+
+
+def generate_dump(tmp_path) -> tuple[str, dict]:
+  """ Dump with an APB, an AXI and a DDR5 interface, and the expected packets by interface and stream. """
+  vcd_path      = tmp_path / "traffic.vcd"
+  expected_path = tmp_path / "expected.jsonl"
+  generators    = [APBTrafficGenerator("top.apb", seed=1), AXITrafficGenerator("top.axi", seed=2), DDR5TrafficGenerator("top.ddr", seed=3)]
+  generate_vcd(str(vcd_path), generators, 200000, expected_path=str(expected_path))
+  expected = {}
+  for line in expected_path.read_text().splitlines():
+    record = json.loads(line)
+    expected.setdefault((record.pop("interface"), record.pop("stream")), []).append(record)
+  return str(vcd_path), expected
+
+def interface_codes(vcd_file:VCDFile, path:str) -> set[str]:
+  """ Identifier codes of the signals under a path. """
+  return {vcd_file.index[signal_path].code for signal_path in vcd_file.find_signals(path + ".*")}
+
+def test_session_loads_two_interfaces(tmp_path):
+  """ A session parses the signals of its interfaces only, and the interfaces decode the expected packets. """
+  vcd_path, expected = generate_dump(tmp_path)
+  vcd_file = VCDFile(vcd_path, header_only=True)
+  session  = LoadingSession(vcd_file)
+  session.add(APBInterface, path="top.apb")
+  session.add(AXIInterface, path="top.axi")
+  apb, axi = session.load()
+
+  assert vcd_file.parsed_codes == interface_codes(vcd_file, "top.apb") | interface_codes(vcd_file, "top.axi")
+  assert expected["top.apb", "transactions"] and expected["top.axi", "read_transactions"]
+  assert [packet_record(packet) for packet in apb.transactions()]      == expected["top.apb", "transactions"]
+  assert [packet_record(packet) for packet in axi.read_transactions()] == expected["top.axi", "read_transactions"]
+
+def test_header_only_signal(tmp_path):
+  """ A signal requested from a VCD opened with only its header parses the value changes of its code only. """
+  vcd_path, _ = generate_dump(tmp_path)
+  vcd_file    = VCDFile(vcd_path, header_only=True)
+  assert not vcd_file.parsed_codes
+  signal = vcd_file.get_signal("top.apb.psel")
+  assert vcd_file.parsed_codes == {vcd_file.index["top.apb.psel"].code}
+  assert len(signal.vcd) == len(VCDFile(vcd_path).get_signal("top.apb.psel").vcd)
+
+def test_bad_path(tmp_path):
+  """ An interface with a bad dotted path raises a VCDPathError listing all the signals missing, from the header only. """
+  vcd_path, _ = generate_dump(tmp_path)
+  vcd_file    = VCDFile(vcd_path, header_only=True)
+  session     = LoadingSession(vcd_file)
+  with pytest.raises(VCDPathError) as error:
+    session.add(APBInterface, path="top.apb_typo")
+  assert "pclock=top.apb_typo.pclock" in str(error.value)
+  assert "pnse=" not in str(error.value)
+  assert not session.registered and not vcd_file.parsed_codes
+  with pytest.raises(VCDPathError):
+    APBInterface(vcd_file, path="top.apb_typo")
+
+def test_find_signals(tmp_path):
+  """ The signals are found by glob pattern or by regular expression matching the whole path. """
+  vcd_path, _ = generate_dump(tmp_path)
+  vcd_file    = VCDFile(vcd_path, header_only=True)
+  assert vcd_file.find_signals("top.apb.p*data") == ["top.apb.pwdata", "top.apb.prdata"]
+  assert vcd_file.find_signals(r"top\.axi\.a[rw]id", regex=True) == ["top.axi.awid", "top.axi.arid"]
+  assert vcd_file.find_signals("top.axi.aw") == []
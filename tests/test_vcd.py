@@ -0,0 +1,200 @@
+import random
+
+from collections import defaultdict
+
+import pytest
+
+from interface_inspector.vcd import (
+  EdgePolarity,
+  LazyVCDValue,
+  SearchMethod,
+  StrobedBurstValue,
+  TimeDirection,
+  VCDFile,
+  VCDSample,
+  VCDSignal,
+  VCDValue,
+  WaveformStorage,
+  get_value_at_timestamp_if_signal_exists,
+  none_value,
+  transition_density,
+)
+
+
+
+
+
+
+def test_factories_and_bits_mutable():
+  """ The values built by the factories and the [] operator are new values that can be modified. """
+  for factory in (VCDValue.none, VCDValue.zero, VCDValue.one, VCDValue.x, VCDValue.z):
+    assert factory() is not factory()
+  bit      = VCDValue("b0101", 4)[0]
+  bit[0:1] = VCDValue.zero()
+  assert bit == VCDValue.zero()
+  value      = VCDValue.one()
+  value[0:1] = VCDValue.zero()
+  assert value == VCDValue.zero()
+
+def test_shared_default_value():
+  """ The default of the missing signals is shared, and modifying an empty value from none() does not change it. """
+  assert get_value_at_timestamp_if_signal_exists(None, none_value, timestamp=0) is none_value
+  value      = VCDValue.none()
+  value[0:0] = VCDValue.one()
+  assert value == VCDValue.one()
+  assert none_value == VCDValue.none() and none_value.value == "" and none_value.width == 0
+  with pytest.raises(TypeError):
+    none_value[0:0] = VCDValue.one()
+
+def test_interned_values_immutable():
+  """ The values interned by the parsers are shared and can't be modified, their copies can. """
+  value = VCDValue.intern("1", 1)
+  assert value is VCDValue.intern("1", 1)
+  with pytest.raises(TypeError):
+    value[0:1] = VCDValue.zero()
+  copy      = value.copy()
+  copy[0:1] = VCDValue.zero()
+  assert copy == VCDValue.zero() and value == VCDValue.one()
+
+def test_lazy_value_abstract():
+  """ The lazy burst values can only be built from a subclass joining the beats. """
+  with pytest.raises(TypeError):
+    LazyVCDValue(8)
+
+def test_strobed_burst_cut():
+  """ A strobed burst is joined alternately on both strobes, and fails at once if cut by the end of the dump. """
+  beats = (["00", "10"], ["01", "11"])
+  assert StrobedBurstValue(beats, [0, 0], 4, 8) == VCDValue("b00011011", 8)
+  with pytest.raises(IndexError):
+    StrobedBurstValue(beats, [1, 1], 4, 8)
+
+def write_density_dump(path) -> str:
+  """ Dump with a sparse, a medium density and a full density signal on a grid of 10 time units, and an irregular signal with gaps of 10 and 15. """
+  generator = random.Random(47)
+  changes   = defaultdict(list)
+  for cycle in range(2000):
+    timestamp = 1000 + cycle * 10
+    changes[timestamp].append(f"{cycle % 2}f")
+    if cycle == 0 or generator.random() < 0.05:
+      changes[timestamp].append(f"{generator.choice('01xz')}s")
+    if cycle == 0 or generator.random() < 0.6:
+      changes[timestamp].append(f"b{generator.choice(['0', '1', '101', '1111', 'x'])} m")
+  timestamp = 1000
+  while timestamp < 21000:
+    changes[timestamp].append(f"{generator.choice('01')}i")
+    timestamp += generator.choice((10, 15))
+  lines = ["$timescale 1ps $end", "$scope module top $end",
+           "$var wire 1 s sparse $end", "$var wire 4 m medium $end", "$var wire 1 f full $end", "$var wire 1 i irregular $end",
+           "$upscope $end", "$enddefinitions $end"]
+  for timestamp in sorted(changes):
+    lines.append(f"#{timestamp}")
+    lines.extend(changes[timestamp])
+  path.write_text("\n".join(lines) + "\n")
+  return str(path)
+
+def test_waveform_storages_equivalent(tmp_path):
+  """ The samples, columns and cycles storages give the same samples and edges for sparse, medium, full density and irregular signals. """
+  vcd_path  = write_density_dump(tmp_path / "density.vcd")
+  vcd_files = {WaveformStorage.SAMPLES : VCDFile(vcd_path),
+               WaveformStorage.COLUMNS : VCDFile(vcd_path, memory_budget=0, cycles_density=2),
+               WaveformStorage.CYCLES  : VCDFile(vcd_path, memory_budget=0, cycles_density=0)}
+  timestamps = random.Random(0).choices(range(900, 21100), k=500)
+  for path in ("top.sparse", "top.medium", "top.full", "top.irregular"):
+    results = {}
+    for storage, vcd_file in vcd_files.items():
+      signal = vcd_file.get_signal(path)
+      assert signal.waveform.storage == storage
+      values  = [signal.get_at_timestamp(timestamp).value.value for timestamp in timestamps]
+      edges   = [signal.get_edge_at_timestamp(timestamp, polarity) for timestamp in timestamps for polarity in (EdgePolarity.RISING, EdgePolarity.FALLING)]
+      edges   = [(edge.timestamp, edge.value.value) if edge else None for edge in edges]
+      samples = [(sample.timestamp, sample.value.value) for sample in signal.vcd]
+      results[storage] = (values, edges, samples)
+    assert results[WaveformStorage.COLUMNS] == results[WaveformStorage.SAMPLES]
+    assert results[WaveformStorage.CYCLES]  == results[WaveformStorage.SAMPLES]
+
+def test_cycles_density_threshold(tmp_path):
+  """ Only the signals with a transition density of at least the threshold are stored on the grid of their changes. """
+  vcd_path = write_density_dump(tmp_path / "density.vcd")
+  vcd_file = VCDFile(vcd_path, memory_budget=0, cycles_density=0.5)
+  assert transition_density(vcd_file.get_signal("top.medium").timestamps) > 0.5
+  assert vcd_file.get_signal("top.sparse").waveform.storage == WaveformStorage.COLUMNS
+  assert vcd_file.get_signal("top.medium").waveform.storage == WaveformStorage.CYCLES
+  assert vcd_file.get_signal("top.full")  .waveform.storage == WaveformStorage.CYCLES
+  assert isinstance(vcd_file.get_signal("top.full").timestamps, range)
+
+def test_aliases_share_waveform(tmp_path):
+  """ Two variables declared with the same identifier code share one waveform, with cursors moving independently. """
+  vcd_path = tmp_path / "alias.vcd"
+  vcd_path.write_text("""$timescale 1ps $end
+$scope module top $end
+$var wire 1 ! clock $end
+$scope module sub $end
+$var wire 1 ! clock_alias $end
+$upscope $end
+$upscope $end
+$enddefinitions $end
+#0
+0!
+#10
+1!
+#20
+0!
+#30
+1!
+""")
+  vcd_file = VCDFile(str(vcd_path))
+  signal   = vcd_file.get_signal("top.clock")
+  alias    = vcd_file.get_signal("top.sub.clock_alias")
+  assert signal.waveform is alias.waveform
+  assert list(vcd_file.waveforms) == ["!"]
+  assert signal.get_edge(EdgePolarity.RISING, move=True).timestamp == 10
+  assert signal.get_edge(EdgePolarity.RISING, move=True).timestamp == 30
+  assert alias.current_index == 0
+  assert alias.get_edge(EdgePolarity.RISING, move=True).timestamp == 10
+
+def glitchy_samples(count:int, seed:int) -> list[VCDSample]:
+  """ Samples of a single bit signal at irregular timestamps, with changes to the same value and X values, after a few toggles. """
+  generator = random.Random(seed)
+  samples   = [VCDSample(timestamp, VCDValue(bit, 1)) for timestamp, bit in zip(range(0, 50, 10), "01010")]
+  timestamp = 40
+  for _ in range(count):
+    timestamp += generator.choice((1, 1, 2, 5, 10))
+    samples.append(VCDSample(timestamp, VCDValue(generator.choice("0011x"), 1)))
+  return samples
+
+def cursor_state(signal:VCDSignal) -> tuple:
+  """ Position of a cursor, with the sample as its timestamp and value. """
+  index, sample, timestamp, finished = signal.snapshot()
+  return (index, sample.timestamp, sample.value.value, timestamp, finished)
+
+def test_search_methods_equivalent():
+  """ The walking, binary and smart searches give the same samples and edges, and move the cursor the same way, over random seeks with far jumps and backward seeks. """
+  samples   = glitchy_samples(3000, 7)
+  signals   = [VCDSignal(samples, 1, search_method=search_method) for search_method in (SearchMethod.WALKING, SearchMethod.BINARY, SearchMethod.SMART)]
+  generator = random.Random(8)
+  end       = samples[-1].timestamp + 20
+  timestamp = 40
+  for step in range(3000):
+    # Mostly short steps forward, with backward seeks and runs of far jumps on both sides
+    if step % 200 < 10:
+      timestamp = generator.randrange(40, end)
+    else:
+      timestamp = min(max(timestamp + generator.randrange(-8, 30), 40), end)
+    polarity  = generator.choice((EdgePolarity.RISING, EdgePolarity.FALLING))
+    direction = generator.choice((TimeDirection.NEXT, TimeDirection.PREVIOUS))
+    move      = generator.random() < 0.5
+    match     = generator.random() < 0.5
+    operation = generator.randrange(3)
+    # Walking backward before the first edges wraps to the end of the dump, so the previous edges are searched after them
+    if operation == 1 and direction == TimeDirection.PREVIOUS and signals[0].current_index < 4:
+      direction = TimeDirection.NEXT
+    results = []
+    for signal in signals:
+      if operation == 0:
+        sample = signal.get_at_timestamp(timestamp, move=move)
+      elif operation == 1:
+        sample = signal.get_edge(polarity, direction=direction, move=move)
+      else:
+        sample = signal.get_edge_at_timestamp(timestamp, polarity, direction, match_on_timestamp=match, move=move)
+      results.append(((sample.timestamp, sample.value.value) if sample else None, cursor_state(signal)))
+    assert results[1] == results[0] and results[2] == results[0], (step, operation, timestamp)
@@ -0,0 +1,128 @@
+import mmap
+
+from interface_inspector            import tracing, vcd_parser
+from interface_inspector.vcd_parser import chunk_boundaries, find_header_end, parse_vcd
+
+
+
+
+
+
+# Header of the test dumps, with a single bit, a vector and a signal only changing at the start
+header = """$timescale 1ps $end
+$scope module top $end
+$var wire 1 ! clock $end
+$var wire 8 " data $end
+$var wire 1 # reset $end
+$upscope $end
+$enddefinitions $end
+"""
+
+def write_dump(path, value_changes:str) -> str:
+  """ Write a dump with the test header and some value changes, and return its path. """
+  path.write_text(header + value_changes)
+  return str(path)
+
+def value_changes(timestamps:int) -> str:
+  """ Value changes with changes to the same value, a vector only changing in the first half, and a comment with timestamp lines. """
+  lines = ["#0", "0!", "b0 \"", "1#"]
+  for timestamp in range(1, timestamps):
+    lines.append(f"#{timestamp * 10}")
+    lines.append(f"{timestamp // 3 % 2}!")
+    if timestamp < timestamps // 2:
+      lines.append(f"b{timestamp:b} \"")
+    if timestamp == timestamps * 3 // 4:
+      lines.extend(["$comment", "#5", "1!", "#7", "$end"])
+  return "\n".join(lines) + "\n"
+
+def assert_same_series(expected, series):
+  """ The series of each code are the same. """
+  assert series.keys() == expected.keys()
+  for code in expected:
+    assert list(series[code]) == list(expected[code])
+
+
+
+
+
+
+def test_chunk_boundaries_at_timestamps(tmp_path):
+  """ The chunks start at timestamp lines outside of the comments, in increasing order. """
+  vcd_path = write_dump(tmp_path / "dump.vcd", value_changes(200))
+  with open(vcd_path, "rb") as vcd_file, mmap.mmap(vcd_file.fileno(), 0, access=mmap.ACCESS_READ) as vcd_map:
+    header_end    = find_header_end(vcd_map)
+    comment_start = vcd_map.find(b"$comment")
+    comment_end   = vcd_map.find(b"$end", comment_start)
+    for chunk_count in (2, 3, 8, 64):
+      boundaries = chunk_boundaries(vcd_map, header_end, chunk_count)
+      assert boundaries[0] == header_end and boundaries[-1] == len(vcd_map)
+      assert boundaries == sorted(set(boundaries))
+      for boundary in boundaries[1:-1]:
+        assert vcd_map[boundary:boundary+1] == b"#"
+        assert not comment_start < boundary < comment_end
+
+def test_chunk_boundaries_skip_comments(tmp_path):
+  """ A boundary falling inside a comment with timestamp lines is moved after the comment. """
+  vcd_path = write_dump(tmp_path / "dump.vcd", "#0\n0!\n$comment\n" + "#5\n" * 100 + "$end\n#10\n1!\n")
+  with open(vcd_path, "rb") as vcd_file, mmap.mmap(vcd_file.fileno(), 0, access=mmap.ACCESS_READ) as vcd_map:
+    header_end = find_header_end(vcd_map)
+    boundaries = chunk_boundaries(vcd_map, header_end, 2)
+    assert boundaries == [header_end, vcd_map.find(b"#10"), len(vcd_map)]
+
+def test_parallel_parse_stitching(tmp_path):
+  """ The series parsed in parallel chunks are stitched to the same series as the sequential parse.
+      The chunks start with changes to the same value, some signals have no change in some chunks, and a comment holds timestamp lines. """
+  vcd_path = write_dump(tmp_path / "dump.vcd", value_changes(200))
+  _, expected, _ = parse_vcd(vcd_path, 1)
+  assert len(expected["#"]) == 1
+  for processes in (2, 3, 8):
+    _, series, _ = parse_vcd(vcd_path, processes)
+    assert_same_series(expected, series)
+
+def test_more_processes_than_chunks(tmp_path):
+  """ A dump with fewer timestamp lines than processes is parsed with fewer chunks. """
+  vcd_path = write_dump(tmp_path / "dump.vcd", "#0\n0!\nb1 \"\n1#\n#10\n1!\n")
+  _, expected, _ = parse_vcd(vcd_path, 1)
+  for processes in (2, 8, 32):
+    _, series, _ = parse_vcd(vcd_path, processes)
+    assert_same_series(expected, series)
+
+def test_worker_spans_traced(tmp_path):
+  """ The spans of the worker processes are merged in the trace under the pid of each worker. """
+  vcd_path = write_dump(tmp_path / "dump.vcd", value_changes(200))
+  tracing.reset_tracing()
+  tracing.enable_tracing()
+  try:
+    parse_vcd(vcd_path, 3)
+    trace_events = tracing.trace()["traceEvents"]
+  finally:
+    tracing.disable_tracing()
+    tracing.reset_tracing()
+  chunk_pids  = {event["pid"] for event in trace_events if event["name"] == "parse_chunk"}
+  worker_pids = {event["pid"] for event in trace_events if event["name"] == "process_name" and event["args"]["name"].startswith("parse worker")}
+  assert chunk_pids and chunk_pids == worker_pids
+
+def traced_parse(vcd_path:str, processes:int) -> dict:
+  """ Trace of a parse with some processes. """
+  tracing.reset_tracing()
+  tracing.enable_tracing()
+  try:
+    parse_vcd(vcd_path, processes)
+    return tracing.trace()
+  finally:
+    tracing.disable_tracing()
+    tracing.reset_tracing()
+
+def test_worker_totals_merged(tmp_path, monkeypatch):
+  """ The totals of the spans of the worker processes count the spans sampled out in the workers. """
+  vcd_path = write_dump(tmp_path / "dump.vcd", value_changes(200))
+  monkeypatch.setattr(vcd_parser, "block_size", 64)
+  unsampled = traced_parse(vcd_path, 3)
+  monkeypatch.setattr(tracing, "max_spans_per_name", 4)
+  sampled   = traced_parse(vcd_path, 3)
+  count     = unsampled["otherData"]["spans"]["parse_value_changes"]["count"]
+  kept      = [event for event in sampled["traceEvents"] if event["name"] == "parse_value_changes"]
+  assert count == len([event for event in unsampled["traceEvents"] if event["name"] == "parse_value_changes"])
+  assert len(kept) < count // 3
+  assert sampled["otherData"]["spans"]["parse_value_changes"]["count"] == count
+  assert sampled["otherData"]["spans"]["parse_value_changes"]["total_us"] >= sum(event["dur"] for event in kept)
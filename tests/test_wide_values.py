@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from interface_inspector.vcd         import VCDValue
+from interface_inspector.wide_values import WideValueColumn
+
+
+
+
+
+
+def random_values(width:int, count:int, seed:int) -> list[VCDValue]:
+  """ Values of a width with some X and Z bits, and some fully known. """
+  generator = random.Random(seed)
+  values    = []
+  for index in range(count):
+    characters = "01xz" if index % 3 == 0 else "01"
+    values.append(VCDValue("b" + "".join(generator.choice(characters) for _ in range(width)), width))
+  return values
+
+def assert_same_values(column:WideValueColumn, values:list[VCDValue]):
+  """ The samples of a column are the same binary strings as the values. """
+  assert [value.value for value in column.values()] == [value.value for value in values]
+
+@pytest.mark.parametrize("width", [1, 64, 65, 512])
+def test_round_trip(width):
+  """ The samples of a column are the values it is built from, with their X and Z bits. """
+  values = random_values(width, 40, width)
+  column = WideValueColumn.from_values(values, width)
+  assert len(column) == len(values)
+  assert_same_values(column, values)
+  assert column[-1].value == values[-1].value
+
+@pytest.mark.parametrize("width", [1, 64, 65, 512])
+def test_operations_match_vcd_value(width):
+  """ Slicing, concatenation, inversion and hexadecimal give the same results as VCDValue on each sample. """
+  values = random_values(width, 40, width + 1)
+  others = random_values(width, 40, width + 2)
+  column = WideValueColumn.from_values(values, width)
+  other  = WideValueColumn.from_values(others, width)
+  for low, high in {(0, width), (0, 1), (width - 1, width), (width // 3, width - width // 4)}:
+    if low < high:
+      assert_same_values(column.slice(low, high), [value[low:high] for value in values])
+  assert_same_values(column ** other, [value ** other_value for value, other_value in zip(values, others)])
+  assert_same_values(~column,         [~value for value in values])
+  assert column.hexadecimal() == [value.hexadecimal() for value in values]
+
+@pytest.mark.parametrize("width", [1, 64, 65, 512])
+def test_to_bytes(width):
+  """ The bytes of the samples are those of their integer values, on the width rounded up to bytes. """
+  values = random_values(width, 40, width + 3)
+  column = WideValueColumn.from_values(values, width)
+  for byteorder in ("big", "little"):
+    expected = [int(value.value.translate(str.maketrans("xXzZ", "0011")), 2).to_bytes((width + 7) // 8, byteorder) for value in values]
+    assert column.to_bytes(byteorder) == expected
+
+def test_invert_bytes():
+  """ The bytes flagged by the bits of a flag column are inverted, like data bus inversion, except the X and Z bits. """
+  values = random_values(72, 30, 4)
+  flags  = random_values(9, 30, 5)
+  flags  = [VCDValue("b" + flag.value.replace("x", "0").replace("z", "1"), 9) for flag in flags]
+  column = WideValueColumn.from_values(values, 72).invert_bytes(WideValueColumn.from_values(flags, 9))
+  expected = []
+  for value, flag in zip(values, flags):
+    inverted = VCDValue("b" + value.value, 72)
+    for byte_index in range(9):
+      if flag.value[-1 - byte_index] == "1":
+        inverted[byte_index * 8 : (byte_index+1) * 8] = ~inverted[byte_index * 8 : (byte_index+1) * 8]
+    expected.append(inverted)
+  assert_same_values(column, expected)